@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:27
+
+import time
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=time.time_ns, editable=False),
+        ),
+    ]
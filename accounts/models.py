@@ -1,3 +1,5 @@
+import time
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -12,9 +14,27 @@ class User(AbstractUser):
     currency = models.CharField(max_length=3, default='USD')
     timezone = models.CharField(max_length=50, default='UTC')
     
+    # Version of the user's financial data, moved by transactions.caching.bump with an UPDATE
+    # after every write; response cache keys and ETags are built from it. It starts from the
+    # clock so a reused user id never matches an old cache entry.
+    data_version = models.PositiveBigIntegerField(default=time.time_ns, editable=False)
+    # When that last happened; the Last-Modified of the user's list and detail responses
+    data_modified_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    # Maintained by UPDATEs only; a full save() must not write back the copy loaded with the user
+    COUNTER_FIELDS = ('data_version', 'data_modified_at')
+    
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return self.email
 
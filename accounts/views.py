@@ -40,6 +40,15 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     
     def get_object(self):
         return self.request.user
+    
+    def perform_update(self, serializer):
+        old_timezone = serializer.instance.timezone
+        user = serializer.save()
+        
+        # Monthly rollups are bucketed in the user's timezone
+        if user.timezone != old_timezone:
+            from transactions import rollups
+            rollups.rebuild(user)
 
 # accounts/urls.py - Updated with rate limited views
 
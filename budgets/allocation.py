@@ -0,0 +1,180 @@
+# budgets/allocation.py
+"""
+Paycheck allocation engine.
+
+Target buckets are loaded and locked in one SELECT ... FOR UPDATE, amounts are validated
+as Decimal, the Allocation rows go in with one bulk INSERT and all bucket balances move
+in one UPDATE built from F() expressions, so allocating across dozens of buckets costs a
+fixed number of queries and concurrent requests cannot over-allocate a paycheck.
+"""
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from transactions.caching import bump
+from .models import Allocation, BudgetBucket, Paycheck
+
+CENT = Decimal("0.01")
+RULES = ("fill_targets", "proportional")
+
+
+class AllocationError(ValueError):
+    """Raised for allocation requests that cannot be applied"""
+
+
+def to_decimal(value, name):
+    """Parse a positive amount with at most two decimal places"""
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        raise AllocationError(f"{name} must be a number")
+    if not amount.is_finite() or amount <= 0:
+        raise AllocationError(f"{name} must be positive")
+    if amount != amount.quantize(CENT):
+        raise AllocationError(f"{name} must have at most two decimal places")
+    return amount
+
+
+def to_bucket_id(value):
+    """An integer id, or a string of digits; anything else (floats, booleans, lists) is rejected"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    raise AllocationError(f"Invalid bucket_id {value!r}")
+
+
+def split_proportionally(total, weights):
+    """
+    Split `total` across the keys of `weights` in proportion to their weight. Leftover
+    cents go to the largest remainders so the parts always add up to `total`.
+    """
+    weight_sum = sum(weights.values())
+    if total <= 0 or weight_sum <= 0:
+        return {}
+    cents = int(total / CENT)
+    exact = {key: cents * weight / weight_sum for key, weight in weights.items()}
+    parts = {key: int(share) for key, share in exact.items()}
+    leftover = cents - sum(parts.values())
+    for key in sorted(exact, key=lambda key: exact[key] - parts[key], reverse=True)[:leftover]:
+        parts[key] += 1
+    return {key: part * CENT for key, part in parts.items() if part}
+
+
+def fill_targets(total, buckets, planned):
+    """Fund each bucket's unfunded target in bucket order until `total` runs out"""
+    amounts = {}
+    for bucket in buckets:
+        if total <= 0:
+            break
+        gap = max(bucket.unallocated_balance - planned.get(bucket.id, 0), 0)
+        amount = min(gap, total)
+        if amount > 0:
+            amounts[bucket.id] = amount
+            total -= amount
+    return amounts
+
+
+def unfunded_target(delta=0):
+    """Expression for a bucket's unallocated_balance after adding `delta` to its balance"""
+    return Greatest(
+        F("monthly_target") - F("current_balance") - delta,
+        Value(Decimal("0")),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def apply_bucket_deltas(deltas):
+    """Move bucket balances by {bucket_id: delta} in a single UPDATE"""
+    deltas = {bucket_id: delta for bucket_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    delta = Case(
+        *(When(id=bucket_id, then=Value(amount)) for bucket_id, amount in deltas.items()),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    BudgetBucket.objects.filter(id__in=deltas).update(
+        current_balance=F("current_balance") + delta,
+        unallocated_balance=unfunded_target(delta),
+    )
+
+
+def refresh_unfunded_targets(buckets):
+    """Recompute unallocated_balance for a BudgetBucket queryset, e.g. after a target change"""
+    buckets.update(unallocated_balance=unfunded_target())
+
+
+@transaction.atomic
+def allocate(paycheck, rows=(), rule=None, bucket_ids=None):
+    """
+    Allocate part of a paycheck to buckets.
+
+    `rows` are {"bucket_id", "amount"} or {"bucket_id", "percent"} (of the paycheck amount).
+    `rule` then splits what is left of the paycheck across `bucket_ids` (default: all the
+    user's buckets): "fill_targets" funds each bucket's unallocated target in turn,
+    "proportional" splits in proportion to monthly targets.
+    Returns ({bucket_id: amount}, remaining paycheck amount).
+    """
+    if rule is not None and rule not in RULES:
+        raise AllocationError(f"rule must be one of {', '.join(RULES)}")
+
+    # Lock the paycheck first, then the buckets in id order, so concurrent allocations queue
+    paycheck = Paycheck.objects.select_for_update().get(pk=paycheck.pk)
+    allocated = paycheck.allocations.aggregate(total=Sum("amount"))["total"] or Decimal("0")
+    available = paycheck.amount - allocated
+
+    for row in rows:
+        if not isinstance(row, dict) or "bucket_id" not in row:
+            raise AllocationError("Each allocation needs a bucket_id")
+    row_bucket_ids = [to_bucket_id(row["bucket_id"]) for row in rows]
+    if bucket_ids is not None:
+        if not isinstance(bucket_ids, (list, tuple)) or not bucket_ids:
+            raise AllocationError("bucket_ids must be a non-empty list of bucket ids")
+        bucket_ids = [to_bucket_id(bucket_id) for bucket_id in bucket_ids]
+
+    buckets = BudgetBucket.objects.select_for_update().filter(user_id=paycheck.user_id).order_by("id")
+    if rule is None or bucket_ids is not None:
+        buckets = buckets.filter(id__in=set(row_bucket_ids) | set(bucket_ids or ()))
+    buckets = list(buckets)
+    by_id = {bucket.id: bucket for bucket in buckets}
+    unknown = sorted(set(bucket_ids or ()) - by_id.keys())
+    if unknown:
+        raise AllocationError(f"Bucket {unknown[0]} not found")
+
+    amounts = defaultdict(Decimal)
+    for bucket_id, row in zip(row_bucket_ids, rows):
+        if bucket_id not in by_id:
+            raise AllocationError(f"Bucket {bucket_id} not found")
+        if "percent" in row:
+            percent = to_decimal(row["percent"], "percent")
+            if percent > 100:
+                raise AllocationError("percent must be at most 100")
+            amounts[bucket_id] += (paycheck.amount * percent / 100).quantize(CENT)
+        else:
+            amounts[bucket_id] += to_decimal(row.get("amount"), "amount")
+
+    if sum(amounts.values()) > available:
+        raise AllocationError("Allocations exceed the unallocated paycheck amount")
+
+    if rule:
+        remaining = available - sum(amounts.values())
+        rule_buckets = [by_id[bucket_id] for bucket_id in dict.fromkeys(bucket_ids)] if bucket_ids else buckets
+        if rule == "fill_targets":
+            rule_buckets = sorted(rule_buckets, key=lambda bucket: (bucket.created_at, bucket.id))
+            split = fill_targets(remaining, rule_buckets, amounts)
+        else:
+            split = split_proportionally(remaining, {bucket.id: bucket.monthly_target for bucket in rule_buckets})
+        for bucket_id, amount in split.items():
+            amounts[bucket_id] += amount
+
+    amounts = {bucket_id: amount for bucket_id, amount in amounts.items() if amount > 0}
+    Allocation.objects.bulk_create([
+        Allocation(paycheck=paycheck, bucket_id=bucket_id, amount=amount)
+        for bucket_id, amount in sorted(amounts.items())
+    ])
+    apply_bucket_deltas(amounts)
+    bump(paycheck.user_id)
+    return amounts, available - sum(amounts.values())
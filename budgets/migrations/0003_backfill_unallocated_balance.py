@@ -0,0 +1,28 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Greatest
+
+
+def backfill_unallocated_balance(apps, schema_editor):
+    """unallocated_balance is the part of monthly_target not funded yet"""
+    BudgetBucket = apps.get_model("budgets", "BudgetBucket")
+    BudgetBucket.objects.update(
+        unallocated_balance=Greatest(
+            F("monthly_target") - F("current_balance"),
+            Value(Decimal("0")),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("budgets", "0002_budgetbucket_unallocated_balance"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_unallocated_balance, migrations.RunPython.noop),
+    ]
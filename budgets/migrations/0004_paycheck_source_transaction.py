@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0003_backfill_unallocated_balance'),
+        ('transactions', '0007_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paycheck',
+            name='source_transaction',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='paychecks', to='transactions.transaction'),
+        ),
+    ]
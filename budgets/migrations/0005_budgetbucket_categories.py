@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0004_paycheck_source_transaction'),
+        ('transactions', '0007_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetbucket',
+            name='categories',
+            field=models.ManyToManyField(blank=True, related_name='budget_buckets', to='transactions.category'),
+        ),
+    ]
@@ -9,8 +9,11 @@ class BudgetBucket(models.Model):
     name = models.CharField(max_length=64)
     monthly_target = models.DecimalField(max_digits=12, decimal_places=2)
     current_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Part of monthly_target not funded yet, i.e. max(monthly_target - current_balance, 0)
     unallocated_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     color = models.CharField(max_length=16, default="#3b82f6")
+    # Spending in these categories counts against the bucket's target
+    categories = models.ManyToManyField("transactions.Category", blank=True, related_name="budget_buckets")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -21,6 +24,10 @@ class Paycheck(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     date = models.DateField(default=timezone.now)
     memo = models.CharField(max_length=128, blank=True)
+    # The income transaction this paycheck allocates, if any
+    source_transaction = models.ForeignKey(
+        "transactions.Transaction", on_delete=models.SET_NULL, null=True, blank=True, related_name="paychecks"
+    )
 
 class Allocation(models.Model):
     """
@@ -30,3 +37,25 @@ class Allocation(models.Model):
     bucket = models.ForeignKey(BudgetBucket, on_delete=models.CASCADE, related_name="allocations")
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
+
+
+# Invalidate the user's cached responses on every write
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from transactions.caching import bump, bump_for_instance
+
+for model in (BudgetBucket, Paycheck):
+    post_save.connect(bump_for_instance, sender=model, dispatch_uid=f'bump-{model.__name__}-save')
+    post_delete.connect(bump_for_instance, sender=model, dispatch_uid=f'bump-{model.__name__}-delete')
+
+@receiver([post_save, post_delete], sender=Allocation)
+def bump_for_allocation(sender, instance, origin=None, **kwargs):
+    # Cascades from a paycheck, bucket or user delete are covered by that row's own receiver,
+    # so deleting a paycheck never loads each of its allocations' owners
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    if origin is not None and origin_model is not Allocation:
+        return
+    if Allocation.paycheck.is_cached(instance):
+        bump(instance.paycheck.user_id)
+    else:
+        bump(*Paycheck.objects.filter(pk=instance.paycheck_id).values_list("user_id", flat=True))
@@ -0,0 +1,11 @@
+# budgets/pagination.py
+from transactions.pagination import TransactionCursorPagination, TransactionPagination
+
+
+class PaycheckCursorPagination(TransactionCursorPagination):
+    ordering = ("-date", "-id")
+
+
+class PaycheckPagination(TransactionPagination):
+    """Page numbers, or keyset pages over the paycheck history with ?cursor="""
+    cursor_pagination_class = PaycheckCursorPagination
@@ -0,0 +1,88 @@
+# budgets/progress.py
+"""
+Budget vs. actual per bucket.
+
+Expense spending in a bucket's categories counts against its monthly target, scaled to
+the period. Spending for all buckets comes from one query grouped by bucket through the
+bucket-category link table, read from MonthlyRollup for whole-month periods, so the cost
+does not grow with the transaction history.
+"""
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from transactions.analytics import MONTH_ALIGNED_PERIODS, user_transactions
+from transactions.models import MonthlyRollup
+from .allocation import CENT
+from .models import BudgetBucket
+
+# Average month length, to prorate monthly targets over weeks and custom ranges
+DAYS_PER_MONTH = Decimal("365.25") / 12
+
+
+def period_months(period):
+    """Length of the period in months; whole months for month-aligned periods"""
+    if period.name in MONTH_ALIGNED_PERIODS:
+        return (period.end.year - period.start.year) * 12 + period.end.month - period.start.month
+    return Decimal((period.end - period.start).days) / DAYS_PER_MONTH
+
+
+def spending_by_bucket(user, params, period, use_rollups=True):
+    """{bucket_id: expense total} over the period, from a single grouped query"""
+    if use_rollups and period.name in MONTH_ALIGNED_PERIODS:
+        source = MonthlyRollup.objects.filter(
+            user=user, month__gte=period.start.date(), month__lt=period.end.date()
+        )
+        amount = "total_amount"
+    else:
+        # A custom period's dates bound the period instead of narrowing the data
+        source = user_transactions(user, params, date_range=period.name != "custom").filter(
+            date__gte=period.start, date__lt=period.end
+        )
+        amount = "amount"
+
+    rows = (
+        source.filter(type="expense", category__budget_buckets__user=user)
+        .values_list("category__budget_buckets")
+        .annotate(spent=Sum(amount))
+        .order_by()
+    )
+    return dict(rows)
+
+
+def bucket_progress(user, params, period, use_rollups=True):
+    """Spent, remaining and percent of target for each of the user's buckets over `period`"""
+    spent_by_bucket = spending_by_bucket(user, params, period, use_rollups)
+    months = period_months(period)
+
+    buckets = []
+    totals = {"target": Decimal("0"), "spent": Decimal("0")}
+    for bucket in BudgetBucket.objects.filter(user=user).order_by("created_at"):
+        target = (bucket.monthly_target * months).quantize(CENT)
+        spent = (spent_by_bucket.get(bucket.id) or Decimal("0")).quantize(CENT)
+        totals["target"] += target
+        totals["spent"] += spent
+        buckets.append({
+            "id": bucket.id,
+            "name": bucket.name,
+            "color": bucket.color,
+            "monthly_target": bucket.monthly_target,
+            "target": target,
+            "spent": spent,
+            "remaining": target - spent,
+            "percent": _percent(spent, target),
+        })
+
+    return {
+        "period": {"name": period.name, "start": period.start.isoformat(), "end": period.end.isoformat()},
+        "buckets": buckets,
+        "totals": {
+            **totals,
+            "remaining": totals["target"] - totals["spent"],
+            "percent": _percent(totals["spent"], totals["target"]),
+        },
+    }
+
+
+def _percent(spent, target):
+    return round(float(spent / target * 100), 1) if target else None
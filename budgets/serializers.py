@@ -1,11 +1,23 @@
 # budgets/serializers.py
 from rest_framework import serializers
+from transactions.models import Category, Transaction
+from transactions.serializers import TransactionListSerializer
 from .models import BudgetBucket, Paycheck, Allocation
 
 class BudgetBucketSerializer(serializers.ModelSerializer):
+    category_ids = serializers.PrimaryKeyRelatedField(
+        queryset=Category.objects.all(), source="categories", many=True, required=False
+    )
     class Meta:
         model = BudgetBucket
-        fields = ["id", "name", "monthly_target", "current_balance", "unallocated_balance","color", "created_at"]
+        fields = ["id", "name", "monthly_target", "current_balance", "unallocated_balance","color", "category_ids", "created_at"]
+        read_only_fields = ["unallocated_balance"]
+
+    def validate_category_ids(self, value):
+        user = self.context["request"].user
+        if any(category.user_id != user.pk for category in value):
+            raise serializers.ValidationError("Category not found")
+        return value
 
 class AllocationSerializer(serializers.ModelSerializer):
     bucket = BudgetBucketSerializer(read_only=True)
@@ -18,6 +30,33 @@ class AllocationSerializer(serializers.ModelSerializer):
 
 class PaycheckSerializer(serializers.ModelSerializer):
     allocations = AllocationSerializer(many=True, read_only=True)
+    source_transaction = serializers.PrimaryKeyRelatedField(
+        queryset=Transaction.objects.filter(type="income"), required=False, allow_null=True
+    )
     class Meta:
         model = Paycheck
-        fields = ["id", "amount", "date", "memo", "allocations"]
+        fields = ["id", "amount", "date", "memo", "source_transaction", "allocations"]
+
+    def validate_source_transaction(self, value):
+        if value is not None and value.user_id != self.context["request"].user.pk:
+            raise serializers.ValidationError("Income transaction not found")
+        return value
+
+
+class CompactAllocationSerializer(serializers.ModelSerializer):
+    """Allocation that references its bucket by id; buckets are side-loaded once per page"""
+    bucket_id = serializers.IntegerField(read_only=True)
+    class Meta:
+        model = Allocation
+        fields = ["id", "bucket_id", "amount", "created_at"]
+
+class CompactPaycheckSerializer(PaycheckSerializer):
+    allocations = CompactAllocationSerializer(many=True, read_only=True)
+
+
+class IncomeTransactionSerializer(TransactionListSerializer):
+    """Income feed row with how much of it has been allocated through paychecks"""
+    allocated_amount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta(TransactionListSerializer.Meta):
+        fields = TransactionListSerializer.Meta.fields + ["allocated_amount"]
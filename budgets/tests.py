@@ -1,3 +1,422 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from transactions import ledger
+from transactions.analytics import resolve_period
+from transactions.models import Account, Category, Transaction
+from . import allocation, progress
+from .models import Allocation, BudgetBucket, Paycheck
+
+
+class AllocationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="budget@example.com", username="budget", password="pw", first_name="Budget", last_name="User",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.paycheck = Paycheck.objects.create(user=self.user, amount=Decimal("1000.00"), memo="Pay")
+
+    def bucket(self, name, target, balance="0"):
+        return BudgetBucket.objects.create(
+            user=self.user, name=name, monthly_target=Decimal(target), current_balance=Decimal(balance),
+            unallocated_balance=max(Decimal(target) - Decimal(balance), Decimal("0")),
+        )
+
+    def allocate(self, body, paycheck=None):
+        return self.client.post(f"/api/budgets/paychecks/{(paycheck or self.paycheck).id}/allocate/", body, format="json")
+
+    def assertRejected(self, body, message=None):
+        response = self.allocate(body)
+        self.assertEqual(response.status_code, 400, response.data)
+        if message:
+            self.assertIn(message, response.data["detail"])
+        self.assertFalse(Allocation.objects.exists())
+        return response
+
+
+class BucketIdValidationTests(AllocationTestCase):
+    """bucket_ids must be a list of the user's bucket ids; anything else is a 400 and allocates nothing"""
+
+    def setUp(self):
+        super().setUp()
+        self.buckets = [self.bucket(f"Bucket {i}", "100") for i in range(3)]
+
+    def test_scalar_bucket_ids(self):
+        self.assertRejected({"rule": "proportional", "bucket_ids": self.buckets[0].id}, "must be a non-empty list")
+
+    def test_string_bucket_ids(self):
+        ids = f"{self.buckets[0].id}{self.buckets[1].id}"
+        self.assertRejected({"rule": "proportional", "bucket_ids": ids}, "must be a non-empty list")
+
+    def test_empty_bucket_ids(self):
+        self.assertRejected({"rule": "proportional", "bucket_ids": []})
+
+    def test_unknown_bucket_id(self):
+        self.assertRejected({"rule": "proportional", "bucket_ids": [self.buckets[0].id, 999999]}, "Bucket 999999 not found")
+
+    def test_other_users_bucket(self):
+        other = User.objects.create_user(
+            email="other@example.com", username="other", password="pw", first_name="Other", last_name="User",
+        )
+        foreign = BudgetBucket.objects.create(user=other, name="Theirs", monthly_target=Decimal("100"))
+        self.assertRejected({"rule": "proportional", "bucket_ids": [foreign.id]}, "not found")
+
+    def test_invalid_elements(self):
+        for value in (True, 1.5, None, [1], {"id": 1}):
+            with self.subTest(value=value):
+                self.assertRejected({"rule": "proportional", "bucket_ids": [value]}, "Invalid bucket_id")
+
+    def test_invalid_row_bucket_id(self):
+        self.assertRejected({"allocations": [{"bucket_id": "abc", "amount": "10"}]}, "Invalid bucket_id")
+
+    def test_valid_ids_as_numbers_and_digit_strings(self):
+        ids = [self.buckets[0].id, str(self.buckets[1].id)]
+        response = self.allocate({"rule": "proportional", "bucket_ids": ids})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            {row["bucket_id"]: row["amount"] for row in response.data["applied"]},
+            {self.buckets[0].id: Decimal("500.00"), self.buckets[1].id: Decimal("500.00")},
+        )
+
+
+class AllocationEngineTests(AllocationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.groceries = self.bucket("Groceries", "400")
+        self.rent = self.bucket("Rent", "600", balance="450")
+        self.fun = self.bucket("Fun", "200")
+
+    def applied(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row["bucket_id"]: row["amount"] for row in response.data["applied"]}
+
+    def test_amounts_must_be_positive_decimals_with_cents(self):
+        for amount, message in (
+            ("abc", "must be a number"), ("NaN", "must be positive"), ("-5", "must be positive"),
+            ("0", "must be positive"), ("1.234", "two decimal places"), (None, "must be a number"),
+        ):
+            with self.subTest(amount=amount):
+                self.assertRejected({"allocations": [{"bucket_id": self.groceries.id, "amount": amount}]}, message)
+
+    def test_percent_over_100(self):
+        self.assertRejected({"allocations": [{"bucket_id": self.groceries.id, "percent": "100.5"}]}, "at most 100")
+
+    def test_unknown_rule(self):
+        self.assertRejected({"rule": "everything"}, "rule must be one of")
+
+    def test_over_allocation(self):
+        self.assertRejected({"allocations": [
+            {"bucket_id": self.groceries.id, "amount": "600"},
+            {"bucket_id": self.fun.id, "amount": "400.01"},
+        ]}, "exceed")
+
+    def test_over_allocation_counts_earlier_allocations(self):
+        self.applied(self.allocate({"allocations": [{"bucket_id": self.groceries.id, "amount": "900"}]}))
+        response = self.allocate({"allocations": [{"bucket_id": self.fun.id, "amount": "100.01"}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Allocation.objects.count(), 1)
+
+    def test_amounts_and_percent(self):
+        applied = self.applied(self.allocate({"allocations": [
+            {"bucket_id": self.groceries.id, "amount": "120.50"},
+            {"bucket_id": self.fun.id, "percent": "12.5"},
+            {"bucket_id": self.groceries.id, "amount": "9.50"},
+        ]}))
+        self.assertEqual(applied, {self.groceries.id: Decimal("130.00"), self.fun.id: Decimal("125.00")})
+
+    def test_fill_targets_funds_buckets_in_creation_order(self):
+        response = self.allocate({
+            "allocations": [{"bucket_id": self.groceries.id, "amount": "100"}],
+            "rule": "fill_targets",
+        })
+        # Groceries gets its 100 plus the 300 left of its target, Rent the 150 it lacks, Fun the rest
+        self.assertEqual(self.applied(response), {
+            self.groceries.id: Decimal("400.00"), self.rent.id: Decimal("150.00"), self.fun.id: Decimal("200.00"),
+        })
+        self.assertEqual(response.data["remaining"], Decimal("250.00"))
+
+    def test_proportional_split_adds_up_to_the_paycheck(self):
+        paycheck = Paycheck.objects.create(user=self.user, amount=Decimal("100.00"))
+        self.rent.monthly_target = Decimal("300")
+        self.rent.save()
+        applied = self.applied(self.allocate({"rule": "proportional"}, paycheck))
+        # 400 : 300 : 200 of 100.00 is 44.444.., 33.333.., 22.222..; the leftover cent goes to the largest remainder
+        self.assertEqual(applied, {
+            self.groceries.id: Decimal("44.45"), self.rent.id: Decimal("33.33"), self.fun.id: Decimal("22.22"),
+        })
+        self.assertEqual(sum(applied.values()), paycheck.amount)
+
+    def test_bucket_balances_and_unallocated_targets(self):
+        self.applied(self.allocate({"allocations": [
+            {"bucket_id": self.groceries.id, "amount": "150"},
+            {"bucket_id": self.rent.id, "amount": "300"},
+        ]}))
+        self.groceries.refresh_from_db()
+        self.rent.refresh_from_db()
+        self.fun.refresh_from_db()
+        self.assertEqual((self.groceries.current_balance, self.groceries.unallocated_balance), (Decimal("150.00"), Decimal("250.00")))
+        # Funded past its target: nothing left to allocate, never negative
+        self.assertEqual((self.rent.current_balance, self.rent.unallocated_balance), (Decimal("750.00"), Decimal("0.00")))
+        self.assertEqual((self.fun.current_balance, self.fun.unallocated_balance), (Decimal("0.00"), Decimal("200.00")))
+
+
+class AllocationCacheTests(AllocationTestCase):
+    """Allocation writes invalidate cached responses; cascades do it in a fixed number of queries"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.buckets = [self.bucket(f"Bucket {i}", "100") for i in range(10)]
+
+    def delete_queries(self, instance):
+        with CaptureQueriesContext(connection) as queries:
+            instance.delete()
+        return len(queries)
+
+    def test_cascade_deletes_do_not_load_each_allocation(self):
+        small = Paycheck.objects.create(user=self.user, amount=Decimal("100.00"))
+        self.allocate({"rule": "proportional", "bucket_ids": [self.buckets[0].id]}, small)
+        self.allocate({"rule": "proportional"})
+        self.assertEqual(self.delete_queries(small), self.delete_queries(self.paycheck))
+
+    def test_cascade_deletes_invalidate_cached_responses(self):
+        self.allocate({"rule": "proportional"})
+        for instance in (self.buckets[0], self.paycheck):
+            with self.subTest(instance=instance):
+                version = User.objects.get(pk=self.user.pk).data_version
+                with self.captureOnCommitCallbacks(execute=True):
+                    instance.delete()
+                self.assertEqual(User.objects.get(pk=self.user.pk).data_version, version + 1)
+
+    def test_allocation_writes_outside_allocate_invalidate(self):
+        version = lambda: User.objects.get(pk=self.user.pk).data_version
+        start = version()
+        with self.captureOnCommitCallbacks(execute=True):
+            row = Allocation.objects.create(paycheck=self.paycheck, bucket=self.buckets[0], amount=Decimal("10.00"))
+        self.assertEqual(version(), start + 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Allocation.objects.get(pk=row.pk).delete()
+        self.assertEqual(version(), start + 2)
+
+
+class BucketProgressTests(AllocationTestCase):
+    """Progress measures expense spending in each bucket's categories against its prorated target"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.groceries = self.bucket("Groceries", "400")
+        self.transport = self.bucket("Transport", "200")
+        self.food, _ = Category.objects.get_or_create(user=self.user, name="Food & Dining", type="expense")
+        self.car, _ = Category.objects.get_or_create(user=self.user, name="Transportation", type="expense")
+        self.shopping, _ = Category.objects.get_or_create(user=self.user, name="Shopping", type="expense")
+        self.salary, _ = Category.objects.get_or_create(user=self.user, name="Salary", type="income")
+        self.groceries.categories.add(self.food)
+        self.transport.categories.add(self.car)
+        self.account = Account.objects.create(user=self.user, name="Checking", type="checking")
+
+        # Money set aside in the buckets is not spending
+        response = self.allocate({"allocations": [
+            {"bucket_id": self.groceries.id, "amount": "300.00"},
+            {"bucket_id": self.transport.id, "amount": "150.00"},
+        ]})
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def spend(self, *rows):
+        ledger.post(Transaction.objects.bulk_create([
+            Transaction(user=self.user, account=self.account, category=category, type=category.type,
+                        amount=Decimal(amount), description="Spend", date=when)
+            for category, amount, when in rows
+        ]))
+
+    def test_this_month(self):
+        now = timezone.now()
+        self.spend(
+            (self.food, "120.50", now),
+            (self.food, "79.50", now),
+            (self.car, "250.00", now),
+            (self.shopping, "40.00", now),  # in no bucket
+            (self.salary, "999.00", now),
+            (self.food, "999.00", now - timedelta(days=40)),  # last month or earlier
+        )
+        response = self.client.get("/api/budgets/buckets/progress/?period=month")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [(b["name"], b["target"], b["spent"], b["remaining"], b["percent"]) for b in response.data["buckets"]],
+            [
+                ("Groceries", Decimal("400.00"), Decimal("200.00"), Decimal("200.00"), 50.0),
+                ("Transport", Decimal("200.00"), Decimal("250.00"), Decimal("-50.00"), 125.0),
+            ],
+        )
+        self.assertEqual(response.data["totals"], {
+            "target": Decimal("600.00"), "spent": Decimal("450.00"), "remaining": Decimal("150.00"), "percent": 75.0,
+        })
+
+    def test_custom_periods_prorate_targets(self):
+        utc = ZoneInfo("UTC")
+        march = datetime(2025, 3, 10, 12, tzinfo=utc)
+        self.spend(
+            (self.food, "100.00", march),
+            (self.car, "50.00", march),
+            (self.food, "500.00", march + timedelta(days=21)),  # 31 March, after the period
+        )
+        response = self.client.get("/api/budgets/buckets/progress/?period=custom&start_date=2025-03-01&end_date=2025-03-30")
+        self.assertEqual(response.status_code, 200, response.data)
+        # 30 days of an average 30.4375-day month
+        self.assertEqual(
+            [(b["target"], b["spent"], b["remaining"], b["percent"]) for b in response.data["buckets"]],
+            [
+                (Decimal("394.25"), Decimal("100.00"), Decimal("294.25"), 25.4),
+                (Decimal("197.13"), Decimal("50.00"), Decimal("147.13"), 25.4),
+            ],
+        )
+        self.assertEqual(response.data["totals"]["target"], Decimal("591.38"))
+        self.assertEqual(response.data["totals"]["remaining"], Decimal("441.38"))
+
+    def test_buckets_without_a_target(self):
+        self.bucket("Someday", "0")
+        period = resolve_period({"period": "month"}, ZoneInfo("UTC"))
+        someday = progress.bucket_progress(self.user, QueryDict(), period)["buckets"][-1]
+        self.assertEqual(
+            (someday["name"], someday["target"], someday["spent"], someday["percent"]),
+            ("Someday", Decimal("0.00"), Decimal("0.00"), None),
+        )
+
+
+class PaycheckQueryCountTests(AllocationTestCase):
+    """The paycheck list runs a fixed number of queries however many paychecks, allocations and buckets it shows"""
+
+    def add_paychecks(self, count):
+        """Add `count` paychecks, each allocated across two fresh buckets with a category"""
+        for _ in range(count):
+            n = BudgetBucket.objects.count()
+            paycheck = Paycheck.objects.create(user=self.user, amount=Decimal("100.00"), memo=f"Pay {n}")
+            for i in range(2):
+                bucket = self.bucket(f"Bucket {n + i}", "50")
+                bucket.categories.add(Category.objects.create(user=self.user, name=f"Category {n + i}", type="expense"))
+                Allocation.objects.create(paycheck=paycheck, bucket=bucket, amount=Decimal("50.00"))
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_compact_list(self):
+        # Count, paychecks, their allocations, then the side-loaded buckets and their categories
+        self.add_paychecks(1)
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/budgets/paychecks/?compact=true")
+        self.assertEqual(len(response.data["buckets"]), 2)
+
+        self.add_paychecks(9)
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/budgets/paychecks/?compact=true")
+        self.assertEqual(len(response.data["results"]), 11)  # with the unallocated setUp paycheck
+        self.assertEqual(len(response.data["buckets"]), 20)
+
+    def test_full_list(self):
+        self.add_paychecks(1)
+        small = self.count_queries("/api/budgets/paychecks/")
+        self.add_paychecks(9)
+        self.assertEqual(self.count_queries("/api/budgets/paychecks/"), small)
+
+
+class IncomeTransactionFeedTests(TestCase):
+    """The allocator's income feed: what paychecks have allocated from each row, and the feed total"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="income@example.com", username="income", password="pw", first_name="In", last_name="Come",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.account = Account.objects.create(user=self.user, name="Checking", type="checking")
+        self.salary, _ = Category.objects.get_or_create(user=self.user, name="Salary", type="income")
+        self.bucket = BudgetBucket.objects.create(user=self.user, name="Savings", monthly_target=Decimal("5000"))
+        now = timezone.now()
+        self.allocated, self.partial, self.untouched = [
+            Transaction.objects.create(
+                user=self.user, account=self.account, category=self.salary, type="income",
+                amount=Decimal(amount), description=description, date=now - timedelta(days=days),
+            )
+            for days, amount, description in ((3, "1000.00", "June"), (2, "800.00", "July"), (1, "300.00", "Bonus"))
+        ]
+        food, _ = Category.objects.get_or_create(user=self.user, name="Food", type="expense")
+        Transaction.objects.create(
+            user=self.user, account=self.account, category=food, type="expense",
+            amount=Decimal("50.00"), description="Groceries", date=now,
+        )
+        for source, amounts in ((self.allocated, ("600.00", "400.00")), (self.partial, ("200.00",))):
+            for amount in amounts:
+                paycheck = Paycheck.objects.create(user=self.user, amount=Decimal(amount), source_transaction=source)
+                Allocation.objects.create(paycheck=paycheck, bucket=self.bucket, amount=Decimal(amount))
+
+    def feed(self, query=""):
+        response = self.client.get(f"/api/budgets/buckets/income_transactions/{query}")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_allocated_amounts(self):
+        rows = {row["id"]: Decimal(row["allocated_amount"]) for row in self.feed()["results"]}
+        self.assertEqual(rows, {
+            self.allocated.id: Decimal("1000.00"), self.partial.id: Decimal("200.00"), self.untouched.id: Decimal("0"),
+        })
+
+    def test_unallocated_keeps_income_not_fully_allocated(self):
+        data = self.feed("?unallocated=true")
+        self.assertEqual([row["id"] for row in data["results"]], [self.untouched.id, self.partial.id])
+        self.assertEqual(data["total_amount"], Decimal("1100.00"))
+
+    def test_total_amount_is_only_on_the_first_page(self):
+        for query in ("", "?page=1", "?cursor=&page_size=2"):
+            with self.subTest(query=query):
+                self.assertEqual(self.feed(query)["total_amount"], Decimal("2100.00"))
+        first = self.feed("?cursor=&page_size=2")
+        # Just the page itself: no COUNT, no total
+        with self.assertNumQueries(1):
+            response = self.client.get(first["next"])
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.allocated.id])
+        self.assertNotIn("total_amount", response.data)
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentAllocationTests(TransactionTestCase):
+    """Row locks stop concurrent requests from allocating more than the paycheck"""
+
+    def test_only_one_of_several_overlapping_allocations_succeeds(self):
+        user = User.objects.create_user(
+            email="race@example.com", username="race", password="pw", first_name="Race", last_name="User",
+        )
+        bucket = BudgetBucket.objects.create(user=user, name="Savings", monthly_target=Decimal("5000"))
+        paycheck = Paycheck.objects.create(user=user, amount=Decimal("1000.00"))
+
+        def attempt():
+            try:
+                allocation.allocate(paycheck, [{"bucket_id": bucket.id, "amount": "600"}])
+                return True
+            except allocation.AllocationError:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: attempt(), range(8)))
+
+        self.assertEqual(results.count(True), 1)
+        bucket.refresh_from_db()
+        self.assertEqual(bucket.current_balance, Decimal("600.00"))
+        self.assertEqual(Allocation.objects.count(), 1)
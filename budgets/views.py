@@ -7,33 +7,94 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
+from transactions.analytics import reads_rollups, resolve_period, user_timezone, user_transactions
+from transactions.caching import ConditionalGetMixin, bump, cached_per_user
+from transactions.pagination import TransactionPagination
+from transactions.routing import ReadReplicaMixin
+from . import allocation, progress
 from .models import BudgetBucket, Paycheck, Allocation
-from .serializers import BudgetBucketSerializer, PaycheckSerializer, AllocationSerializer
+from .pagination import PaycheckPagination
+from .serializers import (
+    AllocationSerializer,
+    BudgetBucketSerializer,
+    CompactPaycheckSerializer,
+    IncomeTransactionSerializer,
+    PaycheckSerializer,
+)
 
-class BucketViewSet(viewsets.ModelViewSet):
+class BucketViewSet(ReadReplicaMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    replica_actions = ["income_transactions", "progress"]
     serializer_class = BudgetBucketSerializer
 
     def get_queryset(self):
-        return BudgetBucket.objects.filter(user=self.request.user).order_by("created_at")
+        return BudgetBucket.objects.filter(user=self.request.user).prefetch_related("categories").order_by("created_at")
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        self._refresh_unfunded_target(serializer.save(user=self.request.user))
+
+    def perform_update(self, serializer):
+        self._refresh_unfunded_target(serializer.save())
+
+    def _refresh_unfunded_target(self, bucket):
+        allocation.refresh_unfunded_targets(BudgetBucket.objects.filter(pk=bucket.pk))
+        bucket.refresh_from_db(fields=["unallocated_balance"])
     
     @action(detail=False, methods=["get"])
-    def income_transactions(self, request):
-        """Get all income transactions from the transactions app"""
-        from transactions.models import Transaction
-        from transactions.serializers import TransactionListSerializer
+    @cached_per_user
+    def progress(self, request):
+        """
+        Budget vs. actual: spent, remaining and percent of target per bucket for
+        ?period=week|month|quarter|year|custom (default: this month, in the user's timezone)
+        """
+        try:
+            period = resolve_period(request.query_params, user_timezone(request.user))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get income transactions (filter by type='income')
-        income_transactions = Transaction.objects.filter(
-            user=request.user,
-            type='income'
-        ).order_by('-date')
+        return Response(progress.bucket_progress(
+            request.user, request.query_params, period, use_rollups=reads_rollups(request.query_params)
+        ))
+    
+    @action(detail=False, methods=["get"])
+    def income_transactions(self, request):
+        """
+        Paginated income feed (?page=, or ?cursor= with ?page_size=) narrowed by ?start_date=/?end_date=;
+        ?unallocated=true keeps income not yet fully allocated through paychecks. The first page
+        also carries `total_amount` for the whole feed.
+        """
+        allocated = (
+            Allocation.objects.filter(paycheck__source_transaction=OuterRef("pk"))
+            .values("paycheck__source_transaction")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        income_transactions = (
+            user_transactions(request.user, request.query_params)
+            .filter(type="income")
+            .annotate(allocated_amount=Coalesce(
+                Subquery(allocated), Value(Decimal("0")), output_field=DecimalField(max_digits=12, decimal_places=2)
+            ))
+            .order_by("-date", "-created_at", "id")
+        )
+        if request.query_params.get("unallocated") in ("1", "true", "True"):
+            income_transactions = income_transactions.filter(allocated_amount__lt=F("amount"))
         
-        serializer = TransactionListSerializer(income_transactions, many=True)
-        return Response(serializer.data)
+        paginator = TransactionPagination()
+        page = paginator.paginate_queryset(income_transactions, request, view=self)
+        serializer = IncomeTransactionSerializer(page, many=True, context={"request": request})
+        response = paginator.get_paginated_response(serializer.data)
+        # Total of the whole filtered feed, so the allocator needn't page through it to add it up;
+        # only on the first page, so following `next` doesn't repeat the aggregate
+        first_page = not request.query_params.get(paginator.cursor_query_param) and (
+            request.query_params.get(paginator.page_query_param) in (None, "", "1")
+        )
+        if first_page:
+            response.data["total_amount"] = income_transactions.aggregate(total=Sum("amount"))["total"] or Decimal("0")
+        return response
     
     @action(detail=True, methods=["post"])
     def allocate_money(self, request, pk=None):
@@ -42,26 +103,28 @@ class BucketViewSet(viewsets.ModelViewSet):
         Body: { amount: number, transaction_type: "add" or "remove" }
         """
         bucket = self.get_object()
-        amount = request.data.get("amount", 0)
         transaction_type = request.data.get("transaction_type", "add")
         
-        if not amount or amount <= 0:
-            return Response({"error": "Amount must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            amount = allocation.to_decimal(request.data.get("amount", 0), "Amount")
+        except allocation.AllocationError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         if transaction_type not in ["add", "remove"]:
             return Response({"error": "Transaction type must be 'add' or 'remove'"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if removing more than available
-        if transaction_type == "remove" and amount > bucket.current_balance:
-            return Response({"error": "Cannot remove more than current balance"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update bucket balance
-        if transaction_type == "add":
-            bucket.current_balance += amount
-        else:
-            bucket.current_balance -= amount
+        with transaction.atomic():
+            bucket = BudgetBucket.objects.select_for_update().get(pk=bucket.pk)
+            
+            # Check if removing more than available
+            if transaction_type == "remove" and amount > bucket.current_balance:
+                return Response({"error": "Cannot remove more than current balance"}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Update bucket balance
+            allocation.apply_bucket_deltas({bucket.id: amount if transaction_type == "add" else -amount})
+            bump(request.user.pk)
         
-        bucket.save()
+        bucket.refresh_from_db(fields=["current_balance", "unallocated_balance"])
         
         return Response({
             "success": True,
@@ -93,45 +156,73 @@ class BucketViewSet(viewsets.ModelViewSet):
             "money_returned": float(money_in_bucket)
         })
 
-class PaycheckViewSet(viewsets.ModelViewSet):
+class PaycheckViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    Paycheck history, paginated by page number or by ?cursor=. ?compact=true lists
+    allocations with a bucket_id and side-loads each referenced bucket once per page.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = PaycheckSerializer
+    pagination_class = PaycheckPagination
 
     def get_queryset(self):
-        return Paycheck.objects.filter(user=self.request.user).order_by("-date", "-id")
+        allocations = Allocation.objects.order_by("id")
+        if not self._compact():
+            allocations = allocations.select_related("bucket").prefetch_related("bucket__categories")
+        return (
+            Paycheck.objects.filter(user=self.request.user)
+            .prefetch_related(Prefetch("allocations", queryset=allocations))
+            .order_by("-date", "-id")
+        )
+
+    def get_serializer_class(self):
+        if self.action == "list" and self._compact():
+            return CompactPaycheckSerializer
+        return super().get_serializer_class()
+
+    def _compact(self):
+        return self.request.query_params.get("compact") in ("1", "true", "True")
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self._compact() and response.status_code == status.HTTP_200_OK:
+            bucket_ids = {row["bucket_id"] for paycheck in response.data["results"] for row in paycheck["allocations"]}
+            buckets = (
+                BudgetBucket.objects.filter(user=request.user, id__in=bucket_ids)
+                .prefetch_related("categories")
+                .order_by("id")
+            )
+            response.data["buckets"] = BudgetBucketSerializer(buckets, many=True, context={"request": request}).data
+        return response
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     @action(detail=True, methods=["post"])
-    @transaction.atomic
     def allocate(self, request, pk=None):
         """
-        Body: { allocations: [{bucket_id, amount}, ...] }
-        Updates bucket current_balance and creates Allocation rows.
+        Body: { allocations: [{bucket_id, amount} | {bucket_id, percent}, ...],
+                rule: "fill_targets" | "proportional" (optional), bucket_ids: [...] (optional) }
+        Creates Allocation rows and moves bucket balances; `rule` splits what is left of the
+        paycheck across `bucket_ids` (default: all buckets).
         """
         paycheck = self.get_object()
         allocations = request.data.get("allocations", [])
-        total = 0
-        created = []
-
-        for row in allocations:
-            bucket_id = row.get("bucket_id")
-            amount = row.get("amount", 0)
-            if amount <= 0: 
-                continue
-            total += float(amount)
-
-        if total > float(paycheck.amount):
-            return Response({"detail": "Allocations exceed paycheck amount"},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        for row in allocations:
-            bucket = BudgetBucket.objects.get(id=row["bucket_id"], user=request.user)
-            amt = row["amount"]
-            Allocation.objects.create(paycheck=paycheck, bucket=bucket, amount=amt)
-            bucket.current_balance = (bucket.current_balance or 0) + amt
-            bucket.save(update_fields=["current_balance"])
-            created.append({"bucket_id": bucket.id, "amount": amt})
-
-        return Response({"ok": True, "applied": created})
+        if not isinstance(allocations, list):
+            return Response({"detail": "allocations must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            applied, remaining = allocation.allocate(
+                paycheck,
+                allocations,
+                rule=request.data.get("rule"),
+                bucket_ids=request.data.get("bucket_ids"),
+            )
+        except allocation.AllocationError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "ok": True,
+            "applied": [{"bucket_id": bucket_id, "amount": amount} for bucket_id, amount in sorted(applied.items())],
+            "remaining": remaining,
+        })
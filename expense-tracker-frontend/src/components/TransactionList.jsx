@@ -1,12 +1,13 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import Cookies from "js-cookie";
 
 const TransactionList = ({ onEditTransaction, onDeleteTransaction, onRefresh }) => {
   const [transactions, setTransactions] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
-  const [currentPage, setCurrentPage] = useState(1);
-  const [totalPages, setTotalPages] = useState(1);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const sentinelRef = useRef(null);
 
   const getToken = () => Cookies.get("access_token");
   const getRefreshToken = () => Cookies.get("refresh_token");
@@ -36,9 +37,11 @@ const TransactionList = ({ onEditTransaction, onDeleteTransaction, onRefresh })
     }
   };
 
-  const fetchTransactions = async () => {
+  // Cursor pagination: the first page is `?cursor=`, later pages follow the `next` link
+  const fetchTransactions = async (url = "http://localhost:8000/api/transactions/?cursor=") => {
+    const isFirstPage = url.endsWith("?cursor=");
     try {
-      setIsLoading(true);
+      isFirstPage ? setIsLoading(true) : setIsLoadingMore(true);
       setError(null);
       const ok = await checkAndRefreshToken();
       if (!ok) {
@@ -46,7 +49,7 @@ const TransactionList = ({ onEditTransaction, onDeleteTransaction, onRefresh })
         return;
       }
       const token = getToken();
-      const res = await fetch(`http://localhost:8000/api/transactions/?page=${currentPage}`, {
+      const res = await fetch(url, {
         headers: { Authorization: `Bearer ${token}` },
       });
       if (!res.ok) {
@@ -54,16 +57,29 @@ const TransactionList = ({ onEditTransaction, onDeleteTransaction, onRefresh })
         return;
       }
       const data = await res.json();
-      setTransactions(data.results || data || []);
-      setTotalPages(Math.ceil((data.count || 0) / 20));
+      const page = data.results || data || [];
+      setTransactions((prev) => (isFirstPage ? page : [...prev, ...page]));
+      setNextUrl(data.next || null);
     } catch {
       setError("Network error. Please check your connection.");
     } finally {
       setIsLoading(false);
+      setIsLoadingMore(false);
     }
   };
 
-  useEffect(() => { fetchTransactions(); }, [currentPage]);
+  useEffect(() => { fetchTransactions(); }, []);
+
+  // Infinite scroll: load the next page when the sentinel below the table becomes visible
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextUrl) return;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting && !isLoadingMore) fetchTransactions(nextUrl);
+    });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [nextUrl, isLoadingMore]);
 
   const refreshTransactions = () => {
     fetchTransactions();
@@ -187,25 +203,9 @@ const TransactionList = ({ onEditTransaction, onDeleteTransaction, onRefresh })
         </table>
       </div>
 
-      {totalPages > 1 && (
-        <div className="flex items-center justify-between border-t border-gray-200 px-2 py-3 text-sm text-gray-600">
-          <button
-            onClick={() => setCurrentPage((p) => Math.max(1, p - 1))}
-            disabled={currentPage === 1}
-            className="rounded-md border border-gray-300 px-3 py-1.5 disabled:opacity-50"
-          >
-            Previous
-          </button>
-          <span>
-            Page <strong>{currentPage}</strong> of {totalPages}
-          </span>
-          <button
-            onClick={() => setCurrentPage((p) => Math.min(totalPages, p + 1))}
-            disabled={currentPage === totalPages}
-            className="rounded-md border border-gray-300 px-3 py-1.5 disabled:opacity-50"
-          >
-            Next
-          </button>
+      {nextUrl && (
+        <div ref={sentinelRef} className="py-3 text-center text-sm text-gray-500">
+          {isLoadingMore ? "Loading more…" : ""}
         </div>
       )}
     </div>
@@ -9,6 +9,9 @@ const $ = (n) => new Intl.NumberFormat("en-US", { style: "currency", currency: "
 export default function BudgetAllocator() {
     const [buckets, setBuckets] = useState([]);
     const [incomeTransactions, setIncomeTransactions] = useState([]);
+    const [incomeTotal, setIncomeTotal] = useState(null); // total of all income, from the server
+    const [incomeNext, setIncomeNext] = useState(null); // next page of the income feed
+    const [selectedIncomeId, setSelectedIncomeId] = useState(null); // income transaction being allocated
     const [alloc, setAlloc] = useState({}); // {bucketId: number}
     const [isSaving, setIsSaving] = useState(false);
     const [notification, setNotification] = useState({ show: false, message: "", type: "success" });
@@ -36,11 +39,10 @@ export default function BudgetAllocator() {
         })();
     }, [token]);
 
-  // Load income transactions
-    useEffect(() => {
-        (async () => {
+  // Load income transactions, one cursor page at a time
+    async function loadIncomeTransactions(url, append = false) {
         try {
-            const res = await fetch("http://localhost:8000/api/budgets/buckets/income_transactions/", {
+            const res = await fetch(url, {
             headers: { Authorization: `Bearer ${token}` }
             });
             
@@ -49,18 +51,29 @@ export default function BudgetAllocator() {
             }
             
             const data = await res.json();
-            setIncomeTransactions(data);
+            const rows = data.results || data;
+            setIncomeTransactions((current) => (append ? [...current, ...rows] : rows));
+            // Only the first page carries the total of the whole feed
+            if (!append) setIncomeTotal(data.total_amount ?? null);
+            setIncomeNext(data.next || null);
         } catch (error) {
             console.error("Error loading income transactions:", error.message);
-            setIncomeTransactions([]); // Set empty array on error
+            if (!append) setIncomeTransactions([]); // Set empty array on error
         }
-        })();
+    }
+
+    const INCOME_FEED_URL = "http://localhost:8000/api/budgets/buckets/income_transactions/?cursor=";
+
+    useEffect(() => {
+        loadIncomeTransactions(INCOME_FEED_URL);
     }, [token]);
 
   // Calculate total income
     const totalIncome = useMemo(
-        () => incomeTransactions.reduce((sum, t) => sum + (Number(t.amount) || 0), 0),
-        [incomeTransactions]
+        () => incomeTotal !== null
+            ? Number(incomeTotal)
+            : incomeTransactions.reduce((sum, t) => sum + (Number(t.amount) || 0), 0),
+        [incomeTotal, incomeTransactions]
     );
 
   // Calculate total allocated across all buckets (from actual bucket balances)
@@ -72,6 +85,18 @@ export default function BudgetAllocator() {
   // Calculate remaining unallocated money
     const remaining = totalIncome - totalAllocated;
 
+  // The selected income transaction and how much of it is not allocated yet
+    const selectedIncome = incomeTransactions.find((t) => t.id === selectedIncomeId) || null;
+    const selectedAvailable = selectedIncome
+        ? Number(selectedIncome.amount) - (Number(selectedIncome.allocated_amount) || 0)
+        : 0;
+
+  // Total of the amounts entered against the buckets
+    const totalAlloc = useMemo(
+        () => Object.values(alloc).reduce((sum, v) => sum + (Number(v) || 0), 0),
+        [alloc]
+    );
+
   // Create bucket
     async function createBucket(e) {
         e.preventDefault();
@@ -150,29 +175,60 @@ export default function BudgetAllocator() {
         }
     }
 
-  // Save allocations
+  // Allocate the selected income: a paycheck linked to its transaction, split across the entered amounts
     async function saveAllocation() {
-        if (totalAlloc <= 0 || remaining < 0) return;
+        if (!selectedIncome || totalAlloc <= 0 || totalAlloc > selectedAvailable) return;
         setIsSaving(true);
         try {
         const allocations = Object.entries(alloc)
             .filter(([_, v]) => Number(v) > 0)
-            .map(([bucketId, v]) => ({ bucket_id: Number(bucketId), amount: Number(v) }));
+            .map(([bucketId, v]) => ({ bucket_id: Number(bucketId), amount: Number(v).toFixed(2) }));
 
-        await fetch("http://localhost:8000/api/budgets/buckets/allocate/", {
+        const paycheckRes = await fetch("http://localhost:8000/api/budgets/paychecks/", {
+            method: "POST",
+            headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` },
+            body: JSON.stringify({
+            amount: totalAlloc.toFixed(2),
+            date: selectedIncome.date.slice(0, 10),
+            memo: selectedIncome.description.slice(0, 128),
+            source_transaction: selectedIncome.id
+            })
+        });
+        if (!paycheckRes.ok) {
+            throw new Error("Failed to create paycheck");
+        }
+        const paycheck = await paycheckRes.json();
+
+        const res = await fetch(`http://localhost:8000/api/budgets/paychecks/${paycheck.id}/allocate/`, {
             method: "POST",
             headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` },
             body: JSON.stringify({ allocations })
         });
+        if (!res.ok) {
+            const errorData = await res.json();
+            // Don't leave an empty paycheck linked to the income
+            await fetch(`http://localhost:8000/api/budgets/paychecks/${paycheck.id}/`, {
+            method: "DELETE",
+            headers: { Authorization: `Bearer ${token}` }
+            });
+            throw new Error(errorData.detail || "Failed to allocate income");
+        }
+        const result = await res.json();
 
-        // optimistic UI: update local bucket balances
         setBuckets((prev) =>
             prev.map((b) => {
-            const found = allocations.find((a) => a.bucket_id === b.id);
-            return found ? { ...b, current_balance: Number(b.current_balance) + found.amount } : b;
+            const found = result.applied.find((a) => a.bucket_id === b.id);
+            return found ? { ...b, current_balance: Number(b.current_balance) + Number(found.amount) } : b;
             })
         );
         setAlloc({});
+        setSelectedIncomeId(null);
+        // Reload so each row's allocated amount includes the new paycheck
+        loadIncomeTransactions(INCOME_FEED_URL);
+        showNotification(`Allocated ${$(totalAlloc)} from ${selectedIncome.description}`, "success");
+        } catch (error) {
+        console.error("Error allocating income:", error.message);
+        showNotification(`Error: ${error.message}`, "error");
         } finally {
         setIsSaving(false);
         }
@@ -226,7 +282,13 @@ export default function BudgetAllocator() {
                     <p className="text-sm text-gray-500 italic">No income transactions found</p>
                     ) : (
                     incomeTransactions.map((transaction) => (
-                        <div key={transaction.id} className="flex items-center justify-between p-3 bg-green-50 border border-green-200 rounded-lg">
+                        <div
+                        key={transaction.id}
+                        onClick={() => setSelectedIncomeId(transaction.id === selectedIncomeId ? null : transaction.id)}
+                        className={`flex items-center justify-between p-3 bg-green-50 border rounded-lg cursor-pointer ${
+                            transaction.id === selectedIncomeId ? "border-green-600 ring-2 ring-green-500" : "border-green-200"
+                        }`}
+                        >
                         <div className="flex items-center gap-3">
                             <div className="w-2 h-2 bg-green-500 rounded-full"></div>
                             <div>
@@ -236,12 +298,26 @@ export default function BudgetAllocator() {
                             </div>
                             </div>
                         </div>
-                        <div className="text-sm font-semibold text-green-700">
-                            +${Number(transaction.amount).toFixed(2)}
+                        <div className="text-right">
+                            <div className="text-sm font-semibold text-green-700">
+                                +${Number(transaction.amount).toFixed(2)}
+                            </div>
+                            {Number(transaction.allocated_amount) > 0 && (
+                            <div className="text-xs text-green-600">{$(Number(transaction.allocated_amount))} allocated</div>
+                            )}
                         </div>
                         </div>
                     ))
                     )}
+                    {incomeNext && (
+                    <button
+                        type="button"
+                        onClick={() => loadIncomeTransactions(incomeNext, true)}
+                        className="w-full text-sm text-green-700 hover:underline py-1"
+                    >
+                        Load more
+                    </button>
+                    )}
                 </div>
                 </div>
 
@@ -403,10 +479,19 @@ export default function BudgetAllocator() {
                     })}
                 </div>
 
-                <div className="mt-4">
+                <div className="mt-4 flex items-center justify-between gap-4">
                     <p className="text-sm text-gray-600">
                     Unallocated Money: <strong className="text-green-600">{$(remaining)}</strong>
                     </p>
+                    <button
+                    type="button"
+                    onClick={saveAllocation}
+                    disabled={!selectedIncome || totalAlloc <= 0 || totalAlloc > selectedAvailable || isSaving}
+                    title={selectedIncome ? `${$(selectedAvailable)} of this income is unallocated` : "Select an income transaction first"}
+                    className="px-3 py-1 bg-zinc-900 text-white rounded-lg text-sm font-medium disabled:opacity-50 disabled:cursor-not-allowed"
+                    >
+                    {isSaving ? "Allocating..." : `Allocate ${$(totalAlloc)} from selected income`}
+                    </button>
                 </div>
                 </div>
             </section>
@@ -80,12 +80,75 @@ WSGI_APPLICATION = 'expense_tracker_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgresql selects PostgreSQL (psycopg 3). DB_POOL=True uses Django's native
+# connection pool instead of persistent per-thread connections; the two are exclusive.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DB_POOL = config('DB_POOL', default=False, cast=bool)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='expense_tracker'),
+            'USER': config('DB_USER', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+        }
     }
-}
+    if DB_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # Readers don't block the writer in WAL mode. Writers take the lock up front
+                # (BEGIN IMMEDIATE) and wait up to `timeout` seconds for it instead of failing
+                # with "database is locked" when a deferred transaction tries to upgrade.
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': config('DB_TIMEOUT', default=20, cast=int),
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA mmap_size={config('DB_MMAP_SIZE', default=134217728, cast=int)};"
+                    'PRAGMA cache_size=-20000;'
+                ),
+            },
+        }
+    }
+else:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f"DB_ENGINE must be 'sqlite' or 'postgresql', not {DB_ENGINE!r}")
+
+# Read replicas for dashboard and list reads: DB_REPLICAS is a comma-separated list of
+# replica hosts (host or host:port) for PostgreSQL, or database files for SQLite. Each
+# becomes a `replicaN` alias with the primary's settings; tests mirror it to `default`.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config('DB_REPLICAS', default='', cast=Csv())):
+    alias = f'replica{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if DB_ENGINE == 'postgresql':
+        host, _, port = replica.partition(':')
+        DATABASES[alias].update(HOST=host, PORT=port or DATABASES['default']['PORT'])
+    else:
+        DATABASES[alias]['NAME'] = replica
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['transactions.routing.ReplicaRouter']
+
+# Seconds after a write during which the user's reads stay on the primary
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
 
 
 # Password validation
@@ -137,14 +200,20 @@ X_FRAME_OPTIONS = 'DENY'
 RATELIMIT_USE_CACHE = 'default'
 RATELIMIT_ENABLE = True
 
-# Add caching (in-memory for development)
+# Add caching (in-memory for development). Cached dashboard responses are keyed by the
+# user's data version column, so every process invalidates them on a write whatever the
+# backend; a shared one keeps a single copy for all workers, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='unique-snowflake'),
     }
 }
 
+# Seconds a cached summary/analytics response is kept (it is invalidated on writes anyway)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
 AUTH_USER_MODEL = 'accounts.User'
 
 # JWT Configuration
@@ -205,4 +274,7 @@ CORS_ALLOW_CREDENTIALS = True
 CSRF_TRUSTED_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
 
 # Add CORS middleware
-MIDDLEWARE.insert(0, 'corsheaders.middleware.CorsMiddleware')
\ No newline at end of file
+MIDDLEWARE.insert(0, 'corsheaders.middleware.CorsMiddleware')
+
+# Rows per INSERT when bulk creating transactions
+TRANSACTIONS_BULK_BATCH_SIZE = config('TRANSACTIONS_BULK_BATCH_SIZE', default=500, cast=int)
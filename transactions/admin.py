@@ -1,5 +1,7 @@
-from django.contrib import admin
-from .models import Transaction, Category, Account
+from django.contrib import admin, messages
+from django.db import transaction as db_transaction
+from .models import Transaction, Category, Account, Tag, RecurringTransaction
+from . import ledger, reconcile
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -13,7 +15,47 @@ class AccountAdmin(admin.ModelAdmin):
     list_display = ['name', 'type', 'user', 'balance', 'is_active', 'created_at']
     list_filter = ['type', 'is_active', 'created_at']
     search_fields = ['name', 'user__email']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['opening_balance', 'created_at', 'updated_at']
+    actions = ['reconcile_balances']
+    
+    # A hand-edited balance moves the opening balance by the same amount, as in
+    # AccountSerializer.update, so reconciling keeps the edit; both are re-read under lock
+    def save_model(self, request, obj, form, change):
+        with db_transaction.atomic():
+            if change:
+                current = Account.objects.select_for_update().only('balance', 'opening_balance').get(pk=obj.pk)
+                obj.opening_balance = current.opening_balance
+                if 'balance' in form.changed_data:
+                    obj.opening_balance += obj.balance - current.balance
+                else:
+                    obj.balance = current.balance
+            else:
+                obj.opening_balance = obj.balance
+            super().save_model(request, obj, form, change)
+    
+    @admin.action(description='Recompute balances from transactions')
+    def reconcile_balances(self, request, queryset):
+        drifted = reconcile.reconcile(queryset, fix=True)
+        for row in drifted:
+            self.message_user(
+                request,
+                f"{row['name']}: {row['stored']} -> {row['expected']} (drift {row['drift']})",
+                messages.WARNING,
+            )
+        self.message_user(request, f'{len(drifted)} of {queryset.count()} balances corrected', messages.SUCCESS)
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'created_at']
+    search_fields = ['name', 'user__email']
+    readonly_fields = ['created_at']
+
+@admin.register(RecurringTransaction)
+class RecurringTransactionAdmin(admin.ModelAdmin):
+    list_display = ['description', 'amount', 'type', 'frequency', 'interval', 'user', 'next_occurrence', 'is_active']
+    list_filter = ['type', 'frequency', 'is_active']
+    search_fields = ['description', 'user__email']
+    readonly_fields = ['occurrence_count', 'next_occurrence', 'created_at', 'updated_at']
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
@@ -24,4 +66,25 @@ class TransactionAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user', 'category', 'account')
\ No newline at end of file
+        return super().get_queryset(request).select_related('user', 'category', 'account')
+    
+    # Balances, rollups and tags follow admin edits through the ledger, like API writes
+    def save_model(self, request, obj, form, change):
+        with db_transaction.atomic():
+            if change:
+                old_transaction = Transaction.objects.select_for_update().get(pk=obj.pk)
+                obj.save()
+                ledger.repost(old_transaction, obj)
+            else:
+                obj.save()
+                ledger.post([obj])
+    
+    def delete_model(self, request, obj):
+        with db_transaction.atomic():
+            ledger.unpost([obj])
+            obj.delete()
+    
+    def delete_queryset(self, request, queryset):
+        with db_transaction.atomic():
+            ledger.unpost(list(queryset.select_for_update(of=('self',))))
+            queryset.delete()
@@ -0,0 +1,301 @@
+# transactions/analytics.py
+"""
+Dashboard computations shared by the DRF viewset actions and the async dashboard views.
+
+`summary_queries` and `analytics_queries` return the independent queries behind each
+dashboard as zero-argument callables, so the sync views can run them one after another
+and the async views can run them concurrently.
+"""
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db.models import Count, Sum, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import MonthlyRollup, Transaction
+from .tags import normalize as normalize_tag
+
+DEFAULT_TREND_MONTHS = 12
+MAX_TREND_MONTHS = 120
+SUMMARY_TOP_CATEGORIES = 5
+SUMMARY_RECENT_TRANSACTIONS = 10
+
+PERIODS = ('week', 'month', 'quarter', 'year', 'custom')
+# Periods made of whole calendar months can be summed from MonthlyRollup
+MONTH_ALIGNED_PERIODS = ('month', 'quarter', 'year')
+
+# `end` is exclusive; the previous period runs from `previous_start` to `start`
+Period = namedtuple('Period', 'name start end previous_start')
+
+
+def user_timezone(user):
+    """Return the tzinfo for the user's `timezone` field, falling back to UTC"""
+    try:
+        return ZoneInfo(getattr(user, 'timezone', None) or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+
+def user_transactions(user, params, date_range=True):
+    """The user's transactions narrowed by the ?start_date=, ?end_date= and ?tag= query parameters"""
+    queryset = Transaction.objects.filter(user=user).select_related(
+        'category', 'account', 'transfer_to_account'
+    )
+    
+    # Date range filtering (skipped when the dates define a summary period instead)
+    if date_range and params.get('start_date'):
+        queryset = queryset.filter(date__gte=params['start_date'])
+    if date_range and params.get('end_date'):
+        queryset = queryset.filter(date__lte=params['end_date'])
+    
+    # Tag filtering through the indexed tag table; repeat ?tag= to require several tags
+    for tag in params.getlist('tag'):
+        queryset = queryset.filter(tag_set__name=normalize_tag(tag))
+    
+    return queryset
+
+
+def reads_rollups(params):
+    """Dashboard reads come from MonthlyRollup unless the request narrows the date range or tags"""
+    return not (params.get('start_date') or params.get('end_date') or params.get('tag'))
+
+
+def parse_trend_months(params):
+    """The ?months= trend window; raises ValueError with a client-facing message"""
+    try:
+        months = int(params.get('months', DEFAULT_TREND_MONTHS))
+    except (TypeError, ValueError):
+        raise ValueError('months must be an integer')
+    if not 1 <= months <= MAX_TREND_MONTHS:
+        raise ValueError(f'months must be between 1 and {MAX_TREND_MONTHS}')
+    return months
+
+
+def _shift_months(moment, months):
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+def resolve_period(params, tz, now=None):
+    """
+    The ?period= window in `tz` (default: this month), or ?period=custom from the inclusive
+    ?start_date=/?end_date= dates, plus the equally long period before it. Raises
+    ValueError with a client-facing message.
+    """
+    name = params.get('period', 'month')
+    if name not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    
+    if name == 'custom':
+        try:
+            first = parse_date(params.get('start_date') or '')
+            last = parse_date(params.get('end_date') or '')
+        except ValueError:
+            first = last = None
+        if not first or not last or last < first:
+            raise ValueError('period=custom needs start_date <= end_date, as YYYY-MM-DD')
+        start = datetime.combine(first, time.min, tzinfo=tz)
+        end = datetime.combine(last + timedelta(days=1), time.min, tzinfo=tz)
+        return Period(name, start, end, start - (end - start))
+    
+    midnight = timezone.localtime(now or timezone.now(), tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    if name == 'week':
+        start = midnight - timedelta(days=midnight.weekday())
+        return Period(name, start, start + timedelta(days=7), start - timedelta(days=7))
+    
+    months = {'month': 1, 'quarter': 3, 'year': 12}[name]
+    first_of_month = midnight.replace(day=1)
+    start = _shift_months(first_of_month, -((first_of_month.month - 1) % months))
+    return Period(name, start, _shift_months(start, months), _shift_months(start, -months))
+
+
+def month_sequence(year, month, months):
+    """List the (year, month) pairs of the `months` months ending at year/month, oldest first"""
+    index = year * 12 + (month - 1)
+    return [(i // 12, i % 12 + 1) for i in range(index - months + 1, index + 1)]
+
+
+def monthly_trends(queryset, tz, months=DEFAULT_TREND_MONTHS, now=None):
+    """
+    Income/expense totals per calendar month (in `tz`) for the last `months` months.
+    All months are computed in one grouped query; months without activity are zero-filled.
+    """
+    now = timezone.localtime(now or timezone.now(), tz)
+    keys = month_sequence(now.year, now.month, months)
+    window_start = datetime(keys[0][0], keys[0][1], 1, tzinfo=tz)
+
+    rows = (
+        queryset.filter(date__gte=window_start)
+        .annotate(month=TruncMonth('date', tzinfo=tz))
+        .values('month')
+        .annotate(
+            income=Sum('amount', filter=Q(type='income')),
+            expenses=Sum('amount', filter=Q(type='expense')),
+        )
+        .order_by('month')
+    )
+    return _zero_filled(keys, rows)
+
+
+def rollup_monthly_trends(rollups, tz, months=DEFAULT_TREND_MONTHS, now=None):
+    """Same as `monthly_trends`, read from the user's `MonthlyRollup` rows"""
+    now = timezone.localtime(now or timezone.now(), tz)
+    keys = month_sequence(now.year, now.month, months)
+
+    rows = (
+        rollups.filter(month__gte=date(keys[0][0], keys[0][1], 1))
+        .values('month')
+        .annotate(
+            income=Sum('total_amount', filter=Q(type='income')),
+            expenses=Sum('total_amount', filter=Q(type='expense')),
+        )
+        .order_by('month')
+    )
+    return _zero_filled(keys, rows)
+
+
+def _zero_filled(keys, rows):
+    """Shape grouped month rows into the monthly_trends payload, one entry per key"""
+    totals = {(row['month'].year, row['month'].month): row for row in rows}
+
+    monthly_data = []
+    for year, month in keys:
+        row = totals.get((year, month), {})
+        income = row.get('income') or 0
+        expenses = row.get('expenses') or 0
+        monthly_data.append({
+            'month': f'{year:04d}-{month:02d}',
+            'income': float(income),
+            'expenses': float(expenses),
+            'net': float(income - expenses),
+        })
+    return monthly_data
+
+
+def summary_queries(user, params, tz, period, use_rollups=True):
+    """
+    Independent queries behind the summary dashboard, keyed by result name. The totals of
+    the period and of the one before it come from a single conditional aggregate.
+    """
+    # A custom period's dates bound the period (and its predecessor) instead of narrowing the data
+    transactions = user_transactions(user, params, date_range=period.name != 'custom')
+    
+    if use_rollups and period.name in MONTH_ALIGNED_PERIODS:
+        source = MonthlyRollup.objects.filter(user=user)
+        field, amount = 'month', 'total_amount'
+        previous_start, start, end = period.previous_start.date(), period.start.date(), period.end.date()
+        count = lambda condition=None: Sum('transaction_count', filter=condition)
+    else:
+        source = transactions
+        field, amount = 'date', 'amount'
+        previous_start, start, end = period.previous_start, period.start, period.end
+        count = lambda condition=None: Count('id', filter=condition)
+    
+    window = source.filter(**{f'{field}__gte': previous_start, f'{field}__lt': end})
+    current = Q(**{f'{field}__gte': start})
+    previous = Q(**{f'{field}__lt': start})
+    
+    def totals():
+        return window.aggregate(
+            income=Sum(amount, filter=current & Q(type='income')),
+            expenses=Sum(amount, filter=current & Q(type='expense')),
+            count=count(current),
+            previous_income=Sum(amount, filter=previous & Q(type='income')),
+            previous_expenses=Sum(amount, filter=previous & Q(type='expense')),
+            previous_count=count(previous),
+        )
+    
+    def top_categories():
+        return list(
+            window.filter(current, type='expense')
+            .values('category__name', 'category__color')
+            .annotate(total=Sum(amount), count=count())
+            .filter(count__gt=0)
+            .order_by('-total')[:SUMMARY_TOP_CATEGORIES]
+        )
+    
+    if period.name == 'custom':
+        transactions = transactions.filter(date__gte=period.start, date__lt=period.end)
+    
+    return {
+        'totals': totals,
+        'top_categories': top_categories,
+        'recent_transactions': lambda: list(transactions[:SUMMARY_RECENT_TRANSACTIONS]),
+    }
+
+
+def _period_totals(income, expenses, transaction_count):
+    income, expenses = income or 0, expenses or 0
+    return {
+        'income': float(income),
+        'expenses': float(expenses),
+        'net': float(income - expenses),
+        'transaction_count': transaction_count or 0,
+    }
+
+
+def _percent_change(current, previous):
+    return round((current - previous) / abs(previous) * 100, 1) if previous else None
+
+
+def summary_payload(results, recent_transactions, period):
+    """Shape summary_queries() results into the response; `recent_transactions` is already serialized"""
+    totals = results['totals']
+    current = _period_totals(totals['income'], totals['expenses'], totals['count'])
+    previous = _period_totals(
+        totals['previous_income'], totals['previous_expenses'], totals['previous_count']
+    )
+    
+    payload = {
+        'period': {'name': period.name, 'start': period.start.isoformat(), 'end': period.end.isoformat()},
+        'current_period': current,
+        'previous_period': {
+            'start': period.previous_start.isoformat(),
+            'end': period.start.isoformat(),
+            **previous,
+        },
+        'change_percent': {key: _percent_change(current[key], previous[key]) for key in current},
+        'top_categories': results['top_categories'],
+        'recent_transactions': recent_transactions,
+    }
+    if period.name == 'month':
+        # The summary's original shape
+        payload['current_month'] = current
+    return payload
+
+
+def analytics_queries(user, transactions, tz, months=DEFAULT_TREND_MONTHS, use_rollups=True):
+    """Independent queries behind the analytics dashboard, keyed by response field"""
+    if use_rollups:
+        monthly_rollups = MonthlyRollup.objects.filter(user=user)
+        
+        def category_breakdown():
+            return list(
+                monthly_rollups.filter(type='expense')
+                .values('category__name', 'category__color')
+                .annotate(total=Sum('total_amount'), count=Sum('transaction_count'))
+                .filter(count__gt=0)
+                .values('category__name', 'category__color', 'total')
+                .order_by('-total')
+            )
+        
+        return {
+            'monthly_trends': lambda: rollup_monthly_trends(monthly_rollups, tz, months),
+            'category_breakdown': category_breakdown,
+        }
+    
+    def category_breakdown():
+        return list(
+            transactions.filter(type='expense')
+            .values('category__name', 'category__color')
+            .annotate(total=Sum('amount'))
+            .order_by('-total')
+        )
+    
+    return {
+        'monthly_trends': lambda: monthly_trends(transactions, tz, months),
+        'category_breakdown': category_breakdown,
+    }
@@ -0,0 +1,130 @@
+# transactions/async_views.py
+"""
+Async dashboard endpoints for ASGI deployments.
+
+The queries behind the summary and analytics dashboards are independent, so each one
+runs in its own worker thread with its own database connection and the response takes
+as long as the slowest query rather than the sum of all of them. (Django's async ORM
+methods would still run them one at a time on the shared thread-sensitive executor.)
+Responses are identical to, and cached together with, the TransactionViewSet actions.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import caching, routing
+from .analytics import (
+    analytics_queries,
+    parse_trend_months,
+    reads_rollups,
+    resolve_period,
+    summary_payload,
+    summary_queries,
+    user_timezone,
+    user_transactions,
+)
+from .serializers import TransactionListSerializer
+
+
+def _in_own_connection(query):
+    def run():
+        try:
+            return query()
+        finally:
+            # Worker threads are pooled; release the connection like the end of a request would
+            close_old_connections()
+    return run
+
+
+async def run_concurrently(queries):
+    """Run zero-argument ORM callables in parallel worker threads and return {name: result}"""
+    results = await asyncio.gather(*(
+        sync_to_async(_in_own_connection(query), thread_sensitive=False)()
+        for query in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
+def _authenticate(request):
+    result = JWTAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+def _json(data, status=status.HTTP_200_OK):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def dashboard_view(cache_view):
+    """
+    Wrap `build(request, user)` as an authenticated, per-user cached async GET view.
+    `cache_view` is the cache name of the equivalent viewset action, so both share entries.
+    """
+    def decorator(build):
+        @require_GET
+        async def view(request):
+            try:
+                user = await sync_to_async(_authenticate)(request)
+            except AuthenticationFailed as exc:
+                return _json({'detail': exc.detail}, status=status.HTTP_401_UNAUTHORIZED)
+            if user is None:
+                return _json(
+                    {'detail': 'Authentication credentials were not provided.'},
+                    status=status.HTTP_401_UNAUTHORIZED,
+                )
+
+            key = caching.response_key(user, cache_view, request.GET)
+            data = await cache.aget(key)
+            if data is None:
+                alias = routing.choose_read_alias(user)
+                with routing.reading_from(alias):
+                    data = await build(request, user)
+                if isinstance(data, JsonResponse):
+                    return data
+                await cache.aset(key, data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+            return _json(data)
+        return view
+    return decorator
+
+
+@dashboard_view('transaction.summary:{}')
+async def summary(request, user):
+    """Async counterpart of GET /api/transactions/summary/"""
+    tz = user_timezone(user)
+    try:
+        period = resolve_period(request.GET, tz)
+    except ValueError as exc:
+        return _json({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    queries = summary_queries(user, request.GET, tz, period, use_rollups=reads_rollups(request.GET))
+    results = await run_concurrently(queries)
+    recent_transactions = TransactionListSerializer(
+        results['recent_transactions'], many=True, context={'request': request}
+    ).data
+    return summary_payload(results, recent_transactions, period)
+
+
+@dashboard_view('transaction.analytics:{}')
+async def analytics(request, user):
+    """Async counterpart of GET /api/transactions/analytics/"""
+    try:
+        months = parse_trend_months(request.GET)
+    except ValueError as exc:
+        return _json({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    queries = analytics_queries(
+        user,
+        user_transactions(user, request.GET),
+        user_timezone(user),
+        months,
+        use_rollups=reads_rollups(request.GET),
+    )
+    return await run_concurrently(queries)
@@ -0,0 +1,216 @@
+# transactions/benchmarks.py
+"""
+API endpoint benchmarks.
+
+`run` calls each endpoint in ENDPOINTS in-process, as one user authenticated with a JWT
+like the frontend, and records status, response size, queries (summed over all database
+aliases) and wall time. The user's response cache is invalidated before every request
+unless `warm` is set, so timings are for cold responses, and write endpoints run inside a
+transaction that is rolled back, so the data set stays the same from run to run. Results
+are plain dicts meant to be stored as JSON and compared between commits with `compare`.
+
+Queries the async dashboard views run in their own worker-thread connections are not
+counted; only those on the request thread are.
+"""
+import statistics
+import time
+from contextlib import ExitStack, nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from budgets.models import BudgetBucket, Paycheck
+from . import caching
+from .models import Account, Category, Transaction
+
+BULK_CREATE_ROWS = 100
+IMPORT_ROWS = 100
+
+
+def _transaction_row(context, i=0):
+    return {
+        'amount': f'{10 + i % 90}.25',
+        'description': f'Benchmark row {i}',
+        'type': 'expense',
+        'date': timezone.now().isoformat(),
+        'category_id': context['category_id'],
+        'account_id': context['account_id'],
+    }
+
+
+def _statement(context):
+    lines = ['Date,Description,Amount'] + [
+        f"{context['today']},Benchmark import {i},-{10 + i % 90}.25" for i in range(IMPORT_ROWS)
+    ]
+    upload = SimpleUploadedFile('benchmark.csv', '\n'.join(lines).encode(), content_type='text/csv')
+    return {'file': upload, 'account_id': context['account_id']}
+
+
+def _new_paycheck(context):
+    paycheck = Paycheck.objects.create(
+        user=context['user'], amount=2500, date=timezone.localdate(), memo='Benchmark paycheck'
+    )
+    return {'paycheck_id': paycheck.id}
+
+
+# (name, method, path, request body, setup run before the request inside the rolled-back transaction)
+ENDPOINTS = [
+    ('transactions.list', 'get', '/api/transactions/', None, None),
+    ('transactions.list_cursor', 'get', '/api/transactions/?cursor=', None, None),
+    ('transactions.list_filtered', 'get', '/api/transactions/?type=expense&ordering=-amount', None, None),
+    ('transactions.search', 'get', '/api/transactions/?search=grocery', None, None),
+    ('transactions.detail', 'get', '/api/transactions/{transaction_id}/', None, None),
+    ('transactions.summary', 'get', '/api/transactions/summary/', None, None),
+    ('transactions.summary_custom', 'get', '/api/transactions/summary/?period=custom&start_date={quarter_ago}&end_date={today}', None, None),
+    ('transactions.analytics', 'get', '/api/transactions/analytics/', None, None),
+    ('transactions.analytics_filtered', 'get', '/api/transactions/analytics/?start_date={year_ago}', None, None),
+    ('transactions.tag_breakdown', 'get', '/api/transactions/tag_breakdown/', None, None),
+    ('transactions.forecast', 'get', '/api/transactions/forecast/', None, None),
+    ('transactions.export', 'get', '/api/transactions/export/?export_format=ndjson', None, None),
+    ('transactions.create', 'post', '/api/transactions/', _transaction_row, None),
+    ('transactions.update', 'put', '/api/transactions/{transaction_id}/', _transaction_row, None),
+    ('transactions.delete', 'delete', '/api/transactions/{transaction_id}/', None, None),
+    ('transactions.bulk_create', 'post', '/api/transactions/bulk_create/',
+     lambda context: {'transactions': [_transaction_row(context, i) for i in range(BULK_CREATE_ROWS)]}, None),
+    ('transactions.import_statement', 'post', '/api/transactions/import_statement/', _statement, None),
+    ('dashboard.summary', 'get', '/api/dashboard/summary/', None, None),
+    ('dashboard.analytics', 'get', '/api/dashboard/analytics/', None, None),
+    ('categories.list', 'get', '/api/categories/', None, None),
+    ('categories.by_type', 'get', '/api/categories/by_type/', None, None),
+    ('accounts.list', 'get', '/api/accounts/', None, None),
+    ('accounts.adjust_balance', 'post', '/api/accounts/{account_id}/adjust_balance/',
+     lambda context: {'amount': '25.00', 'reason': 'Benchmark adjustment'}, None),
+    ('recurring.list', 'get', '/api/recurring/', None, None),
+    ('budgets.buckets', 'get', '/api/budgets/buckets/', None, None),
+    ('budgets.progress', 'get', '/api/budgets/buckets/progress/', None, None),
+    ('budgets.income_transactions', 'get', '/api/budgets/buckets/income_transactions/', None, None),
+    ('budgets.paychecks', 'get', '/api/budgets/paychecks/', None, None),
+    ('budgets.paychecks_compact', 'get', '/api/budgets/paychecks/?compact=true', None, None),
+    ('budgets.allocate_money', 'post', '/api/budgets/buckets/{bucket_id}/allocate_money/',
+     lambda context: {'amount': '25.00', 'transaction_type': 'add'}, None),
+    ('budgets.allocate', 'post', '/api/budgets/paychecks/{paycheck_id}/allocate/',
+     lambda context: {'rule': 'proportional', 'bucket_ids': context['bucket_ids']}, _new_paycheck),
+]
+
+
+def endpoint_context(user):
+    """Ids and dates the endpoint paths and bodies refer to; raises ValueError for users without data"""
+    latest = Transaction.objects.filter(user=user).order_by('-date', '-id').first()
+    account = Account.objects.filter(user=user).order_by('id').first()
+    category = Category.objects.filter(user=user, type='expense').order_by('id').first()
+    if not (latest and account and category):
+        raise ValueError(f'{user} has no transactions to benchmark; run seed_synthetic first')
+    today = timezone.localdate()
+    bucket_ids = list(BudgetBucket.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+    return {
+        'user': user,
+        'transaction_id': latest.id,
+        'account_id': account.id,
+        'category_id': category.id,
+        'bucket_ids': bucket_ids,
+        'bucket_id': bucket_ids[0] if bucket_ids else None,
+        'today': today.isoformat(),
+        'quarter_ago': (today - timedelta(days=90)).isoformat(),
+        'year_ago': (today - timedelta(days=365)).isoformat(),
+    }
+
+
+def _client(user):
+    host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')), 'localhost')
+    client = APIClient(HTTP_HOST=host)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+def _request(client, method, path, body):
+    """Send one request; returns (response, content length, queries, seconds)"""
+    with ExitStack() as stack:
+        captures = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+        started = time.perf_counter()
+        if body is None:
+            response = getattr(client, method)(path)
+        else:
+            # Bodies carrying an upload are sent as a multipart form
+            request_format = 'multipart' if any(isinstance(value, File) for value in body.values()) else 'json'
+            response = getattr(client, method)(path, body, format=request_format)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        elapsed = time.perf_counter() - started
+    return response, len(content), sum(len(capture) for capture in captures), elapsed
+
+
+def measure(client, context, endpoint, repeat=5, warm=False):
+    name, method, path, body, setup = endpoint
+    timings = []
+    for _ in range(repeat):
+        if not warm:
+            caching.bump(context['user'].pk)
+        with transaction.atomic() if method != 'get' else nullcontext():
+            request_context = {**context, **(setup(context) if setup else {})}
+            response, size, queries, elapsed = _request(
+                client, method, path.format(**request_context), body(request_context) if body else None
+            )
+            if method != 'get':
+                transaction.set_rollback(True)
+        timings.append(elapsed * 1000)
+    return {
+        'method': method.upper(),
+        'path': path,
+        'status': response.status_code,
+        'queries': queries,
+        'bytes': size,
+        'ms': {
+            'min': round(min(timings), 2),
+            'median': round(statistics.median(timings), 2),
+            'max': round(max(timings), 2),
+        },
+    }
+
+
+def run(user, repeat=5, warm=False, only=None):
+    """Benchmark every endpoint (or those named in `only`) for `user`"""
+    context = endpoint_context(user)
+    client = _client(user)
+    endpoints = [endpoint for endpoint in ENDPOINTS if not only or endpoint[0] in only]
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'user': user.email,
+        'dataset': {
+            'transactions': Transaction.objects.filter(user=user).count(),
+            'accounts': Account.objects.filter(user=user).count(),
+            'buckets': len(context['bucket_ids']),
+            'paychecks': Paycheck.objects.filter(user=user).count(),
+        },
+        'repeat': repeat,
+        'warm': warm,
+        'endpoints': {endpoint[0]: measure(client, context, endpoint, repeat, warm) for endpoint in endpoints},
+    }
+
+
+def compare(baseline, results, threshold=0.2):
+    """
+    Endpoints that got worse than `baseline`: more queries, a different status or a median
+    time more than `threshold` (a fraction) slower. Returns {name: [reasons]}.
+    """
+    regressions = {}
+    for name, current in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        reasons = []
+        if current['status'] != before['status']:
+            reasons.append(f"status {before['status']} -> {current['status']}")
+        if current['queries'] > before['queries']:
+            reasons.append(f"queries {before['queries']} -> {current['queries']}")
+        if current['ms']['median'] > before['ms']['median'] * (1 + threshold):
+            reasons.append(f"median {before['ms']['median']} ms -> {current['ms']['median']} ms")
+        if reasons:
+            regressions[name] = reasons
+    return regressions
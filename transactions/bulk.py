@@ -0,0 +1,62 @@
+# transactions/bulk.py
+from django.conf import settings
+from django.db import transaction
+
+from . import ledger
+from .models import Transaction, Category, Account
+from .serializers import TransactionBulkRowSerializer
+
+DEFAULT_BATCH_SIZE = getattr(settings, 'TRANSACTIONS_BULK_BATCH_SIZE', 500)
+
+
+def _referenced_ids(rows, field):
+    ids = set()
+    for row in rows:
+        try:
+            ids.add(int(row.get(field)))
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return ids
+
+
+def validate_rows(user, rows, request=None):
+    """
+    Validate raw transaction rows for `user` without per-row queries.
+    Returns unsaved Transaction instances and a list of {index, errors} for rejected rows.
+    """
+    categories = {
+        category.id: category
+        for category in Category.objects.filter(user=user, id__in=_referenced_ids(rows, 'category_id'))
+    }
+    accounts = {
+        account.id: account
+        for account in Account.objects.filter(user=user, id__in=_referenced_ids(rows, 'account_id'))
+    }
+    context = {'request': request, 'categories': categories, 'accounts': accounts}
+
+    instances = []
+    errors = []
+    for i, row in enumerate(rows):
+        serializer = TransactionBulkRowSerializer(data=row, context=context)
+        if not serializer.is_valid():
+            errors.append({'index': i, 'errors': serializer.errors})
+            continue
+        data = dict(serializer.validated_data)
+        instances.append(Transaction(
+            user=user,
+            category=categories[data.pop('category_id')],
+            account=accounts[data.pop('account_id')],
+            **data
+        ))
+    return instances, errors
+
+
+@transaction.atomic
+def insert_transactions(transactions, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insert validated transactions in batches, then apply one balance UPDATE per account
+    and fold the rows into the monthly rollup.
+    """
+    created = Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+    ledger.post(created)
+    return created
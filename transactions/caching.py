@@ -0,0 +1,135 @@
+# transactions/caching.py
+"""
+Per-user response caching and conditional GETs.
+
+Every user has a data version column that any write to their transactions, categories,
+accounts or budgets moves once it commits, so cached responses built from an older version
+are simply never read again (and expire on their own). The version lives in the database
+rather than the cache, so every worker process agrees on it whatever the cache backend, and
+reading it costs nothing: authentication loads the user from the primary on every request.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.cache import patch_vary_headers
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+RESPONSE_KEY = 'user-response:{user_id}:{version}:{view}:{params}'
+
+
+def data_version(user):
+    """The user's data version as loaded with `user`, e.g. request.user"""
+    return user.data_version
+
+
+def bump(*user_ids):
+    """
+    Invalidate everything cached for the given users. The version moves once the surrounding
+    DB transaction commits: responses cached from pre-commit data are keyed by the old version,
+    and a rolled-back write leaves the cache valid.
+    """
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: _increment(user_ids))
+
+
+def _increment(user_ids):
+    get_user_model().objects.filter(pk__in=user_ids).update(
+        data_version=F('data_version') + 1, data_modified_at=timezone.now(),
+    )
+
+
+def last_modified(user):
+    """Unix time of the user's last write as loaded with `user`, None before the first"""
+    return user.data_modified_at.timestamp() if user.data_modified_at else None
+
+
+def bump_for_instance(sender, instance, **kwargs):
+    """post_save/post_delete receiver for models with a `user` foreign key"""
+    bump(instance.user_id)
+
+
+def _params_digest(query_params):
+    params = sorted((key, value) for key, values in query_params.lists() for value in values)
+    return hashlib.sha1(repr(params).encode()).hexdigest()
+
+
+def response_key(user, view, query_params):
+    """Cache key for a user's response from `view` at their current data version"""
+    return RESPONSE_KEY.format(
+        user_id=user.pk,
+        version=data_version(user),
+        view=view,
+        params=_params_digest(query_params),
+    )
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since'))
+    return bool(last_modified and if_modified_since and int(last_modified) <= if_modified_since)
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET for list/retrieve. The ETag and Last-Modified come from the user's
+    persisted data version and write time, so every worker validates them alike and a
+    matching If-None-Match/If-Modified-Since is answered with 304 Not Modified before
+    the queryset or serializer runs.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_get(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_get(super().retrieve, request, *args, **kwargs)
+
+    def _conditional_get(self, handler, request, *args, **kwargs):
+        user_id = request.user.pk
+        etag = quote_etag(hashlib.sha1(
+            f'{user_id}:{data_version(request.user)}:{request.path}:{_params_digest(request.query_params)}:'
+            f'{request.headers.get("Accept", "")}'.encode()
+        ).hexdigest())
+        modified = last_modified(request.user)
+
+        if _not_modified(request, etag, modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        response['ETag'] = etag
+        if modified:
+            response['Last-Modified'] = http_date(modified)
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+def cached_per_user(view_method):
+    """
+    Cache a viewset action's successful response per user, data version and query string.
+    Use below @action so the cached wrapper is what gets routed.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = response_key(request.user, f'{self.basename}.{view_method.__name__}:{kwargs}', request.query_params)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+    return wrapper
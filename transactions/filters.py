@@ -0,0 +1,29 @@
+# transactions/filters.py
+from rest_framework import filters
+
+from . import search
+
+
+class TransactionSearchFilter(filters.SearchFilter):
+    """`?search=` backed by the full-text index, falling back to icontains lookups"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        results = search.search(queryset, terms)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        return results
+
+
+class TransactionOrderingFilter(filters.OrderingFilter):
+    """Orders search results by relevance unless the client asks for an explicit ordering"""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        ranked = 'search_rank' in queryset.query.annotations
+        # Keyset pagination needs the stable date ordering
+        if ranked and self.ordering_param not in request.query_params and 'cursor' not in request.query_params:
+            return ['search_rank', *ordering]
+        return ordering
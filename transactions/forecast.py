@@ -0,0 +1,220 @@
+# transactions/forecast.py
+"""
+Cash-flow forecast.
+
+Each account's balance is projected from its current balance, the mean and spread of its
+daily net flow over a history window and the upcoming occurrences of its recurring
+schedules. The history arrives as one grouped values_list query (a row per account, type
+and day, not per transaction) and becomes an accounts x days matrix in NumPy, so the cost
+follows the window length rather than the size of the transaction table. Schedules are
+counted per forecast month from their step in the same way, not expanded one occurrence
+at a time.
+"""
+from datetime import datetime, time
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .analytics import user_timezone
+from .models import Account, RecurringTransaction, Transaction
+
+DEFAULT_FORECAST_MONTHS = 6
+MAX_FORECAST_MONTHS = 36
+DEFAULT_HISTORY_MONTHS = 6
+MAX_HISTORY_MONTHS = 36
+
+
+def parse_forecast_params(params):
+    """(months, history_months) from ?months= and ?history_months=; raises ValueError with a client-facing message"""
+    values = []
+    for name, default, maximum in (
+        ('months', DEFAULT_FORECAST_MONTHS, MAX_FORECAST_MONTHS),
+        ('history_months', DEFAULT_HISTORY_MONTHS, MAX_HISTORY_MONTHS),
+    ):
+        try:
+            value = int(params.get(name, default))
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be an integer')
+        if not 1 <= value <= maximum:
+            raise ValueError(f'{name} must be between 1 and {maximum}')
+        values.append(value)
+    return tuple(values)
+
+
+def _add_flows(matrix, account_ids, account_id_column, columns, amounts):
+    """np.add.at `amounts` into matrix[account row, column], dropping accounts not in `account_ids`"""
+    positions = np.searchsorted(account_ids, account_id_column)
+    known = positions < len(account_ids)
+    known[known] = account_ids[positions[known]] == account_id_column[known]
+    np.add.at(matrix, (positions[known], columns[known]), amounts[known])
+
+
+def _signed_legs(account_column, transfer_column, type_column, amounts):
+    """
+    Balance legs as (account ids, row index, signed amounts), following ledger.balance_effects:
+    income adds to the account, everything else takes from it and transfers add to the destination.
+    """
+    signs = np.where(type_column == 'income', 1.0, -1.0)
+    incoming = (type_column == 'transfer') & np.not_equal(transfer_column, None)
+    rows = np.arange(len(amounts))
+    return (
+        np.concatenate([account_column.astype(np.int64), transfer_column[incoming].astype(np.int64)]),
+        np.concatenate([rows, rows[incoming]]),
+        np.concatenate([signs * amounts, amounts[incoming]]),
+    )
+
+
+def daily_flows(user, tz, start, end, account_ids):
+    """
+    Net flow per account (rows, in `account_ids` order) and day (columns) over [start, end).
+    Transactions generated by recurring schedules are left out; their schedules are projected instead.
+    """
+    flows = np.zeros((len(account_ids), (end - start).days))
+    rows = list(
+        Transaction.objects.filter(
+            user=user,
+            recurring__isnull=True,
+            date__gte=datetime.combine(start, time.min, tzinfo=tz),
+            date__lt=datetime.combine(end, time.min, tzinfo=tz),
+        )
+        .annotate(day=TruncDate('date', tzinfo=tz))
+        .values_list('account_id', 'transfer_to_account_id', 'type', 'day')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    if not rows:
+        return flows
+
+    account_column, transfer_column, type_column, days, totals = zip(*rows)
+    legs, row_index, amounts = _signed_legs(
+        np.array(account_column),
+        np.array(transfer_column, dtype=object),
+        np.array(type_column),
+        np.array(totals, dtype=float),
+    )
+    columns = (np.array(days, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.int64)
+    _add_flows(flows, account_ids, legs, columns[row_index], amounts)
+    return flows
+
+
+def occurrence_dates(schedule, until):
+    """
+    Remaining occurrence dates of a schedule up to `until` (inclusive) as a datetime64[D] array,
+    the same dates recurring.due_occurrences steps through but computed for every index at once.
+    """
+    start = np.datetime64(schedule.start_date, 'D')
+    until = np.datetime64(until, 'D')
+    first = schedule.occurrence_count + 1  # next_occurrence is occurrence(occurrence_count)
+    last = until if schedule.end_date is None else min(until, np.datetime64(schedule.end_date, 'D'))
+    if schedule.frequency in ('daily', 'weekly'):
+        step = schedule.interval * (7 if schedule.frequency == 'weekly' else 1)
+        dates = start + np.arange(first, (last - start).astype(np.int64) // step + 1) * step
+    else:
+        step = schedule.interval * (12 if schedule.frequency == 'yearly' else 1)
+        start_month = start.astype('datetime64[M]')
+        months = start_month + np.arange(first, (last.astype('datetime64[M]') - start_month).astype(np.int64) // step + 1) * step
+        month_starts = months.astype('datetime64[D]')
+        month_lengths = ((months + 1).astype('datetime64[D]') - month_starts).astype(np.int64)
+        dates = month_starts + (np.minimum(schedule.start_date.day, month_lengths) - 1)
+        dates = dates[dates <= last]  # the last month's clamped day can still fall past `last`
+    if schedule.count is not None:
+        dates = dates[:max(schedule.count - first, 0)]
+    if schedule.next_occurrence is None or schedule.next_occurrence > until.item():
+        return dates[:0]
+    return np.concatenate([[np.datetime64(schedule.next_occurrence, 'D')], dates])
+
+
+def recurring_flows(user, account_ids, month_ends):
+    """
+    Net flow of active schedules per account (rows) and forecast month (columns): each
+    schedule's occurrences are counted per month and multiplied by its amount.
+    """
+    flows = np.zeros((len(account_ids), len(month_ends)))
+    horizon = (month_ends[-1] - np.timedelta64(1, 'D')).item()
+
+    schedules, counts = [], []
+    for schedule in RecurringTransaction.objects.filter(user=user, is_active=True, next_occurrence__isnull=False):
+        # Occurrences the scheduler has not caught up with yet land in the first month
+        columns = np.searchsorted(month_ends, occurrence_dates(schedule, horizon), side='right')
+        schedules.append((schedule.account_id, schedule.transfer_to_account_id, schedule.type, schedule.amount))
+        counts.append(np.bincount(columns, minlength=len(month_ends)))
+    if not schedules:
+        return flows
+
+    account_column, transfer_column, type_column, totals = zip(*schedules)
+    legs, row_index, amounts = _signed_legs(
+        np.array(account_column),
+        np.array(transfer_column, dtype=object),
+        np.array(type_column),
+        np.array(totals, dtype=float),
+    )
+    # One entry per leg and month: the leg's signed amount times its schedule's count that month
+    _add_flows(
+        flows,
+        account_ids,
+        np.repeat(legs, len(month_ends)),
+        np.tile(np.arange(len(month_ends)), len(legs)),
+        (amounts[:, None] * np.array(counts)[row_index]).ravel(),
+    )
+    return flows
+
+
+def project(user, months=DEFAULT_FORECAST_MONTHS, history_months=DEFAULT_HISTORY_MONTHS, today=None):
+    """
+    Projected end-of-month balances per active account and in total for the next `months`
+    months, with a one standard deviation band from the day-to-day variation of the history.
+    """
+    tz = user_timezone(user)
+    today = today or timezone.localdate(timezone=tz)
+    accounts = list(Account.objects.filter(user=user, is_active=True).order_by('id').values_list('id', 'name', 'balance'))
+    account_ids = np.array([account[0] for account in accounts], dtype=np.int64)
+
+    this_month = np.datetime64(today, 'M')
+    month_ends = (this_month + np.arange(1, months + 1)).astype('datetime64[D]')  # exclusive
+    history_start = (this_month - history_months).astype('datetime64[D]').item()
+
+    history = daily_flows(user, tz, history_start, today, account_ids)
+    scheduled = recurring_flows(user, account_ids, month_ends)
+    # The last row is the total over all accounts
+    history = np.vstack([history, history.sum(axis=0)])
+    scheduled = np.vstack([scheduled, scheduled.sum(axis=0)])
+    balances = np.array([float(account[2]) for account in accounts] + [0.0])
+    balances[-1] = balances[:-1].sum()
+
+    days_ahead = (month_ends - np.datetime64(today, 'D')).astype(np.int64)
+    daily_mean = history.mean(axis=1) if history.shape[1] else np.zeros(len(balances))
+    daily_std = history.std(axis=1) if history.shape[1] else np.zeros(len(balances))
+    projected = balances[:, None] + daily_mean[:, None] * days_ahead + scheduled.cumsum(axis=1)
+    spread = daily_std[:, None] * np.sqrt(days_ahead)
+
+    month_labels = [str(month) for month in month_ends.astype('datetime64[M]') - 1]
+    projected, low, high = (np.round(values, 2).tolist() for values in (projected, projected - spread, projected + spread))
+    scheduled = np.round(scheduled, 2).tolist()
+
+    def series(row):
+        return [
+            {'month': month, 'balance': projected[row][i], 'low': low[row][i], 'high': high[row][i], 'scheduled': scheduled[row][i]}
+            for i, month in enumerate(month_labels)
+        ]
+
+    return {
+        'as_of': today.isoformat(),
+        'history': {'start': history_start.isoformat(), 'end': today.isoformat(), 'days': history.shape[1]},
+        'accounts': [
+            {
+                'id': account_id,
+                'name': name,
+                'balance': float(balance),
+                'average_daily_net': round(float(daily_mean[row]), 2),
+                'forecast': series(row),
+            }
+            for row, (account_id, name, balance) in enumerate(accounts)
+        ],
+        'total': {
+            'balance': float(balances[-1]),
+            'average_daily_net': round(float(daily_mean[-1]), 2),
+            'forecast': series(len(accounts)),
+        },
+    }
@@ -0,0 +1,310 @@
+# transactions/importers.py
+"""
+Streaming bank-statement import.
+
+Statements are read as a pipeline of generators (lines -> parsed records -> batches),
+so only one batch of rows is held in memory regardless of the file size.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.utils import timezone
+
+from . import bulk
+from .analytics import user_timezone
+from .models import Transaction, Category, Account
+
+FORMATS = ('csv', 'ofx', 'qif')
+
+# Column names recognised in CSV headers when no explicit mapping is given
+CSV_COLUMNS = {
+    'date': ('date', 'posted date', 'transaction date', 'posting date'),
+    'amount': ('amount', 'value'),
+    'debit': ('debit', 'withdrawal'),
+    'credit': ('credit', 'deposit'),
+    'description': ('description', 'payee', 'name', 'merchant'),
+    'category': ('category',),
+    'account': ('account', 'account name'),
+    'type': ('type',),
+    'notes': ('notes', 'memo'),
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%Y/%m/%d', '%d.%m.%Y', '%Y%m%d')
+
+MAX_REPORTED_ERRORS = 100
+
+CENT = Decimal('0.01')
+# Amounts must fit Transaction.amount
+MAX_AMOUNT_DIGITS = Transaction._meta.get_field('amount').max_digits
+
+
+class StatementError(ValueError):
+    """A statement row that cannot be turned into a transaction"""
+
+
+def detect_format(filename):
+    """Guess the statement format from a file name, defaulting to CSV"""
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('ofx', 'qfx'):
+        return 'ofx'
+    if extension == 'qif':
+        return 'qif'
+    return 'csv'
+
+
+def text_lines(binary_file, encoding='utf-8-sig'):
+    """Decode a binary file object lazily, one line at a time"""
+    return io.TextIOWrapper(binary_file, encoding=encoding, errors='replace', newline='')
+
+
+def parse_amount(value):
+    """Parse a statement amount to whole cents; parentheses mean a negative amount"""
+    value = (value or '').strip().replace(',', '').replace('$', '')
+    negative = value.startswith('(') and value.endswith(')')
+    try:
+        amount = Decimal(value.strip('()'))
+        if not amount.is_finite():
+            raise InvalidOperation
+        # Overflows the context for huge exponents such as 1e40
+        amount = amount.quantize(CENT)
+    except InvalidOperation:
+        raise StatementError(f"Invalid amount '{value}'")
+    if len(amount.as_tuple().digits) > MAX_AMOUNT_DIGITS:
+        raise StatementError(f"Amount '{value}' is too large")
+    return -amount if negative else amount
+
+
+def parse_date(value, tz, date_format=None):
+    """Parse a statement date into an aware datetime in the user's timezone"""
+    value = (value or '').strip()
+    formats = ((date_format,) if date_format else ()) + DATE_FORMATS
+    parsed = None
+    for fmt in formats:
+        try:
+            parsed = datetime.strptime(value, fmt)
+            break
+        except ValueError:
+            continue
+    if parsed is None:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise StatementError(f"Invalid date '{value}'")
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=tz)
+    return parsed
+
+
+def parse_csv(lines, columns=None):
+    """
+    Yield (line_number, record) from CSV lines.
+    `columns` maps record fields to header names; unmapped fields are matched by CSV_COLUMNS.
+    """
+    reader = csv.DictReader(lines)
+    headers = {name.strip().lower(): name for name in (reader.fieldnames or [])}
+    mapping = {}
+    for field, aliases in CSV_COLUMNS.items():
+        if columns and field in columns:
+            mapping[field] = columns[field]
+            continue
+        for alias in aliases:
+            if alias in headers:
+                mapping[field] = headers[alias]
+                break
+
+    for row in reader:
+        yield reader.line_num, {field: (row.get(header) or '').strip() for field, header in mapping.items()}
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+def parse_ofx(lines):
+    """Yield (line_number, record) for every <STMTTRN> in an OFX/QFX statement (SGML or XML)"""
+    record = None
+    for line_number, line in enumerate(lines, start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and record is not None:
+                    yield line_number, record
+                    record = None
+                elif not closing:
+                    record = {}
+            elif record is not None and not closing:
+                value = value.strip()
+                if tag == 'DTPOSTED':
+                    record['date'] = value[:8]
+                elif tag == 'TRNAMT':
+                    record['amount'] = value
+                elif tag == 'NAME':
+                    record['description'] = value
+                elif tag == 'MEMO':
+                    record['notes'] = value
+                    record.setdefault('description', value)
+
+
+def parse_qif(lines):
+    """Yield (line_number, record) for every entry of a QIF statement"""
+    record = {}
+    for line_number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('!'):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == '^':
+            if record:
+                yield line_number, record
+            record = {}
+        elif code == 'D':
+            record['date'] = value.replace("'", '/').replace(' ', '0')
+        elif code in ('T', 'U'):
+            record['amount'] = value
+        elif code == 'P':
+            record['description'] = value
+        elif code == 'M':
+            record['notes'] = value
+        elif code == 'L':
+            record['category'] = value
+    if record:
+        yield line_number, record
+
+
+def read_statement(lines, fmt, columns=None):
+    """Dispatch to the parser for `fmt`"""
+    if fmt == 'ofx':
+        return parse_ofx(lines)
+    if fmt == 'qif':
+        return parse_qif(lines)
+    return parse_csv(lines, columns=columns)
+
+
+def batches(iterable, size):
+    """Group an iterable into lists of at most `size` items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class StatementImporter:
+    """
+    Map parsed statement records onto the user's accounts and categories, skip rows
+    already present before the import started, and insert the rest in batches.
+    """
+
+    def __init__(self, user, default_account=None, date_format=None,
+                 batch_size=bulk.DEFAULT_BATCH_SIZE, progress=None):
+        self.user = user
+        self.tz = user_timezone(user)
+        self.default_account = default_account
+        self.date_format = date_format
+        self.batch_size = batch_size
+        self.progress = progress
+        self.started_at = timezone.now()
+        self.accounts = {account.name.lower(): account for account in Account.objects.filter(user=user)}
+        self.categories = {
+            (category.name.lower(), category.type): category
+            for category in Category.objects.filter(user=user)
+        }
+        self.stats = {'rows': 0, 'created': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+
+    def run(self, records):
+        """Import (line_number, record) pairs and return the import statistics"""
+        for batch in batches(records, self.batch_size):
+            self._import_batch(batch)
+            if self.progress:
+                self.progress(self.stats)
+        return self.stats
+
+    def _import_batch(self, batch):
+        candidates = []
+        for line_number, record in batch:
+            self.stats['rows'] += 1
+            try:
+                candidates.append(self.build(record))
+            except StatementError as exc:
+                self._error(line_number, str(exc))
+
+        new_transactions = self._without_duplicates(candidates)
+        self.stats['duplicates'] += len(candidates) - len(new_transactions)
+        if new_transactions:
+            bulk.insert_transactions(new_transactions, batch_size=self.batch_size)
+            self.stats['created'] += len(new_transactions)
+
+    def _error(self, line_number, message):
+        self.stats['error_count'] += 1
+        if len(self.stats['errors']) < MAX_REPORTED_ERRORS:
+            self.stats['errors'].append({'line': line_number, 'error': message})
+
+    def build(self, record):
+        """Turn one parsed record into an unsaved Transaction"""
+        if record.get('amount'):
+            amount = parse_amount(record['amount'])
+        else:
+            # Split debit/credit columns
+            amount = parse_amount(record.get('credit') or '0') - abs(parse_amount(record.get('debit') or '0'))
+        # Checked after rounding to cents, so 0.004 is zero too
+        if not amount:
+            raise StatementError('Amount is zero or missing')
+        if len(amount.as_tuple().digits) > MAX_AMOUNT_DIGITS:
+            raise StatementError('Amount is too large')
+
+        transaction_type = (record.get('type') or '').lower()
+        if transaction_type not in ('income', 'expense'):
+            transaction_type = 'expense' if amount < 0 else 'income'
+
+        account_name = (record.get('account') or '').lower()
+        account = self.accounts.get(account_name) if account_name else self.default_account
+        if account is None:
+            raise StatementError(f"Unknown account '{record.get('account', '')}'")
+
+        return Transaction(
+            user=self.user,
+            account=account,
+            category=self._category(record.get('category'), transaction_type),
+            type=transaction_type,
+            amount=abs(amount),
+            date=parse_date(record.get('date'), self.tz, self.date_format),
+            description=(record.get('description') or 'Imported transaction')[:255],
+            notes=record.get('notes') or None,
+        )
+
+    def _category(self, name, transaction_type):
+        """The user's category with this name and type, else a shared 'Uncategorized' one"""
+        category = self.categories.get(((name or '').lower(), transaction_type))
+        if category is None:
+            key = ('uncategorized', transaction_type)
+            if key not in self.categories:
+                self.categories[key], _ = Category.objects.get_or_create(
+                    name='Uncategorized',
+                    user=self.user,
+                    type=transaction_type,
+                    defaults={'color': '#6B7280', 'icon': 'help-circle'},
+                )
+            category = self.categories[key]
+        return category
+
+    def _without_duplicates(self, candidates):
+        """Drop candidates matching a row that existed before this import started"""
+        if not candidates:
+            return candidates
+        existing = set(
+            Transaction.objects.filter(
+                user=self.user,
+                account_id__in={txn.account_id for txn in candidates},
+                date__gte=min(txn.date for txn in candidates),
+                date__lte=max(txn.date for txn in candidates),
+                created_at__lt=self.started_at,
+            ).values_list('account_id', 'date', 'amount', 'description')
+        )
+        return [
+            txn for txn in candidates
+            if (txn.account_id, txn.date, txn.amount, txn.description) not in existing
+        ]
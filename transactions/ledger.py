@@ -0,0 +1,97 @@
+# transactions/ledger.py
+"""
+Account balance bookkeeping.
+
+Balances are only ever changed with `UPDATE ... SET balance = balance + delta`, so
+concurrent writers cannot overwrite each other's changes the way a Python-side
+read-modify-write would. Posting also keeps the monthly rollups and the normalized
+tag rows in step with the transactions.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from . import caching, rollups, tags
+from .models import Account
+
+
+def balance_effects(transactions, sign=1):
+    """
+    Net balance change per account id. Income adds to the account, expenses and
+    transfers take from it, and transfers add to `transfer_to_account`.
+    """
+    deltas = defaultdict(Decimal)
+    for txn in transactions:
+        amount = sign * Decimal(str(txn.amount))
+        if txn.type == 'income':
+            deltas[txn.account_id] += amount
+        else:
+            deltas[txn.account_id] -= amount
+        if txn.type == 'transfer' and txn.transfer_to_account_id:
+            deltas[txn.transfer_to_account_id] += amount
+    return {account_id: delta for account_id, delta in deltas.items() if delta}
+
+
+def merge(*deltas):
+    """Sum several balance_effects() results"""
+    merged = defaultdict(Decimal)
+    for effect in deltas:
+        for account_id, delta in effect.items():
+            merged[account_id] += delta
+    return {account_id: delta for account_id, delta in merged.items() if delta}
+
+
+def apply_deltas(deltas):
+    """
+    Atomic `balance = balance + delta` UPDATEs. Several accounts are first locked in id
+    order, so concurrent callers queue consistently, then moved by one grouped UPDATE
+    per rollups.GROUPED_UPDATE_SIZE accounts.
+    """
+    now = timezone.now()
+    account_ids = sorted(deltas)
+    if len(account_ids) == 1:
+        Account.objects.filter(id=account_ids[0]).update(
+            balance=F('balance') + deltas[account_ids[0]],
+            updated_at=now,
+        )
+        return
+    
+    list(Account.objects.select_for_update().filter(id__in=account_ids).order_by('id').values_list('id'))
+    for start in range(0, len(account_ids), rollups.GROUPED_UPDATE_SIZE):
+        group = account_ids[start:start + rollups.GROUPED_UPDATE_SIZE]
+        delta = Case(
+            *(When(id=account_id, then=Value(deltas[account_id])) for account_id in group),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+        Account.objects.filter(id__in=group).update(balance=F('balance') + delta, updated_at=now)
+
+
+@transaction.atomic
+def post(transactions):
+    """Apply newly saved transactions to account balances, the monthly rollup and tags"""
+    apply_deltas(balance_effects(transactions))
+    rollups.record(transactions)
+    tags.sync_tags([txn for txn in transactions if txn.tags])
+    caching.bump(*(txn.user_id for txn in transactions))
+
+
+@transaction.atomic
+def unpost(transactions):
+    """Remove the effect of transactions that are about to be deleted"""
+    apply_deltas(balance_effects(transactions, sign=-1))
+    rollups.record(transactions, sign=-1)
+    caching.bump(*(txn.user_id for txn in transactions))
+
+
+@transaction.atomic
+def repost(old, new):
+    """Replace the effect of `old` (a copy of the row before editing) with that of `new`"""
+    apply_deltas(merge(balance_effects([old], sign=-1), balance_effects([new])))
+    rollups.record([old], sign=-1)
+    rollups.record([new])
+    if old.tags != new.tags:
+        tags.sync_tags([new])
+    caching.bump(old.user_id, new.user_id)
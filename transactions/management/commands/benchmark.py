@@ -0,0 +1,72 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from transactions import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the API endpoints and count their queries as one user, optionally saving the results '
+        'as JSON and failing on regressions against an earlier run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the user to benchmark as (default: the user with the most transactions)')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per endpoint')
+        parser.add_argument('--warm', action='store_true', help="Keep the user's response cache between requests")
+        parser.add_argument('--only', action='append', help='Benchmark only this endpoint, e.g. transactions.summary (repeatable)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Baseline JSON from an earlier run; exit with an error on regressions')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Median slowdown, as a fraction, that counts as a regression')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be positive')
+        unknown = set(options['only'] or []) - {endpoint[0] for endpoint in benchmarks.ENDPOINTS}
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        users = get_user_model().objects
+        if options['user']:
+            user = users.filter(email=options['user']).first()
+        else:
+            user = users.annotate(transaction_count=Count('transactions')).order_by('-transaction_count', 'id').first()
+        if user is None:
+            raise CommandError('No such user')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        try:
+            results = benchmarks.run(user, options['repeat'], options['warm'], options['only'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(f"{results['user']} on {results['database']}: " + ', '.join(
+            f'{count} {name}' for name, count in results['dataset'].items()
+        ))
+        self.stdout.write(f"{'endpoint':32} {'status':>6} {'queries':>7} {'bytes':>9} {'median ms':>10} {'max ms':>9}")
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:32} {result['status']:>6} {result['queries']:>7} {result['bytes']:>9} "
+                f"{result['ms']['median']:>10} {result['ms']['max']:>9}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Saved results to {options['output']}")
+
+        if baseline is not None:
+            regressions = benchmarks.compare(baseline, results, options['threshold'])
+            for name, reasons in regressions.items():
+                self.stdout.write(self.style.ERROR(f"{name}: {'; '.join(reasons)}"))
+            if regressions:
+                raise CommandError(f'{len(regressions)} endpoints regressed against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions import importers
+from transactions.bulk import DEFAULT_BATCH_SIZE
+from transactions.models import Account
+
+
+class Command(BaseCommand):
+    help = 'Stream CSV, OFX or QIF bank statements into a user\'s transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user who owns the statements')
+        parser.add_argument('paths', nargs='+', help='Statement files to import')
+        parser.add_argument('--format', choices=importers.FORMATS,
+                            help='Statement format (default: guessed from the file extension)')
+        parser.add_argument('--account', help='Account name for rows without an account column')
+        parser.add_argument('--date-format', help='strptime format of the date column, e.g. %%d/%%m/%%Y')
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User '{options['email']}' does not exist")
+
+        default_account = None
+        if options['account']:
+            default_account = Account.objects.filter(user=user, name=options['account']).first()
+            if default_account is None:
+                raise CommandError(f"Account '{options['account']}' does not exist")
+
+        for path in options['paths']:
+            statement_format = options['format'] or importers.detect_format(path)
+            importer = importers.StatementImporter(
+                user,
+                default_account=default_account,
+                date_format=options['date_format'],
+                batch_size=options['batch_size'],
+                progress=self.report_progress,
+            )
+            with open(path, 'rb') as statement:
+                lines = importers.text_lines(statement, encoding=options['encoding'])
+                stats = importer.run(importers.read_statement(lines, statement_format))
+
+            for error in stats['errors']:
+                self.stdout.write(self.style.WARNING(f"  line {error['line']}: {error['error']}"))
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: {stats['created']} created, {stats['duplicates']} duplicates skipped, "
+                f"{stats['error_count']} errors out of {stats['rows']} rows"
+            ))
+
+    def report_progress(self, stats):
+        self.stdout.write(f"  {stats['rows']} rows read, {stats['created']} created")
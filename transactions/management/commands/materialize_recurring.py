@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from transactions import recurring
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the transactions of all recurring schedules due up to a date, a chunk of schedules '
+        'per database transaction; safe to rerun or run in parallel'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Materialize occurrences up to this date, YYYY-MM-DD (default: today)')
+        parser.add_argument('--chunk-size', type=int, default=recurring.DEFAULT_CHUNK_SIZE,
+                            help='Schedules per chunk')
+
+    def handle(self, *args, **options):
+        until = timezone.localdate()
+        if options['date']:
+            try:
+                until = parse_date(options['date'])
+            except ValueError:
+                until = None
+            if until is None:
+                raise CommandError('--date must be YYYY-MM-DD')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        schedules = created = 0
+        for processed, inserted in recurring.materialize(until, options['chunk_size']):
+            schedules += processed
+            created += inserted
+            self.stdout.write(f'{schedules} schedules, {created} transactions')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Materialized {created} transactions from {schedules} schedules due by {until}'
+        ))
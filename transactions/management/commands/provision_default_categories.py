@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from transactions.models import provision_default_categories
+
+
+class Command(BaseCommand):
+    help = 'Create any missing default categories for existing users, a batch of users per INSERT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Users per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = get_user_model().objects.order_by('id').only('id')
+
+        processed = 0
+        batch = []
+        for user in users.iterator(chunk_size=batch_size):
+            batch.append(user)
+            if len(batch) == batch_size:
+                provision_default_categories(batch)
+                processed += len(batch)
+                batch = []
+                self.stdout.write(f'{processed} users provisioned')
+        if batch:
+            provision_default_categories(batch)
+            processed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Default categories provisioned for {processed} users'))
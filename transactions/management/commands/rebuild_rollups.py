@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from transactions import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly transaction rollups from scratch, or report drift with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only process this user id (repeatable)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Report rollup rows that differ from the transactions without rewriting them')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        drifted_users = 0
+        for user in users.iterator():
+            if options['verify']:
+                drift = rollups.drift(user)
+                if drift:
+                    drifted_users += 1
+                    self.stdout.write(self.style.WARNING(f'{user}: {len(drift)} rollup rows drifted'))
+                    for row in drift:
+                        self.stdout.write(f"  {row['key']} expected={row['expected']} stored={row['stored']}")
+            else:
+                count = rollups.rebuild(user)
+                self.stdout.write(f'{user}: {count} rollup rows')
+
+        if options['verify']:
+            if drifted_users:
+                self.stdout.write(self.style.ERROR(f'{drifted_users} users have drifted rollups'))
+            else:
+                self.stdout.write(self.style.SUCCESS('Rollups match the transaction table'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Rollups rebuilt'))
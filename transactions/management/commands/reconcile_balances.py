@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from transactions import reconcile
+from transactions.models import Account
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute account balances from their transactions and report drift. '
+        'Run several processes over disjoint --min-user-id/--max-user-id ranges to parallelize.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Write the recomputed balances')
+        parser.add_argument('--min-user-id', type=int, help='First user id to process (inclusive)')
+        parser.add_argument('--max-user-id', type=int, help='Last user id to process (inclusive)')
+        parser.add_argument('--batch-size', type=int, default=reconcile.DEFAULT_USER_BATCH_SIZE,
+                            help='Users per grouped query')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('id')
+        if options['min_user_id'] is not None:
+            users = users.filter(id__gte=options['min_user_id'])
+        if options['max_user_id'] is not None:
+            users = users.filter(id__lte=options['max_user_id'])
+        user_ids = users.values_list('id', flat=True).iterator()
+
+        drifted_total = 0
+        for first_id, last_id in reconcile.user_id_batches(user_ids, options['batch_size']):
+            accounts = Account.objects.filter(user_id__gte=first_id, user_id__lte=last_id)
+            drifted = reconcile.reconcile(accounts, fix=options['fix'])
+            drifted_total += len(drifted)
+            for row in drifted:
+                self.stdout.write(
+                    f"account {row['account_id']} ({row['name']}, user {row['user_id']}): "
+                    f"stored {row['stored']}, expected {row['expected']}, drift {row['drift']}"
+                )
+            self.stdout.write(f'users {first_id}-{last_id}: {len(drifted)} drifted accounts')
+
+        if not drifted_total:
+            self.stdout.write(self.style.SUCCESS('All balances match their transactions'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {drifted_total} account balances'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{drifted_total} accounts drifted; rerun with --fix to correct them'))
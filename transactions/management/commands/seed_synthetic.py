@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic users with accounts, transactions, recurring schedules, budget buckets, '
+        'paychecks and allocations, using bulk inserts (1k to 10M transactions)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Users to create')
+        parser.add_argument('--transactions', type=int, default=10000, help='Transactions in total, split across the users')
+        parser.add_argument('--months', type=int, default=24, help='Months of history')
+        parser.add_argument('--accounts', type=int, default=3, help='Accounts per user')
+        parser.add_argument('--buckets', type=int, default=6, help='Budget buckets per user')
+        parser.add_argument('--paychecks', type=int, default=24,
+                            help='Paychecks per user, made from their latest income transactions')
+        parser.add_argument('--prefix', default='synthetic', help='Username prefix; must not be in use yet')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=synthetic.DEFAULT_BATCH_SIZE,
+                            help='Transactions per INSERT batch')
+
+    def handle(self, *args, **options):
+        if options['transactions'] < options['users'] or options['months'] < 1 or options['batch_size'] < 1:
+            raise CommandError('Need at least one transaction per user, one month of history and a positive batch size')
+
+        def progress(inserted):
+            self.stdout.write(f"{inserted} / {options['transactions']} transactions")
+
+        try:
+            counts = synthetic.seed(
+                users=options['users'],
+                transactions=options['transactions'],
+                months=options['months'],
+                accounts_per_user=options['accounts'],
+                buckets_per_user=options['buckets'],
+                paychecks_per_user=options['paychecks'],
+                prefix=options['prefix'],
+                random_seed=options['seed'],
+                batch_size=options['batch_size'],
+                progress=progress,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+            + f"; sign in as {options['prefix']}0@example.com / {synthetic.PASSWORD}"
+        ))
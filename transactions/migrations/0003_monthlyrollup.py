@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:19
+
+import django.db.models.deletion
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Transaction = apps.get_model('transactions', 'Transaction')
+    MonthlyRollup = apps.get_model('transactions', 'MonthlyRollup')
+
+    for user in User.objects.iterator():
+        try:
+            tz = ZoneInfo(user.timezone or 'UTC')
+        except (ZoneInfoNotFoundError, ValueError):
+            tz = ZoneInfo('UTC')
+        rows = (
+            Transaction.objects.filter(user=user)
+            .annotate(month=TruncMonth('date', output_field=models.DateField(), tzinfo=tz))
+            .values('account_id', 'category_id', 'month', 'type')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+        MonthlyRollup.objects.bulk_create([
+            MonthlyRollup(
+                user=user, account_id=row['account_id'], category_id=row['category_id'],
+                month=row['month'], type=row['type'],
+                total_amount=row['total'], transaction_count=row['count'],
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_account_currency_account_description'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense'), ('transfer', 'Transfer')], max_length=10)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='transactions.account')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='transactions.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['user', 'month'], name='transaction_user_id_deed3f_idx')],
+                'unique_together': {('user', 'account', 'category', 'month', 'type')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:26
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def set_opening_balances(apps, schema_editor):
+    """Treat existing balances as correct: the opening balance is whatever the ledger doesn't explain"""
+    Account = apps.get_model('transactions', 'Account')
+    Transaction = apps.get_model('transactions', 'Transaction')
+
+    sums = defaultdict(Decimal)
+    outgoing = (
+        Transaction.objects.values('account_id')
+        .annotate(income=Sum('amount', filter=Q(type='income')), spent=Sum('amount', filter=~Q(type='income')))
+        .order_by()
+    )
+    for row in outgoing:
+        sums[row['account_id']] += (row['income'] or 0) - (row['spent'] or 0)
+    incoming = (
+        Transaction.objects.filter(type='transfer', transfer_to_account__isnull=False)
+        .values('transfer_to_account_id')
+        .annotate(received=Sum('amount'))
+        .order_by()
+    )
+    for row in incoming:
+        sums[row['transfer_to_account_id']] += row['received'] or 0
+
+    accounts = list(Account.objects.only('id', 'balance'))
+    for account in accounts:
+        account.opening_balance = account.balance - sums.get(account.id, Decimal('0'))
+    Account.objects.bulk_update(accounts, ['opening_balance'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_transaction_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(set_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def _parse_tags(value):
+    names = []
+    for part in (value or '').split(','):
+        name = ' '.join(part.split()).lower()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def backfill_tags(apps, schema_editor):
+    """Create Tag/TransactionTag rows from the existing comma-separated strings"""
+    Tag = apps.get_model('transactions', 'Tag')
+    Transaction = apps.get_model('transactions', 'Transaction')
+    TransactionTag = apps.get_model('transactions', 'TransactionTag')
+
+    tagged = Transaction.objects.exclude(tags='').order_by('id').values_list('id', 'user_id', 'tags')
+    last_id = 0
+    while True:
+        batch = list(tagged.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        wanted = [(transaction_id, user_id, _parse_tags(tags)) for transaction_id, user_id, tags in batch]
+        pairs = {(user_id, name) for _, user_id, names in wanted for name in names}
+        Tag.objects.bulk_create([Tag(user_id=user_id, name=name) for user_id, name in pairs], ignore_conflicts=True)
+        tag_ids = {
+            (user_id, name): tag_id
+            for tag_id, user_id, name in Tag.objects.filter(
+                user_id__in={user_id for user_id, _ in pairs}, name__in={name for _, name in pairs}
+            ).values_list('id', 'user_id', 'name')
+        }
+        TransactionTag.objects.bulk_create(
+            [
+                TransactionTag(transaction_id=transaction_id, tag_id=tag_ids[user_id, name])
+                for transaction_id, user_id, names in wanted
+                for name in names
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_transaction_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('user', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_tags', to='transactions.tag')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_tags', to='transactions.transaction')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, related_name='transactions', through='transactions.TransactionTag', to='transactions.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='transactiontag',
+            index=models.Index(fields=['tag', 'transaction'], name='transaction_tag_id_c8610f_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='transactiontag',
+            unique_together={('transaction', 'tag')},
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
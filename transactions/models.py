@@ -1,8 +1,13 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
+from calendar import monthrange
+from datetime import date, timedelta
 from decimal import Decimal
 
+from .caching import bump, bump_for_instance
+
 User = get_user_model()
 
 class Category(models.Model):
@@ -38,6 +43,8 @@ class Account(models.Model):
     name = models.CharField(max_length=100)
     type = models.CharField(max_length=20, choices=ACCOUNT_TYPES)
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    # Balance not explained by transactions: the starting balance plus manual edits
+    opening_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     currency = models.CharField(max_length=3, default='USD')  # ← Add this
     description = models.TextField(blank=True, null=True)     # ← Add this
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='accounts')
@@ -72,9 +79,15 @@ class Transaction(models.Model):
     receipt_image = models.ImageField(upload_to='receipts/', blank=True, null=True)
     tags = models.CharField(max_length=255, blank=True, help_text="Comma-separated tags")
     
+    tag_set = models.ManyToManyField('Tag', through='TransactionTag', related_name='transactions', blank=True)
+    
     # Transfer specific fields
     transfer_to_account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='transfers_in')
     
+    # Set on rows generated from a schedule; (recurring, occurrence_date) identifies the occurrence
+    recurring = models.ForeignKey('RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
+    occurrence_date = models.DateField(null=True, blank=True)
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -85,6 +98,12 @@ class Transaction(models.Model):
             models.Index(fields=['user', 'date']),
             models.Index(fields=['user', 'type']),
             models.Index(fields=['user', 'category']),
+            # Keyset pagination of the transaction list
+            models.Index(fields=['user', '-date', '-created_at', 'id']),
+        ]
+        constraints = [
+            # Each occurrence of a schedule is materialized at most once
+            models.UniqueConstraint(fields=['recurring', 'occurrence_date'], name='unique_recurring_occurrence'),
         ]
     
     def save(self, *args, **kwargs):
@@ -114,50 +133,176 @@ class Transaction(models.Model):
         return f"{self.get_type_display()}: ${self.amount} - {self.description}"
 
 
-# Create default categories for new users
-def create_default_categories(user):
-    """Create default categories for a new user"""
-    default_expense_categories = [
-        ('Food & Dining', '#EF4444', 'utensils'),
-        ('Transportation', '#3B82F6', 'car'),
-        ('Shopping', '#8B5CF6', 'shopping-bag'),
-        ('Entertainment', '#F59E0B', 'film'),
-        ('Bills & Utilities', '#10B981', 'zap'),
-        ('Healthcare', '#F97316', 'heart'),
-        ('Other', '#6B7280', 'more-horizontal'),
-    ]
+class Tag(models.Model):
+    """A user's tag, normalized from the comma-separated `Transaction.tags` string"""
+    name = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['user', 'name']
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class TransactionTag(models.Model):
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='transaction_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='transaction_tags')
     
-    default_income_categories = [
-        ('Salary', '#059669', 'briefcase'),
-        ('Freelance', '#DC2626', 'laptop'),
-        ('Investment', '#7C3AED', 'trending-up'),
-        ('Other Income', '#6B7280', 'plus-circle'),
+    class Meta:
+        unique_together = ['transaction', 'tag']
+        indexes = [
+            # ?tag= filtering and tag breakdowns start from the tag
+            models.Index(fields=['tag', 'transaction']),
+        ]
+    
+    def __str__(self):
+        return f"{self.transaction_id} #{self.tag_id}"
+
+
+class RecurringTransaction(models.Model):
+    """
+    An rrule-style schedule (FREQ, INTERVAL, DTSTART, UNTIL, COUNT) for a transaction that
+    `manage.py materialize_recurring` turns into Transaction rows as occurrences come due.
+    """
+    FREQUENCIES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
     ]
     
-    # Create expense categories
-    for name, color, icon in default_expense_categories:
-        Category.objects.get_or_create(
-            name=name,
-            user=user,
-            type='expense',
-            defaults={'color': color, 'icon': icon, 'is_default': True}
-        )
-    
-    # Create income categories
-    for name, color, icon in default_income_categories:
-        Category.objects.get_or_create(
-            name=name,
-            user=user,
-            type='income',
-            defaults={'color': color, 'icon': icon, 'is_default': True}
-        )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_transactions')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='recurring_transactions')
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='recurring_transactions')
+    transfer_to_account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='recurring_transfers_in')
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
+    description = models.CharField(max_length=255)
+    notes = models.TextField(blank=True, null=True)
+    tags = models.CharField(max_length=255, blank=True, help_text="Comma-separated tags")
+    
+    # Schedule: every `interval` days/weeks/months/years from start_date, through end_date
+    # and/or for `count` occurrences. Monthly dates past the end of a short month fall on its last day.
+    frequency = models.CharField(max_length=10, choices=FREQUENCIES)
+    interval = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True)
+    
+    # Scheduler state: occurrences handled so far and the date of the next one (None once the schedule ends)
+    occurrence_count = models.PositiveIntegerField(default=0)
+    next_occurrence = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['next_occurrence', 'id']
+        indexes = [
+            # The scheduler's queue of due schedules
+            models.Index(fields=['next_occurrence', 'id'], condition=models.Q(is_active=True), name='recurring_due_idx'),
+        ]
+    
+    def occurrence(self, index):
+        """Date of the zero-based `index`th occurrence, or None past end_date/count"""
+        if self.count is not None and index >= self.count:
+            return None
+        steps = index * self.interval
+        if self.frequency == 'daily':
+            day = self.start_date + timedelta(days=steps)
+        elif self.frequency == 'weekly':
+            day = self.start_date + timedelta(weeks=steps)
+        else:
+            months = steps * 12 if self.frequency == 'yearly' else steps
+            year, month = divmod(self.start_date.year * 12 + self.start_date.month - 1 + months, 12)
+            day = date(year, month + 1, min(self.start_date.day, monthrange(year, month + 1)[1]))
+        if self.end_date and day > self.end_date:
+            return None
+        return day
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.next_occurrence is None and not self.occurrence_count:
+            self.next_occurrence = self.occurrence(0)
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.description} ({self.get_frequency_display()}, next {self.next_occurrence})"
+
+
+class MonthlyRollup(models.Model):
+    """Per-user monthly totals by account, category and type, kept up to date on every write"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_rollups')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='monthly_rollups')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField()  # First day of the month in the user's timezone
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user', 'account', 'category', 'month', 'type']
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['user', 'month']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} {self.month:%Y-%m} {self.type}: ${self.total_amount} ({self.transaction_count})"
+
+
+# Default categories for new users: (name, type, color, icon).
+# Override with the TRANSACTIONS_DEFAULT_CATEGORIES setting.
+DEFAULT_CATEGORIES = [
+    ('Food & Dining', 'expense', '#EF4444', 'utensils'),
+    ('Transportation', 'expense', '#3B82F6', 'car'),
+    ('Shopping', 'expense', '#8B5CF6', 'shopping-bag'),
+    ('Entertainment', 'expense', '#F59E0B', 'film'),
+    ('Bills & Utilities', 'expense', '#10B981', 'zap'),
+    ('Healthcare', 'expense', '#F97316', 'heart'),
+    ('Other', 'expense', '#6B7280', 'more-horizontal'),
+    ('Salary', 'income', '#059669', 'briefcase'),
+    ('Freelance', 'income', '#DC2626', 'laptop'),
+    ('Investment', 'income', '#7C3AED', 'trending-up'),
+    ('Other Income', 'income', '#6B7280', 'plus-circle'),
+]
+
+
+def provision_default_categories(users, batch_size=1000):
+    """Create any missing default categories for the given users with bulk inserts"""
+    templates = getattr(settings, 'TRANSACTIONS_DEFAULT_CATEGORIES', DEFAULT_CATEGORIES)
+    users = list(users)
+    Category.objects.bulk_create(
+        [
+            Category(user=user, name=name, type=category_type, color=color, icon=icon, is_default=True)
+            for user in users
+            for name, category_type, color, icon in templates
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    bump(*(user.pk for user in users))
+
+
+def create_default_categories(user):
+    """Create default categories for a new user"""
+    provision_default_categories([user])
 
 
 # Signal to create default categories when user is created
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
 def create_user_defaults(sender, instance, created, **kwargs):
     if created:
-        create_default_categories(instance)
\ No newline at end of file
+        create_default_categories(instance)
+
+
+# Invalidate the user's cached responses on every write
+for model in (Transaction, Category, Account, RecurringTransaction):
+    post_save.connect(bump_for_instance, sender=model, dispatch_uid=f'bump-{model.__name__}-save')
+    post_delete.connect(bump_for_instance, sender=model, dispatch_uid=f'bump-{model.__name__}-delete')
@@ -0,0 +1,37 @@
+# transactions/pagination.py
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class TransactionCursorPagination(CursorPagination):
+    """Keyset pagination over the transaction list's default ordering; no COUNT query"""
+    ordering = ('-date', '-created_at', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class TransactionPagination(PageNumberPagination):
+    """
+    Page numbers by default; switches to keyset pagination when the request carries
+    `?cursor=` (empty for the first page), so deep pages cost the same as the first one.
+    """
+    cursor_pagination_class = TransactionCursorPagination
+    cursor_query_param = TransactionCursorPagination.cursor_query_param
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
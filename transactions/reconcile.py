@@ -0,0 +1,96 @@
+# transactions/reconcile.py
+"""
+Recompute account balances from the transaction ledger.
+
+An account's expected balance is its opening balance plus income, minus expenses
+and outgoing transfers, plus incoming transfers. Accounts are processed a batch
+of users at a time, with one grouped aggregate per direction of money movement.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum, Q, Subquery
+from django.utils import timezone
+
+from . import caching
+from .models import Account, Transaction
+
+DEFAULT_USER_BATCH_SIZE = 500
+
+
+def ledger_sums(accounts):
+    """Net transaction effect per account id for the given Account queryset"""
+    account_ids = Subquery(accounts.values('id'))
+    sums = defaultdict(Decimal)
+
+    outgoing = (
+        Transaction.objects.filter(account_id__in=account_ids)
+        .values('account_id')
+        .annotate(
+            income=Sum('amount', filter=Q(type='income')),
+            spent=Sum('amount', filter=~Q(type='income')),
+        )
+        .order_by()
+    )
+    for row in outgoing:
+        sums[row['account_id']] += (row['income'] or 0) - (row['spent'] or 0)
+
+    incoming = (
+        Transaction.objects.filter(type='transfer', transfer_to_account_id__in=account_ids)
+        .values('transfer_to_account_id')
+        .annotate(received=Sum('amount'))
+        .order_by()
+    )
+    for row in incoming:
+        sums[row['transfer_to_account_id']] += row['received'] or 0
+
+    return sums
+
+
+def reconcile(accounts, fix=False):
+    """
+    Compare stored balances with the ledger for the given Account queryset and
+    return a list of drifted accounts. With fix=True the accounts are locked and
+    corrected with a single bulk UPDATE.
+    """
+    with transaction.atomic():
+        locked = accounts.select_for_update() if fix else accounts
+        rows = list(locked.order_by('id').only('id', 'user_id', 'name', 'balance', 'opening_balance'))
+        sums = ledger_sums(accounts)
+
+        drifted = []
+        for account in rows:
+            expected = account.opening_balance + sums.get(account.id, Decimal('0'))
+            if account.balance != expected:
+                drifted.append({
+                    'account_id': account.id,
+                    'user_id': account.user_id,
+                    'name': account.name,
+                    'stored': account.balance,
+                    'expected': expected,
+                    'drift': account.balance - expected,
+                })
+                account.balance = expected
+                account.updated_at = timezone.now()
+
+        if fix and drifted:
+            fixed_ids = {row['account_id'] for row in drifted}
+            Account.objects.bulk_update(
+                [account for account in rows if account.id in fixed_ids],
+                ['balance', 'updated_at'],
+            )
+            caching.bump(*(row['user_id'] for row in drifted))
+    return drifted
+
+
+def user_id_batches(user_ids, batch_size=DEFAULT_USER_BATCH_SIZE):
+    """Split an ordered iterable of user ids into (first_id, last_id) ranges"""
+    batch = []
+    for user_id in user_ids:
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            yield batch[0], batch[-1]
+            batch = []
+    if batch:
+        yield batch[0], batch[-1]
@@ -0,0 +1,122 @@
+# transactions/recurring.py
+"""
+Recurring transaction scheduler.
+
+Due schedules are taken off the `next_occurrence` queue in chunks. Each chunk is one
+database transaction that inserts the chunk's Transaction rows in bulk, posts them to
+balances and rollups with grouped updates and advances the schedules past the run date,
+so a crashed run simply resumes with the schedules it had not committed. The unique
+(recurring, occurrence_date) key makes a second materialization of an occurrence a no-op,
+and locked schedules are skipped, so several workers can share a run.
+"""
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .analytics import user_timezone
+from .bulk import insert_transactions
+from .models import RecurringTransaction, Transaction
+
+DEFAULT_CHUNK_SIZE = getattr(settings, 'TRANSACTIONS_RECURRING_CHUNK_SIZE', 500)
+
+
+def due_occurrences(schedule, until):
+    """Occurrence dates up to `until` (inclusive), the new occurrence count and the following date"""
+    dates = []
+    index, day = schedule.occurrence_count, schedule.next_occurrence
+    while day is not None and day <= until:
+        dates.append(day)
+        index += 1
+        day = schedule.occurrence(index)
+    return dates, index, day
+
+
+def reschedule(schedule, today):
+    """
+    Restart a schedule whose timing was edited: occurrences are counted from the new
+    start_date and the next one is the first not before `today` (past ones are not backfilled).
+    """
+    index = 0
+    day = schedule.occurrence(index)
+    while day is not None and day < today:
+        index += 1
+        day = schedule.occurrence(index)
+    schedule.occurrence_count, schedule.next_occurrence = index, day
+
+
+def due_schedules(until):
+    return (
+        RecurringTransaction.objects.filter(is_active=True, next_occurrence__lte=until)
+        .select_related('user')
+        .order_by('next_occurrence', 'id')
+    )
+
+
+@transaction.atomic
+def materialize_chunk(until, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Materialize the occurrences up to `until` of the next `chunk_size` due schedules.
+    Returns (schedules processed, transactions created); (0, 0) when nothing is due.
+    """
+    schedules = list(
+        due_schedules(until).select_for_update(skip_locked=True, of=('self',))[:chunk_size]
+    )
+    if not schedules:
+        return 0, 0
+
+    plans = [(schedule, *due_occurrences(schedule, until)) for schedule in schedules]
+    already = set(
+        Transaction.objects.filter(
+            recurring__in=schedules,
+            occurrence_date__gte=min(schedule.next_occurrence for schedule in schedules),
+            occurrence_date__lte=until,
+        ).values_list('recurring_id', 'occurrence_date')
+    )
+
+    timezones = {}
+    transactions = []
+    # Schedules advanced alike share one UPDATE, e.g. every daily schedule moves on by one day
+    advances = defaultdict(list)
+    for schedule, dates, index, next_day in plans:
+        if schedule.user_id not in timezones:
+            timezones[schedule.user_id] = user_timezone(schedule.user)
+        transactions.extend(
+            Transaction(
+                user=schedule.user,
+                account_id=schedule.account_id,
+                category_id=schedule.category_id,
+                transfer_to_account_id=schedule.transfer_to_account_id,
+                type=schedule.type,
+                amount=schedule.amount,
+                description=schedule.description,
+                notes=schedule.notes,
+                tags=schedule.tags,
+                date=datetime.combine(day, time.min, tzinfo=timezones[schedule.user_id]),
+                recurring=schedule,
+                occurrence_date=day,
+            )
+            for day in dates
+            if (schedule.id, day) not in already
+        )
+        advances[index - schedule.occurrence_count, next_day].append(schedule.id)
+
+    insert_transactions(transactions)
+    for (advance, next_day), schedule_ids in advances.items():
+        RecurringTransaction.objects.filter(id__in=schedule_ids).update(
+            occurrence_count=F('occurrence_count') + advance,
+            next_occurrence=next_day,
+            is_active=next_day is not None,
+        )
+    return len(schedules), len(transactions)
+
+
+def materialize(until, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Materialize everything due up to `until`, chunk by chunk; yields each chunk's counts"""
+    while True:
+        processed, created = materialize_chunk(until, chunk_size)
+        if not processed:
+            return
+        yield processed, created
@@ -0,0 +1,152 @@
+# transactions/rollups.py
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DateField, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import caching
+from .analytics import user_timezone
+from .models import MonthlyRollup, Transaction
+
+KEY_FIELDS = ('user_id', 'account_id', 'category_id', 'month', 'type')
+# Rows moved per grouped UPDATE (here and in the ledger), well inside SQLite's bound-parameter limit
+GROUPED_UPDATE_SIZE = 500
+
+
+def month_start(date, tz):
+    """First day of the month containing `date`, in the given timezone"""
+    return timezone.localtime(date, tz).date().replace(day=1)
+
+
+def record(transactions, sign=1):
+    """
+    Add the given transactions to the monthly rollup (sign=-1 removes them).
+    Transactions sharing a rollup row are merged so each row is touched once.
+    """
+    timezones = {}
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for txn in transactions:
+        if txn.user_id not in timezones:
+            timezones[txn.user_id] = user_timezone(txn.user)
+        key = (txn.user_id, txn.account_id, txn.category_id,
+               month_start(txn.date, timezones[txn.user_id]), txn.type)
+        deltas[key][0] += sign * Decimal(str(txn.amount))
+        deltas[key][1] += sign
+
+    if len(deltas) == 1:
+        for key, (amount, count) in deltas.items():
+            _apply(dict(zip(KEY_FIELDS, key)), amount, count)
+    elif deltas:
+        _apply_many(deltas)
+
+
+def _apply(lookup, amount, count):
+    """Increment one rollup row, creating it on first use"""
+    changes = {
+        'total_amount': F('total_amount') + amount,
+        'transaction_count': F('transaction_count') + count,
+    }
+    if MonthlyRollup.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            MonthlyRollup.objects.create(total_amount=amount, transaction_count=count, **lookup)
+    except IntegrityError:
+        # Another request created the row first
+        MonthlyRollup.objects.filter(**lookup).update(**changes)
+
+
+def _apply_many(deltas):
+    """
+    Increment many rollup rows: existing rows are locked in id order and moved by grouped
+    UPDATEs, missing ones are inserted in bulk.
+    """
+    rows = (
+        MonthlyRollup.objects.select_for_update()
+        .filter(
+            user_id__in={key[0] for key in deltas},
+            account_id__in={key[1] for key in deltas},
+            category_id__in={key[2] for key in deltas},
+            month__in={key[3] for key in deltas},
+        )
+        .order_by('id')
+        .values_list('id', *KEY_FIELDS)
+    )
+    existing = {tuple(key): row_id for row_id, *key in rows if tuple(key) in deltas}
+    
+    updates = [(row_id, deltas[key]) for key, row_id in existing.items()]
+    for start in range(0, len(updates), GROUPED_UPDATE_SIZE):
+        group = updates[start:start + GROUPED_UPDATE_SIZE]
+        MonthlyRollup.objects.filter(id__in=[row_id for row_id, _ in group]).update(
+            total_amount=F('total_amount') + Case(
+                *(When(id=row_id, then=Value(amount)) for row_id, (amount, _) in group),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+            transaction_count=F('transaction_count') + Case(
+                *(When(id=row_id, then=Value(count)) for row_id, (_, count) in group),
+                output_field=IntegerField(),
+            ),
+        )
+    
+    missing = {key: delta for key, delta in deltas.items() if key not in existing}
+    try:
+        with transaction.atomic():
+            MonthlyRollup.objects.bulk_create([
+                MonthlyRollup(total_amount=amount, transaction_count=count, **dict(zip(KEY_FIELDS, key)))
+                for key, (amount, count) in missing.items()
+            ])
+    except IntegrityError:
+        # Another writer created some of the rows first
+        for key, (amount, count) in missing.items():
+            _apply(dict(zip(KEY_FIELDS, key)), amount, count)
+
+
+def compute(user):
+    """Rollup rows for the user computed from scratch, keyed like the table"""
+    rows = (
+        Transaction.objects.filter(user=user)
+        .annotate(month=TruncMonth('date', output_field=DateField(), tzinfo=user_timezone(user)))
+        .values('account_id', 'category_id', 'month', 'type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    return {
+        (user.id, row['account_id'], row['category_id'], row['month'], row['type']): (row['total'], row['count'])
+        for row in rows
+    }
+
+
+def stored(user):
+    """Rollup rows currently stored for the user, ignoring rows that net to zero"""
+    rows = MonthlyRollup.objects.filter(user=user).exclude(transaction_count=0, total_amount=0)
+    return {
+        tuple(getattr(row, field) for field in KEY_FIELDS): (row.total_amount, row.transaction_count)
+        for row in rows
+    }
+
+
+def drift(user):
+    """List the rollup keys whose stored totals differ from the transaction table"""
+    expected = compute(user)
+    actual = stored(user)
+    return [
+        {'key': dict(zip(KEY_FIELDS, key)), 'expected': expected.get(key), 'stored': actual.get(key)}
+        for key in sorted(set(expected) | set(actual), key=str)
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+@transaction.atomic
+def rebuild(user):
+    """Replace the user's rollup rows with freshly computed ones"""
+    MonthlyRollup.objects.filter(user=user).delete()
+    rows = [
+        MonthlyRollup(total_amount=total, transaction_count=count, **dict(zip(KEY_FIELDS, key)))
+        for key, (total, count) in compute(user).items()
+    ]
+    MonthlyRollup.objects.bulk_create(rows, batch_size=1000)
+    caching.bump(user.id)
+    return len(rows)
@@ -0,0 +1,88 @@
+# transactions/routing.py
+"""
+Read-replica routing.
+
+Views opt in with ReadReplicaMixin: for the listed read-only actions the ORM reads from
+a replica alias (settings.DATABASE_REPLICAS) chosen for the request. Everything else,
+including every write, goes to `default`. A user who wrote within the last
+REPLICA_STICKY_SECONDS keeps reading from the primary so replication lag never hides
+their own changes. The write time is the user's data_modified_at column, which
+authentication loads from the primary, so every worker sees the same marker.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+PRIMARY = 'default'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def recently_wrote(user):
+    modified = user.data_modified_at
+    return modified is not None and timezone.now() - modified < timedelta(seconds=settings.REPLICA_STICKY_SECONDS)
+
+
+def choose_read_alias(user):
+    """A replica for this user's reads, or None to stay on the primary"""
+    replicas = replica_aliases()
+    if not replicas or recently_wrote(user):
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def reading_from(alias):
+    """Route ORM reads in this context (and threads started from it) to `alias`; None means the primary"""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in replica_aliases()
+
+
+class ReadReplicaMixin:
+    """
+    Route the ORM reads of `replica_actions` (GET/HEAD only) to a replica for the
+    duration of the request.
+    """
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._read_alias_token = None
+        if request.method in ('GET', 'HEAD') and self.action in self.replica_actions:
+            alias = choose_read_alias(request.user)
+            if alias:
+                self._read_alias_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_alias_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
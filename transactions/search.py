@@ -0,0 +1,169 @@
+# transactions/search.py
+"""
+Full-text search over transaction descriptions, notes and tags.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers; PostgreSQL uses a
+generated tsvector column with a GIN index. Both are maintained by the database itself,
+so bulk inserts and queryset updates stay searchable. Other backends (or SQLite builds
+without FTS5) fall back to DRF's icontains search.
+"""
+import re
+
+from django.db import OperationalError, connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+TABLE = 'transactions_transaction'
+FTS_TABLE = 'transactions_transaction_fts'
+SEARCH_VECTOR = 'search_vector'
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, notes, tags,
+        content='{TABLE}', content_rowid='id', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, notes, tags)
+        VALUES (new.id, new.description, new.notes, new.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, notes, tags)
+        VALUES ('delete', old.id, old.description, old.notes, old.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF description, notes, tags ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, notes, tags)
+        VALUES ('delete', old.id, old.description, old.notes, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, description, notes, tags)
+        VALUES (new.id, new.description, new.notes, new.tags);
+    END""",
+]
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRES_INSTALL = [
+    f"""ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR} tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(description, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+    ) STORED""",
+    f'CREATE INDEX IF NOT EXISTS {TABLE}_search_gin ON {TABLE} USING GIN ({SEARCH_VECTOR})',
+]
+POSTGRES_UNINSTALL = [
+    f'DROP INDEX IF EXISTS {TABLE}_search_gin',
+    f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS {SEARCH_VECTOR}',
+]
+
+_available = {}
+
+
+def install(connection):
+    """Create the search index for this connection's backend; returns False if unsupported"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                triggers_existed = _sqlite_triggers_exist(cursor)
+                for statement in SQLITE_INSTALL:
+                    cursor.execute(statement)
+            except OperationalError:
+                # SQLite built without FTS5
+                return False
+            if not triggers_existed:
+                cursor.execute(SQLITE_REBUILD)
+        elif connection.vendor == 'postgresql':
+            for statement in POSTGRES_INSTALL:
+                cursor.execute(statement)
+        else:
+            return False
+    _available.pop(connection.alias, None)
+    return True
+
+
+def uninstall(connection):
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    _available.pop(connection.alias, None)
+
+
+def rebuild(connection):
+    """Re-index every transaction (SQLite; the PostgreSQL column is always current)"""
+    if connection.vendor == 'sqlite' and is_available(connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(SQLITE_REBUILD)
+
+
+def ensure_installed(sender, using='default', **kwargs):
+    """
+    post_migrate receiver. SQLite drops triggers when a migration rebuilds the transaction
+    table, so recreate them (and re-index) whenever they are missing.
+    """
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names():
+        install(connection)
+
+
+def _sqlite_triggers_exist(cursor):
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+        [f'{FTS_TABLE}_a%'],
+    )
+    return cursor.fetchone()[0] == 3
+
+
+def is_available(alias):
+    if alias not in _available:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+                _available[alias] = cursor.fetchone()[0] > 0
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT COUNT(*) FROM information_schema.columns WHERE table_name = %s AND column_name = %s',
+                    [TABLE, SEARCH_VECTOR],
+                )
+                _available[alias] = cursor.fetchone()[0] > 0
+            else:
+                _available[alias] = False
+    return _available[alias]
+
+
+def _words(terms):
+    return [word for term in terms for word in re.findall(r'\w+', term)]
+
+
+def search(queryset, terms):
+    """
+    Filter `queryset` to transactions matching every term (prefix match) and annotate
+    `search_rank`, where lower ranks are better matches. Returns None when no full-text
+    index is available, so the caller can fall back to a LIKE search.
+    """
+    words = _words(terms)
+    if not words or not is_available(queryset.db):
+        return None
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25() weights: description, notes, tags
+        rank = RawSQL(
+            f'SELECT bm25({FTS_TABLE}, 10.0, 2.0, 5.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id',
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+    tsquery = ' & '.join(f'{word}:*' for word in words)
+    matches = RawSQL(f"{TABLE}.{SEARCH_VECTOR} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())
+    rank = RawSQL(
+        f"-ts_rank({TABLE}.{SEARCH_VECTOR}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField()
+    )
+    return queryset.filter(matches).annotate(search_rank=rank)
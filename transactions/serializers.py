@@ -1,7 +1,8 @@
 # transactions/serializers.py
 
 from rest_framework import serializers
-from .models import Transaction, Category, Account
+from django.db import transaction
+from .models import Transaction, Category, Account, RecurringTransaction
 from django.utils import timezone
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,6 +14,9 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'is_default', 'created_at', 'transaction_count']
     
     def get_transaction_count(self, obj):
+        # Viewsets annotate the count; fall back to a query for unannotated instances
+        if hasattr(obj, 'transaction_count'):
+            return obj.transaction_count
         return obj.transactions.filter(user=self.context['request'].user).count()
     
     def create(self, validated_data):
@@ -24,15 +28,30 @@ class AccountSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Account
-        fields = ['id', 'name', 'type', 'balance', 'currency', 'description', 'is_active', 'transaction_count', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at', 'transaction_count']
+        fields = ['id', 'name', 'type', 'balance', 'opening_balance', 'currency', 'description', 'is_active', 'transaction_count', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'opening_balance', 'created_at', 'updated_at', 'transaction_count']
     
     def get_transaction_count(self, obj):
+        # Viewsets annotate the count; fall back to a query for unannotated instances
+        if hasattr(obj, 'transaction_count'):
+            return obj.transaction_count
         return obj.transactions.filter(user=self.context['request'].user).count()
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
+        validated_data['opening_balance'] = validated_data.get('balance', 0)
         return super().create(validated_data)
+    
+    def update(self, instance, validated_data):
+        # A manually edited balance moves the opening balance by the same amount, so the
+        # ledger still explains the rest; re-read both under lock to keep concurrent postings
+        with transaction.atomic():
+            current = Account.objects.select_for_update().only('balance', 'opening_balance').get(pk=instance.pk)
+            instance.opening_balance = current.opening_balance
+            instance.balance = current.balance
+            if 'balance' in validated_data:
+                instance.opening_balance += validated_data['balance'] - current.balance
+            return super().update(instance, validated_data)
 
 class TransactionListSerializer(serializers.ModelSerializer):
     """Simplified serializer for transaction lists"""
@@ -62,9 +81,10 @@ class TransactionDetailSerializer(serializers.ModelSerializer):
             'category', 'category_id', 'account', 'account_id',
             'notes', 'receipt_image', 'tags',
             'transfer_to_account', 'transfer_to_account_name',
+            'recurring', 'occurrence_date',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'recurring', 'occurrence_date', 'created_at', 'updated_at']
     
     def validate(self, data):
         user = self.context['request'].user
@@ -124,7 +144,7 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Transaction
-        fields = ['amount', 'description', 'type', 'date', 'category_id', 'account_id', 'notes']
+        fields = ['amount', 'description', 'type', 'date', 'category_id', 'account_id', 'notes', 'tags']
     
     category_id = serializers.IntegerField()
     account_id = serializers.IntegerField()
@@ -154,4 +174,66 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
         validated_data['category'] = Category.objects.get(id=category_id)
         validated_data['account'] = Account.objects.get(id=account_id)
         
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class TransactionBulkRowSerializer(TransactionCreateSerializer):
+    """Row serializer for bulk imports; validates against categories/accounts prefetched into the context"""
+    
+    def validate(self, data):
+        category = self.context['categories'].get(data['category_id'])
+        if category is None:
+            raise serializers.ValidationError("Invalid category")
+        if data['type'] != 'transfer' and category.type != data['type']:
+            raise serializers.ValidationError("Category type doesn't match transaction type")
+        
+        if data['account_id'] not in self.context['accounts']:
+            raise serializers.ValidationError("Invalid account")
+        
+        return data
+
+class RecurringTransactionSerializer(serializers.ModelSerializer):
+    """Schedule for a repeating transaction; the scheduler fills in next_occurrence"""
+    category_id = serializers.IntegerField()
+    account_id = serializers.IntegerField()
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    account_name = serializers.CharField(source='account.name', read_only=True)
+    
+    class Meta:
+        model = RecurringTransaction
+        fields = [
+            'id', 'amount', 'description', 'type', 'category_id', 'category_name',
+            'account_id', 'account_name', 'transfer_to_account', 'notes', 'tags',
+            'frequency', 'interval', 'start_date', 'end_date', 'count',
+            'next_occurrence', 'occurrence_count', 'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'next_occurrence', 'occurrence_count', 'created_at', 'updated_at']
+    
+    def validate(self, data):
+        user = self.context['request'].user
+        current = lambda field: data.get(field, getattr(self.instance, field, None))
+        
+        # Validate category
+        try:
+            category = Category.objects.get(id=current('category_id'), user=user)
+            if current('type') != 'transfer' and category.type != current('type'):
+                raise serializers.ValidationError("Category type doesn't match transaction type")
+        except Category.DoesNotExist:
+            raise serializers.ValidationError("Invalid category")
+        
+        # Validate accounts
+        if not Account.objects.filter(id=current('account_id'), user=user).exists():
+            raise serializers.ValidationError("Invalid account")
+        transfer_to_account = current('transfer_to_account')
+        if current('type') == 'transfer' and not transfer_to_account:
+            raise serializers.ValidationError("Transfer transactions require a destination account")
+        if transfer_to_account and transfer_to_account.user_id != user.pk:
+            raise serializers.ValidationError("Transfer destination account not found or doesn't belong to user")
+        
+        if current('end_date') and current('end_date') < current('start_date'):
+            raise serializers.ValidationError("end_date must not be before start_date")
+        
+        return data
+    
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        return super().create(validated_data)
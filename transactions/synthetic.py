@@ -0,0 +1,252 @@
+# transactions/synthetic.py
+"""
+Synthetic data for load testing and benchmarks.
+
+`seed` creates users with accounts, default categories, a transaction history, recurring
+schedules, budget buckets, paychecks and allocations. Every table is filled with batched
+bulk inserts, and transactions go through bulk.insert_transactions so balances, rollups
+and tags are exactly what the API would have produced. The same seed gives the same data.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from budgets import allocation
+from budgets.models import Allocation, BudgetBucket, Paycheck
+from . import caching
+from .bulk import insert_transactions
+from .models import Account, Category, RecurringTransaction, Transaction, provision_default_categories
+
+DEFAULT_BATCH_SIZE = 5000
+PASSWORD = 'synthetic-password'
+
+ACCOUNTS = [
+    ('Checking', 'checking'),
+    ('Savings', 'savings'),
+    ('Credit Card', 'credit'),
+    ('Cash', 'cash'),
+    ('Brokerage', 'investment'),
+]
+
+# Expense category: (merchants, median amount); amounts are log-normal around the median
+SPENDING = {
+    'Food & Dining': (['Corner Grocery', 'Coffee House', 'Pizza Place', 'Farmers Market', 'Sushi Bar'], 25),
+    'Transportation': (['Gas Station', 'Metro Card', 'Ride Share', 'Parking Garage'], 30),
+    'Shopping': (['Online Store', 'Department Store', 'Bookshop', 'Hardware Store'], 45),
+    'Entertainment': (['Cinema', 'Streaming Service', 'Concert Hall', 'Game Store'], 20),
+    'Bills & Utilities': (['Electric Company', 'Water Utility', 'Internet Provider', 'Phone Carrier'], 80),
+    'Healthcare': (['Pharmacy', 'Dental Clinic', 'Gym Membership'], 40),
+}
+DEFAULT_SPENDING = (['General Store'], 30)
+TAGS = ['groceries', 'work', 'travel', 'family', 'subscription', 'weekend']
+
+# (name, monthly target, spending categories)
+BUCKETS = [
+    ('Groceries', 400, ['Food & Dining']),
+    ('Transport', 200, ['Transportation']),
+    ('Bills', 300, ['Bills & Utilities']),
+    ('Fun', 250, ['Entertainment', 'Shopping']),
+    ('Health', 100, ['Healthcare']),
+    ('Emergency Fund', 500, []),
+    ('Vacation', 300, []),
+    ('Gifts', 50, ['Other']),
+]
+
+TRANSFER_SHARE = 0.05
+TAGGED_SHARE = 0.1
+
+
+def _money(value):
+    return Decimal(f'{max(value, 0.01):.2f}')
+
+
+def _split(total, parts):
+    """`total` as `parts` near-equal integers"""
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def _user_transactions(rng, user, accounts, categories, count, months, now):
+    """Yield `count` transactions for one user: twice-monthly salary, spending and a few transfers"""
+    span = timedelta(days=months * 30)
+    checking = accounts[0]
+    salary_category = categories.get(('Salary', 'income')) or next(
+        category for (_, category_type), category in categories.items() if category_type == 'income'
+    )
+    expense_categories = [category for (_, category_type), category in categories.items() if category_type == 'expense']
+    salary = rng.randrange(1500, 4000)
+
+    paydays = min(count, months * 2)
+    for i in range(paydays):
+        yield Transaction(
+            user=user, account=checking, category=salary_category, type='income',
+            amount=_money(salary * rng.uniform(0.98, 1.02)), description='Payroll deposit',
+            date=now - span * (i + 0.5) / paydays,
+        )
+
+    for _ in range(count - paydays):
+        date = now - span * rng.random()
+        if len(accounts) > 1 and rng.random() < TRANSFER_SHARE:
+            source, target = rng.sample(accounts, 2)
+            yield Transaction(
+                user=user, account=source, transfer_to_account=target, category=rng.choice(expense_categories),
+                type='transfer', amount=_money(rng.lognormvariate(4.5, 0.8)), description=f'Transfer to {target.name}',
+                date=date,
+            )
+            continue
+        category = rng.choice(expense_categories)
+        merchants, median = SPENDING.get(category.name, DEFAULT_SPENDING)
+        yield Transaction(
+            user=user, account=rng.choice(accounts), category=category, type='expense',
+            amount=_money(median * rng.lognormvariate(0, 0.6)), description=rng.choice(merchants),
+            tags=', '.join(rng.sample(TAGS, rng.randint(1, 2))) if rng.random() < TAGGED_SHARE else '',
+            date=date,
+        )
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@transaction.atomic
+def _create_users(rng, prefix, count, accounts_per_user):
+    """Users with hashed passwords, default categories and accounts"""
+    password = make_password(PASSWORD)
+    users = get_user_model().objects.bulk_create([
+        get_user_model()(
+            username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password,
+            first_name='Synthetic', last_name=f'User {i}',
+        )
+        for i in range(count)
+    ])
+    provision_default_categories(users)
+    Account.objects.bulk_create([
+        Account(user=user, name=name, type=account_type, balance=balance, opening_balance=balance)
+        for user in users
+        for name, account_type in ACCOUNTS[:accounts_per_user]
+        for balance in [_money(rng.uniform(100, 5000))]
+    ])
+    return users
+
+
+@transaction.atomic
+def _create_budgets(rng, users, accounts, categories, buckets_per_user, paychecks_per_user, now):
+    """Buckets linked to spending categories, a monthly rent schedule, and paychecks allocated across the buckets"""
+    buckets = BudgetBucket.objects.bulk_create([
+        BudgetBucket(user=user, name=name, monthly_target=target)
+        for user in users
+        for name, target, _ in BUCKETS[:buckets_per_user]
+    ])
+    spending = {name: category_names for name, _, category_names in BUCKETS}
+    BudgetBucket.categories.through.objects.bulk_create([
+        BudgetBucket.categories.through(budgetbucket_id=bucket.id, category_id=categories[bucket.user_id][name, 'expense'].id)
+        for bucket in buckets
+        for name in spending[bucket.name]
+        if (name, 'expense') in categories[bucket.user_id]
+    ])
+
+    first_of_next_month = (now.date().replace(day=1) + timedelta(days=32)).replace(day=1)
+    RecurringTransaction.objects.bulk_create([
+        RecurringTransaction(
+            user=user, account=accounts[user.id][0], category=categories[user.id]['Bills & Utilities', 'expense'],
+            type='expense', amount=_money(rng.uniform(800, 2500)), description='Rent', frequency='monthly',
+            start_date=first_of_next_month, next_occurrence=first_of_next_month,
+        )
+        for user in users
+        if ('Bills & Utilities', 'expense') in categories[user.id]
+    ])
+
+    user_buckets = defaultdict(list)
+    for bucket in buckets:
+        user_buckets[bucket.user_id].append(bucket)
+    paychecks = []
+    for user in users:
+        income = Transaction.objects.filter(user=user, type='income').order_by('-date')[:paychecks_per_user]
+        paychecks.extend(
+            Paycheck(user=user, amount=txn.amount, date=txn.date.date(), memo=txn.description, source_transaction=txn)
+            for txn in income
+        )
+    paychecks = Paycheck.objects.bulk_create(paychecks)
+
+    allocations = []
+    deltas = defaultdict(Decimal)
+    for paycheck in paychecks:
+        targets = {bucket.id: bucket.monthly_target for bucket in user_buckets[paycheck.user_id]}
+        share = _money(float(paycheck.amount) * rng.uniform(0.5, 0.9))
+        for bucket_id, amount in allocation.split_proportionally(share, targets).items():
+            allocations.append(Allocation(paycheck=paycheck, bucket_id=bucket_id, amount=amount))
+            deltas[bucket_id] += amount
+    Allocation.objects.bulk_create(allocations, batch_size=DEFAULT_BATCH_SIZE)
+    allocation.apply_bucket_deltas(deltas)
+    allocation.refresh_unfunded_targets(BudgetBucket.objects.filter(user__in=users))
+    return len(buckets), len(paychecks), len(allocations)
+
+
+def seed(
+    users=10,
+    transactions=10000,
+    months=24,
+    accounts_per_user=3,
+    buckets_per_user=6,
+    paychecks_per_user=24,
+    prefix='synthetic',
+    random_seed=0,
+    batch_size=DEFAULT_BATCH_SIZE,
+    progress=None,
+):
+    """
+    Create `users` users sharing `transactions` transactions spread over the last `months`
+    months. Usernames are `prefix` plus a number and the password is PASSWORD. `progress`
+    is called with the running transaction count after each batch. Returns row counts.
+    """
+    if get_user_model().objects.filter(username__startswith=prefix).exists():
+        raise ValueError(f"Users named '{prefix}...' already exist; pick another prefix")
+    if users < 1 or not 1 <= accounts_per_user <= len(ACCOUNTS):
+        raise ValueError(f'Need at least one user and 1 to {len(ACCOUNTS)} accounts per user')
+
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    created_users = _create_users(rng, prefix, users, accounts_per_user)
+    accounts = defaultdict(list)
+    for account in Account.objects.filter(user__in=created_users).order_by('id'):
+        accounts[account.user_id].append(account)
+    categories = defaultdict(dict)
+    for category in Category.objects.filter(user__in=created_users):
+        categories[category.user_id][category.name, category.type] = category
+
+    rows = (
+        txn
+        for user, count in zip(created_users, _split(transactions, users))
+        for txn in _user_transactions(rng, user, accounts[user.id], categories[user.id], count, months, now)
+    )
+    inserted = 0
+    for batch in _batches(rows, batch_size):
+        insert_transactions(batch, batch_size=batch_size)
+        inserted += len(batch)
+        if progress:
+            progress(inserted)
+
+    buckets, paychecks, allocations = _create_budgets(
+        rng, created_users, accounts, categories, buckets_per_user, paychecks_per_user, now
+    )
+    caching.bump(*(user.id for user in created_users))
+    return {
+        'users': len(created_users),
+        'accounts': sum(len(user_accounts) for user_accounts in accounts.values()),
+        'transactions': inserted,
+        'buckets': buckets,
+        'paychecks': paychecks,
+        'allocations': allocations,
+    }
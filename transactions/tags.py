@@ -0,0 +1,78 @@
+# transactions/tags.py
+"""
+Normalized tags.
+
+`Transaction.tags` stays the comma-separated string clients read and write; `Tag` and
+`TransactionTag` mirror it so tag filters and reports are indexed joins instead of
+LIKE scans. The mirror is refreshed by the ledger whenever transactions are posted.
+"""
+from collections import defaultdict
+
+from .models import Tag, TransactionTag
+
+MAX_TAG_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def normalize(name):
+    return ' '.join(name.split()).lower()[:MAX_TAG_LENGTH]
+
+
+def parse_tags(value):
+    """Unique normalized tag names from a comma-separated string, in order"""
+    names = []
+    for part in (value or '').split(','):
+        name = normalize(part)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def sync_tags(transactions):
+    """
+    Make each saved transaction's tag rows match its `tags` string. Runs a fixed number
+    of queries however many transactions are passed.
+    """
+    transactions = [txn for txn in transactions if txn.pk]
+    if not transactions:
+        return
+
+    wanted = {txn.pk: (txn.user_id, parse_tags(txn.tags)) for txn in transactions}
+    names_by_user = defaultdict(set)
+    for user_id, names in wanted.values():
+        names_by_user[user_id].update(names)
+
+    tag_ids = {}
+    if any(names_by_user.values()):
+        Tag.objects.bulk_create(
+            [Tag(user_id=user_id, name=name) for user_id, names in names_by_user.items() for name in names],
+            ignore_conflicts=True,
+        )
+        all_names = set().union(*names_by_user.values())
+        for tag_id, user_id, name in Tag.objects.filter(
+            user_id__in=names_by_user, name__in=all_names
+        ).values_list('id', 'user_id', 'name'):
+            tag_ids[user_id, name] = tag_id
+
+    desired = {
+        (transaction_id, tag_ids[user_id, name])
+        for transaction_id, (user_id, names) in wanted.items()
+        for name in names
+    }
+    existing = {
+        (transaction_id, tag_id): link_id
+        for link_id, transaction_id, tag_id in TransactionTag.objects.filter(
+            transaction_id__in=wanted
+        ).values_list('id', 'transaction_id', 'tag_id')
+    }
+
+    stale = [link_id for key, link_id in existing.items() if key not in desired]
+    if stale:
+        TransactionTag.objects.filter(id__in=stale).delete()
+    TransactionTag.objects.bulk_create(
+        [
+            TransactionTag(transaction_id=transaction_id, tag_id=tag_id)
+            for transaction_id, tag_id in desired
+            if (transaction_id, tag_id) not in existing
+        ],
+        ignore_conflicts=True,
+    )
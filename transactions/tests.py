@@ -1,3 +1,1605 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction as db_transaction
+from django.db.models import F, Sum
+from django.forms.models import model_to_dict
+from django.http import QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import numpy as np
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from budgets.models import BudgetBucket
+from . import analytics, benchmarks, bulk, caching, forecast, importers, ledger, reconcile, recurring, rollups, search, synthetic, tags
+from .admin import AccountAdmin, TransactionAdmin
+from .analytics import user_timezone
+from .models import DEFAULT_CATEGORIES, Transaction, Category, Account, MonthlyRollup, RecurringTransaction, Tag, TransactionTag
+
+
+def jwt_client(user):
+    """An APIClient authenticating like the frontend, so every request loads the user (and data version) afresh"""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+class QueryCountTests(TestCase):
+    """The number of queries per endpoint must not grow with the number of rows returned"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='queries@example.com', username='queries', password='pw',
+            first_name='Query', last_name='Count',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_rows(self, count):
+        """Add `count` accounts, each with one expense in a fresh category"""
+        for i in range(count):
+            n = Account.objects.count()
+            account = Account.objects.create(user=self.user, name=f'Account {n}', type='checking')
+            category = Category.objects.create(user=self.user, name=f'Category {n}', type='expense')
+            Transaction.objects.create(
+                user=self.user, account=account, category=category, type='expense',
+                amount=Decimal('1.00'), description=f'Row {n}', date=timezone.now(),
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.add_rows(2)
+        small = self.count_queries(url)
+        self.add_rows(10)
+        self.assertEqual(self.count_queries(url), small, url)
+
+    def test_transaction_list(self):
+        self.assertConstantQueries('/api/transactions/')
+
+    def test_transaction_summary(self):
+        self.assertConstantQueries('/api/transactions/summary/')
+
+    def test_transaction_detail(self):
+        self.add_rows(1)
+        transaction = Transaction.objects.first()
+        small = self.count_queries(f'/api/transactions/{transaction.id}/')
+        self.add_rows(10)
+        self.assertEqual(self.count_queries(f'/api/transactions/{transaction.id}/'), small)
+
+    def test_category_list(self):
+        self.assertConstantQueries('/api/categories/')
+
+    def test_categories_by_type(self):
+        self.assertConstantQueries('/api/categories/by_type/')
+
+    def test_account_list(self):
+        self.assertConstantQueries('/api/accounts/')
+
+
+class MonthlyTrendTests(TestCase):
+    """Trend months are the user's local calendar months, zero-filled, from transactions or rollups alike"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='trends@example.com', username='trends', password='pw', first_name='Tre', last_name='Nds',
+            timezone='America/New_York',
+        )
+        self.tz = user_timezone(self.user)
+        account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        salary, _ = Category.objects.get_or_create(user=self.user, name='Salary', type='income')
+        utc = ZoneInfo('UTC')
+        ledger.post(Transaction.objects.bulk_create([
+            Transaction(user=self.user, account=account, category=category, type=category.type,
+                        amount=Decimal(amount), description='Trend', date=when)
+            for category, amount, when in (
+                # Before the window
+                (food, '99.00', datetime(2024, 11, 15, 12, tzinfo=utc)),
+                # 9 pm on 31 January in New York, already February in UTC
+                (food, '30.00', datetime(2025, 2, 1, 2, tzinfo=utc)),
+                (salary, '1000.00', datetime(2025, 3, 10, 12, tzinfo=utc)),
+                (food, '12.50', datetime(2025, 3, 11, 12, tzinfo=utc)),
+            )
+        ]))
+        self.now = datetime(2025, 3, 15, 12, tzinfo=self.tz)
+
+    def test_months_are_local_and_zero_filled(self):
+        trends = analytics.monthly_trends(Transaction.objects.filter(user=self.user), self.tz, months=4, now=self.now)
+        self.assertEqual(trends, [
+            {'month': '2024-12', 'income': 0.0, 'expenses': 0.0, 'net': 0.0},
+            {'month': '2025-01', 'income': 0.0, 'expenses': 30.0, 'net': -30.0},
+            {'month': '2025-02', 'income': 0.0, 'expenses': 0.0, 'net': 0.0},
+            {'month': '2025-03', 'income': 1000.0, 'expenses': 12.5, 'net': 987.5},
+        ])
+
+    def test_rollups_agree(self):
+        self.assertEqual(
+            analytics.rollup_monthly_trends(MonthlyRollup.objects.filter(user=self.user), self.tz, months=4, now=self.now),
+            analytics.monthly_trends(Transaction.objects.filter(user=self.user), self.tz, months=4, now=self.now),
+        )
+
+
+class RollupTests(TestCase):
+    """MonthlyRollup rows follow every API write; rebuild recomputes them from the transaction table"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='rollups@example.com', username='rollups', password='pw', first_name='Roll', last_name='Ups',
+        )
+        self.checking = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.card = Account.objects.create(user=self.user, name='Card', type='credit')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.fun, _ = Category.objects.get_or_create(user=self.user, name='Fun', type='expense')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def transaction_data(self, **changes):
+        return {
+            'type': 'expense', 'amount': '40.00', 'description': 'Groceries', 'date': '2025-03-10T12:00:00Z',
+            'category_id': self.food.id, 'account_id': self.checking.id, **changes,
+        }
+
+    def assertNoDrift(self):
+        self.assertEqual(rollups.drift(self.user), [])
+
+    def rollup(self, **lookup):
+        return MonthlyRollup.objects.filter(user=self.user, **lookup).values_list('total_amount', 'transaction_count').get()
+
+    def test_api_create_update_delete(self):
+        response = self.client.post('/api/transactions/', self.transaction_data(), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        pk = Transaction.objects.get(user=self.user).pk
+        self.client.post('/api/transactions/', self.transaction_data(amount='10.00'), format='json')
+        self.assertNoDrift()
+        self.assertEqual(self.rollup(month=date(2025, 3, 1), category=self.food), (Decimal('50.00'), 2))
+
+        # Move to another month, category and account at once
+        response = self.client.put(f'/api/transactions/{pk}/', self.transaction_data(
+            amount='45.00', date='2025-04-02T12:00:00Z', category_id=self.fun.id, account_id=self.card.id,
+        ), format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertNoDrift()
+        self.assertEqual(self.rollup(month=date(2025, 3, 1), category=self.food), (Decimal('10.00'), 1))
+        self.assertEqual(self.rollup(month=date(2025, 4, 1), category=self.fun, account=self.card), (Decimal('45.00'), 1))
+
+        self.assertEqual(self.client.patch(f'/api/transactions/{pk}/', {'amount': '5.00'}, format='json').status_code, 200)
+        self.assertNoDrift()
+        self.assertEqual(self.client.delete(f'/api/transactions/{pk}/').status_code, 204)
+        self.assertNoDrift()
+
+    def test_batches_update_existing_rows_and_insert_missing_ones(self):
+        self.client.post('/api/transactions/', self.transaction_data(), format='json')
+        batch = Transaction.objects.bulk_create([
+            Transaction(user=self.user, account=account, category=category, type='expense',
+                        amount=Decimal(amount), description='Batch', date=when)
+            for account, category, amount, when in (
+                # Lands on the existing March row
+                (self.checking, self.food, '2.50', datetime(2025, 3, 20, 12, tzinfo=ZoneInfo('UTC'))),
+                (self.checking, self.food, '7.50', datetime(2025, 3, 21, 12, tzinfo=ZoneInfo('UTC'))),
+                # New rows
+                (self.card, self.food, '3.00', datetime(2025, 3, 22, 12, tzinfo=ZoneInfo('UTC'))),
+                (self.checking, self.fun, '8.00', datetime(2025, 5, 1, 12, tzinfo=ZoneInfo('UTC'))),
+            )
+        ])
+        ledger.post(batch)
+        self.assertNoDrift()
+        self.assertEqual(self.rollup(month=date(2025, 3, 1), category=self.food, account=self.checking), (Decimal('50.00'), 3))
+        self.assertEqual(MonthlyRollup.objects.filter(user=self.user).count(), 3)
+
+        ledger.unpost(batch)
+        Transaction.objects.filter(pk__in=[txn.pk for txn in batch]).delete()
+        self.assertNoDrift()
+
+    def test_rebuild_restores_corrupted_rows(self):
+        self.client.post('/api/transactions/', self.transaction_data(), format='json')
+        self.client.post('/api/transactions/', self.transaction_data(category_id=self.fun.id), format='json')
+        MonthlyRollup.objects.filter(user=self.user, category=self.food).update(total_amount=999, transaction_count=7)
+        MonthlyRollup.objects.filter(user=self.user, category=self.fun).delete()
+        self.assertEqual(len(rollups.drift(self.user)), 2)
+
+        self.assertEqual(rollups.rebuild(self.user), 2)
+        self.assertNoDrift()
+        self.assertEqual(self.rollup(category=self.food), (Decimal('40.00'), 1))
+
+
+class SearchTests(TestCase):
+    """`?search=` prefix-matches every word against the full-text index, kept current by the database"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='search@example.com', username='search', password='pw', first_name='Sea', last_name='Rch',
+        )
+        self.account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, description, notes='', tags=''):
+        response = self.client.post('/api/transactions/', {
+            'type': 'expense', 'amount': '10.00', 'description': description, 'notes': notes, 'tags': tags,
+            'date': timezone.now().isoformat(), 'category_id': self.food.id, 'account_id': self.account.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Transaction.objects.get(user=self.user, description=description)
+
+    def found(self, query):
+        response = self.client.get('/api/transactions/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['description'] for row in response.data['results']]
+
+    def test_the_index_is_used(self):
+        self.assertIsNotNone(search.search(Transaction.objects.all(), ['coffee']))
+
+    def test_prefix_search_over_every_word(self):
+        self.add('Whole Foods groceries')
+        self.add('Corner shop groceries', notes='milk and bread')
+        self.add('Cinema', tags='weekend,fun')
+        self.assertCountEqual(self.found('groc'), ['Whole Foods groceries', 'Corner shop groceries'])
+        self.assertEqual(self.found('whole groc'), ['Whole Foods groceries'])
+        self.assertEqual(self.found('brea'), ['Corner shop groceries'])
+        self.assertEqual(self.found('weekend'), ['Cinema'])
+        # Word prefixes only, unlike an icontains search
+        self.assertEqual(self.found('ocer'), [])
+
+    def test_description_matches_rank_first(self):
+        self.add('Bakery run', notes='coffee too')
+        self.add('Coffee beans')
+        self.assertEqual(self.found('coffee'), ['Coffee beans', 'Bakery run'])
+
+    def test_other_users_rows_are_not_found(self):
+        other = User.objects.create_user(
+            email='other-search@example.com', username='other-search', password='pw', first_name='O', last_name='S',
+        )
+        account = Account.objects.create(user=other, name='Theirs', type='checking')
+        Transaction.objects.create(
+            user=other, account=account, category=Category.objects.filter(user=other, type='expense').first(),
+            type='expense', amount=Decimal('1.00'), description='Groceries', date=timezone.now(),
+        )
+        self.assertEqual(self.found('groceries'), [])
+
+    def test_writes_reach_the_index(self):
+        txn = self.add('Gym membership')
+        self.assertEqual(self.found('gym'), ['Gym membership'])
+
+        response = self.client.patch(f'/api/transactions/{txn.pk}/', {'description': 'Swimming pool'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.found('gym'), [])
+        self.assertEqual(self.found('swim'), ['Swimming pool'])
+
+        # Queryset updates and bulk inserts bypass the ORM's signals but not the index
+        Transaction.objects.filter(pk=txn.pk).update(notes='lane booking')
+        self.assertEqual(self.found('lane'), ['Swimming pool'])
+        Transaction.objects.bulk_create([Transaction(
+            user=self.user, account=self.account, category=self.food, type='expense',
+            amount=Decimal('3.00'), description='Swim cap', date=timezone.now(),
+        )])
+        self.assertCountEqual(self.found('swim'), ['Swimming pool', 'Swim cap'])
+
+        self.assertEqual(self.client.delete(f'/api/transactions/{txn.pk}/').status_code, 204)
+        self.assertEqual(self.found('swim'), ['Swim cap'])
+
+
+class TagTests(TestCase):
+    """The Tag/TransactionTag mirror follows each transaction's `tags` string"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='tags@example.com', username='tags', password='pw', first_name='Ta', last_name='Gs',
+        )
+        self.account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.salary, _ = Category.objects.get_or_create(user=self.user, name='Salary', type='income')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, amount, tags, category=None):
+        category = category or self.food
+        response = self.client.post('/api/transactions/', {
+            'type': category.type, 'amount': amount, 'description': 'Tagged', 'tags': tags,
+            'date': timezone.now().isoformat(), 'category_id': category.id, 'account_id': self.account.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Transaction.objects.filter(user=self.user).latest('id')
+
+    def tag_names(self, txn):
+        return sorted(TransactionTag.objects.filter(transaction=txn).values_list('tag__name', flat=True))
+
+    def test_parse_tags_normalizes(self):
+        self.assertEqual(tags.parse_tags(' Food ,food,  Eating   Out ,,FOOD'), ['food', 'eating out'])
+        self.assertEqual(tags.parse_tags(None), [])
+        self.assertEqual(tags.parse_tags('x' * 80), ['x' * tags.MAX_TAG_LENGTH])
+
+    def test_tags_are_normalized_and_deduplicated(self):
+        first = self.add('40.00', ' Groceries, groceries ,Weekly  Shop')
+        second = self.add('10.00', 'GROCERIES')
+        self.assertEqual(self.tag_names(first), ['groceries', 'weekly shop'])
+        self.assertEqual(self.tag_names(second), ['groceries'])
+        self.assertEqual(sorted(Tag.objects.filter(user=self.user).values_list('name', flat=True)), ['groceries', 'weekly shop'])
+
+    def test_updates_remove_dropped_tags(self):
+        txn = self.add('40.00', 'groceries,weekly shop')
+        response = self.client.patch(f'/api/transactions/{txn.pk}/', {'tags': 'Weekly shop, treats'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.tag_names(txn), ['treats', 'weekly shop'])
+        self.client.patch(f'/api/transactions/{txn.pk}/', {'tags': ''}, format='json')
+        self.assertEqual(self.tag_names(txn), [])
+
+    def test_sync_runs_a_fixed_number_of_queries(self):
+        def sync_queries(count):
+            batch = Transaction.objects.bulk_create([
+                Transaction(user=self.user, account=self.account, category=self.food, type='expense',
+                            amount=Decimal('1.00'), description='Batch', tags=f'batch {i}, shared', date=timezone.now())
+                for i in range(count)
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                tags.sync_tags(batch)
+            return len(queries)
+        self.assertEqual(sync_queries(1), sync_queries(20))
+
+    def test_tag_breakdown_totals(self):
+        self.add('40.00', 'groceries,weekly')
+        self.add('10.00', 'Groceries')
+        self.add('7.50', '')
+        self.add('100.00', 'groceries', category=self.salary)
+        self.assertEqual(self.client.get('/api/transactions/tag_breakdown/').data['tag_breakdown'], [
+            {'tag': 'groceries', 'total': Decimal('50.00'), 'count': 2},
+            {'tag': 'weekly', 'total': Decimal('40.00'), 'count': 1},
+        ])
+        self.assertEqual(self.client.get('/api/transactions/tag_breakdown/?type=income').data['tag_breakdown'], [
+            {'tag': 'groceries', 'total': Decimal('100.00'), 'count': 1},
+        ])
+        self.assertEqual(self.client.get('/api/transactions/tag_breakdown/?type=transfer').status_code, 400)
+
+    def test_tag_filter_requires_every_tag(self):
+        self.add('40.00', 'groceries,weekly')
+        self.add('10.00', 'groceries')
+        response = self.client.get('/api/transactions/?tag=groceries&tag=Weekly')
+        self.assertEqual([row['amount'] for row in response.data['results']], ['40.00'])
+
+
+class PeriodTests(SimpleTestCase):
+    tz = ZoneInfo('America/New_York')
+
+    def period(self, query, now):
+        return analytics.resolve_period(QueryDict(query), self.tz, now=now.replace(tzinfo=self.tz))
+
+    def assertPeriod(self, period, start, end, previous_start):
+        self.assertEqual(
+            (period.start, period.end, period.previous_start),
+            tuple(datetime(*moment, tzinfo=self.tz) for moment in (start, end, previous_start)),
+        )
+
+    def test_quarters(self):
+        for now, start, end, previous_start in (
+            (datetime(2025, 5, 20, 12), (2025, 4, 1), (2025, 7, 1), (2025, 1, 1)),
+            (datetime(2025, 4, 1, 0, 5), (2025, 4, 1), (2025, 7, 1), (2025, 1, 1)),
+            (datetime(2025, 3, 31, 23, 55), (2025, 1, 1), (2025, 4, 1), (2024, 10, 1)),
+            (datetime(2025, 12, 31, 23, 55), (2025, 10, 1), (2026, 1, 1), (2025, 7, 1)),
+        ):
+            with self.subTest(now=now):
+                self.assertPeriod(self.period('period=quarter', now), start, end, previous_start)
+
+    def test_year_month_and_week(self):
+        now = datetime(2025, 3, 12, 8)
+        self.assertPeriod(self.period('period=year', now), (2025, 1, 1), (2026, 1, 1), (2024, 1, 1))
+        self.assertPeriod(self.period('', now), (2025, 3, 1), (2025, 4, 1), (2025, 2, 1))
+        # 12 March 2025 is a Wednesday
+        self.assertPeriod(self.period('period=week', now), (2025, 3, 10), (2025, 3, 17), (2025, 3, 3))
+
+    def test_custom_dates_are_inclusive(self):
+        period = self.period('period=custom&start_date=2025-03-01&end_date=2025-03-10', datetime(2025, 5, 1))
+        self.assertPeriod(period, (2025, 3, 1), (2025, 3, 11), (2025, 2, 19))
+
+    def test_invalid_periods(self):
+        for query in (
+            'period=decade', 'period=custom', 'period=custom&start_date=2025-03-10&end_date=2025-03-01',
+            'period=custom&start_date=yesterday&end_date=2025-03-01',
+        ):
+            with self.subTest(query=query), self.assertRaises(ValueError):
+                self.period(query, datetime(2025, 5, 1))
+
+
+class SummaryPeriodTests(TestCase):
+    """Summary totals for a period and the one before it, from transactions or rollups alike"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='periods@example.com', username='periods', password='pw', first_name='Per', last_name='Iods',
+            timezone='America/New_York',
+        )
+        self.tz = user_timezone(self.user)
+        account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        salary, _ = Category.objects.get_or_create(user=self.user, name='Salary', type='income')
+        ledger.post(Transaction.objects.bulk_create([
+            Transaction(user=self.user, account=account, category=category, type=category.type,
+                        amount=Decimal(amount), description='Period', date=when.replace(tzinfo=self.tz))
+            for category, amount, when in (
+                (salary, '1000.00', datetime(2024, 2, 10, 12)),
+                (salary, '1500.00', datetime(2025, 1, 5, 12)),
+                # Either side of the local start of the second quarter; both are 1 April in UTC
+                (food, '20.00', datetime(2025, 3, 31, 23, 30)),
+                (food, '30.00', datetime(2025, 4, 1, 0, 30)),
+            )
+        ]))
+        self.now = datetime(2025, 5, 20, 12, tzinfo=self.tz)
+
+    def payload(self, query, use_rollups):
+        params = QueryDict(query)
+        period = analytics.resolve_period(params, self.tz, now=self.now)
+        queries = analytics.summary_queries(self.user, params, self.tz, period, use_rollups=use_rollups)
+        results = {name: query() for name, query in queries.items()}
+        return analytics.summary_payload(results, [], period)
+
+    def totals(self, query, use_rollups):
+        payload = self.payload(query, use_rollups)
+        return payload['current_period'], payload['previous_period'], payload['change_percent']
+
+    def test_quarter(self):
+        for use_rollups in (True, False):
+            with self.subTest(use_rollups=use_rollups):
+                current, previous, change = self.totals('period=quarter', use_rollups)
+                self.assertEqual(current, {'income': 0.0, 'expenses': 30.0, 'net': -30.0, 'transaction_count': 1})
+                self.assertEqual((previous['income'], previous['expenses'], previous['transaction_count']), (1500.0, 20.0, 2))
+                self.assertEqual(previous['start'], datetime(2025, 1, 1, tzinfo=self.tz).isoformat())
+                self.assertEqual(change['expenses'], 50.0)
+
+    def test_previous_year(self):
+        for use_rollups in (True, False):
+            with self.subTest(use_rollups=use_rollups):
+                current, previous, change = self.totals('period=year', use_rollups)
+                self.assertEqual(current, {'income': 1500.0, 'expenses': 50.0, 'net': 1450.0, 'transaction_count': 3})
+                self.assertEqual(previous['income'], 1000.0)
+                self.assertEqual((previous['start'], previous['end']), (
+                    datetime(2024, 1, 1, tzinfo=self.tz).isoformat(), datetime(2025, 1, 1, tzinfo=self.tz).isoformat(),
+                ))
+                # No spending the year before: no percentage
+                self.assertEqual((change['income'], change['expenses']), (50.0, None))
+
+    def test_month_keeps_current_month(self):
+        payload = self.payload('', True)
+        self.assertEqual(payload['current_month'], payload['current_period'])
+        self.assertNotIn('current_month', self.payload('period=year', True))
+
+    def test_invalid_period_is_a_400(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for url in (
+            '/api/transactions/summary/?period=decade',
+            '/api/transactions/summary/?period=custom&start_date=2025-03-10',
+            '/api/budgets/buckets/progress/?period=fortnight',
+        ):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('period', response.data['error'])
+
+
+class BulkCreateTests(TestCase):
+    """bulk_create validates every row, inserts the valid ones and posts them to the ledger once per batch"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='bulk@example.com', username='bulk', password='pw', first_name='Bu', last_name='Lk',
+        )
+        self.checking = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.card = Account.objects.create(user=self.user, name='Card', type='credit')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def row(self, **changes):
+        return {
+            'type': 'expense', 'amount': '10.00', 'description': 'Bulk', 'date': '2025-03-10T12:00:00Z',
+            'category_id': self.food.id, 'account_id': self.checking.id, **changes,
+        }
+
+    def post(self, rows):
+        return self.client.post('/api/transactions/bulk_create/', {'transactions': rows}, format='json')
+
+    def balances(self):
+        return {account.name: account.balance for account in Account.objects.filter(user=self.user)}
+
+    def rollup_totals(self):
+        return {
+            row.account_id: (row.total_amount, row.transaction_count)
+            for row in MonthlyRollup.objects.filter(user=self.user)
+        }
+
+    def test_partial_errors(self):
+        other = User.objects.create_user(
+            email='bulk-other@example.com', username='bulk-other', password='pw', first_name='O', last_name='B',
+        )
+        foreign = Category.objects.create(user=other, name='Theirs', type='expense')
+        response = self.post([
+            self.row(),
+            self.row(amount='abc'),
+            self.row(category_id=foreign.id),
+            self.row(type='income'),
+            {'description': 'No amount'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['success_count'], response.data['error_count']), (1, 4))
+        self.assertEqual([row['description'] for row in response.data['created']], ['Bulk'])
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [1, 2, 3, 4])
+        self.assertIn('amount', errors[1])
+        self.assertEqual([str(message) for message in errors[2]['non_field_errors']], ['Invalid category'])
+        self.assertEqual(
+            [str(message) for message in errors[3]['non_field_errors']], ["Category type doesn't match transaction type"],
+        )
+        self.assertTrue({'amount', 'type', 'category_id', 'account_id', 'date'} <= set(errors[4]))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_nothing_valid_is_a_400(self):
+        response = self.post([self.row(amount='-1')])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['created'], response.data['error_count']), ([], 1))
+        for body in ({}, {'transactions': 'rows'}):
+            with self.subTest(body=body):
+                response = self.client.post('/api/transactions/bulk_create/', body, format='json')
+                self.assertEqual(response.data, {'error': 'No transactions provided'})
+
+    def test_balances_and_rollups_are_updated_once_per_batch(self):
+        def post_queries(count):
+            rows = [self.row(account_id=(self.checking, self.card)[i % 2].id) for i in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post(rows).status_code, 201)
+            return [query['sql'] for query in queries]
+
+        small, large = post_queries(2), post_queries(40)
+        self.assertEqual(len(small), len(large))
+        balance_updates = [sql for sql in large if sql.startswith('UPDATE "transactions_account"')]
+        self.assertEqual(len(balance_updates), 1)
+        self.assertEqual(self.balances(), {'Checking': Decimal('-210.00'), 'Card': Decimal('-210.00')})
+        self.assertEqual(self.rollup_totals(), {self.checking.id: (Decimal('210.00'), 21), self.card.id: (Decimal('210.00'), 21)})
+        self.assertEqual(rollups.drift(self.user), [])
+
+    def test_batches_above_the_batch_size(self):
+        self.assertEqual(bulk.DEFAULT_BATCH_SIZE, settings.TRANSACTIONS_BULK_BATCH_SIZE)
+        instances, errors = bulk.validate_rows(self.user, [self.row(amount=f'{i}.00') for i in range(1, 8)])
+        self.assertEqual(errors, [])
+        with CaptureQueriesContext(connection) as queries:
+            created = bulk.insert_transactions(instances, batch_size=3)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "transactions_transaction"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertTrue(all(txn.pk for txn in created))
+        self.assertEqual(self.balances()['Checking'], Decimal('-28.00'))
+        self.assertEqual(self.rollup_totals(), {self.checking.id: (Decimal('28.00'), 7)})
+
+
+class CursorPaginationTests(TestCase):
+    """?cursor= pages the transaction list by keyset, stable across date ties; page numbers otherwise"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='cursor@example.com', username='cursor', password='pw', first_name='Cur', last_name='Sor',
+        )
+        self.account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tied = datetime(2025, 3, 10, 12, tzinfo=ZoneInfo('UTC'))
+        self.add(*[tied] * 5, tied + timedelta(days=1), tied - timedelta(days=1))
+        # Ties on both date and created_at leave only the id to order by
+        Transaction.objects.filter(user=self.user, date=tied).update(created_at=tied)
+        self.expected = list(
+            Transaction.objects.filter(user=self.user).order_by('-date', '-created_at', 'id').values_list('id', flat=True)
+        )
+
+    def add(self, *dates):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, account=self.account, category=self.food, type='expense',
+                        amount=Decimal('1.00'), description='Paged', date=when)
+            for when in dates
+        ])
+
+    def pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.append([row['id'] for row in response.data['results']])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_every_row_once_in_order(self):
+        pages = self.pages('/api/transactions/?cursor=&page_size=2')
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_rows_added_between_pages_do_not_shift_later_ones(self):
+        first = self.client.get('/api/transactions/?cursor=&page_size=3').data
+        # A newer transaction would push every offset-based page along by one
+        self.add(datetime(2025, 4, 1, tzinfo=ZoneInfo('UTC')))
+        rest = sum(self.pages(first['next']), [])
+        self.assertEqual([row['id'] for row in first['results']] + rest, self.expected)
+
+    def test_without_a_cursor_pages_are_numbered(self):
+        response = self.client.get('/api/transactions/')
+        self.assertEqual(response.data['count'], 7)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected)
+        self.assertEqual(self.client.get('/api/transactions/?page=2').status_code, 404)
+
+
+class ExportTests(TestCase):
+    """The export streams the same rows the list filters would return, for the requesting user only"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='export@example.com', username='export', password='pw', first_name='Ex', last_name='Port',
+        )
+        account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        salary, _ = Category.objects.get_or_create(user=self.user, name='Salary', type='income')
+        utc = ZoneInfo('UTC')
+        self.lunch, self.pay = Transaction.objects.bulk_create([
+            Transaction(user=self.user, account=account, category=food, type='expense', amount=Decimal('12.50'),
+                        description='Lunch, with "friends"', tags='social', date=datetime(2025, 3, 10, 12, tzinfo=utc)),
+            Transaction(user=self.user, account=account, category=salary, type='income', amount=Decimal('900.00'),
+                        description='Payroll', notes='March', date=datetime(2025, 3, 1, 9, tzinfo=utc)),
+        ])
+        ledger.post([self.lunch, self.pay])
+        other = User.objects.create_user(
+            email='export-other@example.com', username='export-other', password='pw', first_name='O', last_name='E',
+        )
+        other_account = Account.objects.create(user=other, name='Theirs', type='checking')
+        Transaction.objects.create(
+            user=other, account=other_account, category=Category.objects.filter(user=other, type='expense').first(),
+            type='expense', amount=Decimal('5.00'), description='Lunch', date=datetime(2025, 3, 10, 13, tzinfo=utc),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/transactions/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def csv_rows(self, query=''):
+        return list(csv.reader(io.StringIO(self.export(query))))
+
+    def test_csv_header_and_rows(self):
+        self.assertEqual(self.csv_rows(), [
+            ['id', 'date', 'type', 'amount', 'description', 'category__name', 'account__name', 'notes', 'tags'],
+            [str(self.lunch.id), '2025-03-10T12:00:00+00:00', 'expense', '12.50', 'Lunch, with "friends"',
+             'Food', 'Checking', '', 'social'],
+            [str(self.pay.id), '2025-03-01T09:00:00+00:00', 'income', '900.00', 'Payroll',
+             'Salary', 'Checking', 'March', ''],
+        ])
+        response = self.client.get('/api/transactions/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="transactions.csv"')
+
+    def test_filters_carry_over(self):
+        for query, expected in (
+            ('?type=income', [self.pay.id]),
+            ('?category__name=Food', [self.lunch.id]),
+            ('?search=lunch', [self.lunch.id]),
+            ('?tag=social', [self.lunch.id]),
+            ('?start_date=2025-03-05', [self.lunch.id]),
+            ('?ordering=amount', [self.lunch.id, self.pay.id]),
+            ('?ordering=-amount', [self.pay.id, self.lunch.id]),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual([int(row[0]) for row in self.csv_rows(query)[1:]], expected)
+
+    def test_ndjson(self):
+        lines = [json.loads(line) for line in self.export('?export_format=ndjson&type=income').splitlines()]
+        self.assertEqual(lines, [{
+            'id': self.pay.id, 'date': '2025-03-01T09:00:00Z', 'type': 'income', 'amount': '900.00',
+            'description': 'Payroll', 'category__name': 'Salary', 'account__name': 'Checking', 'notes': 'March', 'tags': '',
+        }])
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get('/api/transactions/export/?export_format=xlsx').status_code, 400)
+
+
+class ForecastTests(TestCase):
+    """Balances follow the history's daily mean plus each month's scheduled occurrences"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='forecast@example.com', username='forecast', password='pw', first_name='Fore', last_name='Cast',
+        )
+        self.checking = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.savings = Account.objects.create(user=self.user, name='Savings', type='savings')
+        food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        salary, _ = Category.objects.get_or_create(user=self.user, name='Salary', type='income')
+
+        def schedule(category, kind, amount, **fields):
+            return RecurringTransaction.objects.create(
+                user=self.user, account=self.checking, category=category, type=kind,
+                amount=Decimal(amount), description='Scheduled', **fields,
+            )
+
+        # 1 April and 1 May fall in the forecast
+        payday = schedule(salary, 'income', '500.00', frequency='monthly', start_date=date(2025, 1, 1),
+                          occurrence_count=3, next_occurrence=date(2025, 4, 1))
+        # 17, 24 and 31 March, then 7 and 14 April
+        schedule(food, 'expense', '10.00', frequency='weekly', start_date=date(2025, 3, 17), count=5)
+        # Overdue since the 13th, ends on the 16th: four occurrences in March
+        schedule(food, 'expense', '1.00', frequency='daily', start_date=date(2025, 3, 13), end_date=date(2025, 3, 16))
+        # Clamped to 30 April
+        schedule(food, 'transfer', '100.00', frequency='monthly', start_date=date(2025, 1, 31),
+                 transfer_to_account=self.savings, occurrence_count=2, next_occurrence=date(2025, 3, 31))
+        schedule(food, 'expense', '999.00', frequency='daily', start_date=date(2025, 3, 1), is_active=False)
+
+        utc = ZoneInfo('UTC')
+        ledger.post(Transaction.objects.bulk_create([
+            Transaction(user=self.user, account=self.checking, category=food, type='expense',
+                        amount=Decimal('42.00'), description='Groceries', date=datetime(2025, 2, 10, 12, tzinfo=utc)),
+            # Materialized by a schedule, so projected through the schedule rather than the history
+            Transaction(user=self.user, account=self.checking, category=salary, type='income', recurring=payday,
+                        amount=Decimal('500.00'), description='Salary', date=datetime(2025, 3, 1, 12, tzinfo=utc)),
+        ]))
+        Account.objects.filter(pk=self.checking.pk).update(balance=Decimal('1000.00'))
+        Account.objects.filter(pk=self.savings.pk).update(balance=Decimal('0.00'))
+
+    def test_recurring_flows_count_occurrences_per_month(self):
+        month_ends = np.array(['2025-04-01', '2025-05-01', '2025-06-01'], dtype='datetime64[D]')
+        account_ids = np.array([self.checking.id, self.savings.id], dtype=np.int64)
+        flows = forecast.recurring_flows(self.user, account_ids, month_ends)
+        np.testing.assert_allclose(flows, [[-134.0, 380.0, 400.0], [100.0, 100.0, 100.0]])
+
+    def test_projection_adds_history_and_schedules(self):
+        result = forecast.project(self.user, months=3, history_months=1, today=date(2025, 3, 15))
+
+        # 1 February to 15 March is 42 days with a single 42.00 expense
+        self.assertEqual(result['history'], {'start': '2025-02-01', 'end': '2025-03-15', 'days': 42})
+        checking, savings = result['accounts']
+        self.assertEqual(checking['average_daily_net'], -1.0)
+        self.assertEqual(savings['average_daily_net'], 0.0)
+        self.assertEqual([month['month'] for month in checking['forecast']], ['2025-03', '2025-04', '2025-05'])
+        self.assertEqual([month['scheduled'] for month in checking['forecast']], [-134.0, 380.0, 400.0])
+        # 17, 47 and 78 days ahead at -1.00 a day
+        self.assertEqual([month['balance'] for month in checking['forecast']], [849.0, 1199.0, 1568.0])
+        self.assertEqual([month['balance'] for month in savings['forecast']], [100.0, 200.0, 300.0])
+        self.assertEqual([month['low'] for month in savings['forecast']], [100.0, 200.0, 300.0])
+        self.assertEqual([month['balance'] for month in result['total']['forecast']], [949.0, 1399.0, 1868.0])
+
+        spread = np.sqrt(41) * np.sqrt(17)  # the history's daily standard deviation over 17 days
+        first = checking['forecast'][0]
+        self.assertAlmostEqual(first['high'] - first['balance'], spread, places=1)
+        self.assertAlmostEqual(first['balance'] - first['low'], spread, places=1)
+
+    def test_occurrence_dates_match_stepping_through_the_schedule(self):
+        cases = [
+            dict(frequency='daily', interval=3, start_date=date(2025, 1, 1), count=20),
+            dict(frequency='weekly', interval=2, start_date=date(2025, 1, 6), end_date=date(2025, 6, 30)),
+            dict(frequency='monthly', interval=1, start_date=date(2024, 1, 31)),
+            dict(frequency='monthly', interval=5, start_date=date(2024, 8, 30), count=4),
+            dict(frequency='yearly', interval=1, start_date=date(2024, 2, 29), end_date=date(2028, 2, 28)),
+        ]
+        for fields in cases:
+            for occurrence_count in (0, 2, 7):
+                schedule = RecurringTransaction(occurrence_count=occurrence_count, **fields)
+                schedule.next_occurrence = schedule.occurrence(occurrence_count)
+                with self.subTest(occurrence_count=occurrence_count, **fields):
+                    self.assertEqual(
+                        forecast.occurrence_dates(schedule, date(2029, 12, 31)).tolist(),
+                        recurring.due_occurrences(schedule, date(2029, 12, 31))[0],
+                    )
+
+
+class DefaultCategoryTests(TestCase):
+    """provision_default_categories backfills users created before the defaults and never duplicates them"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                email=f'defaults{i}@example.com', username=f'defaults{i}', password='pw', first_name='De', last_name='Faults',
+            )
+            for i in range(3)
+        ]
+        # Users from before the defaults existed: one has none, one has a few, one customized Salary
+        Category.objects.filter(user=self.users[0]).delete()
+        Category.objects.filter(user=self.users[1]).exclude(name__in=['Salary', 'Other']).delete()
+        Category.objects.filter(user=self.users[1], name='Salary').update(color='#000000')
+        Category.objects.create(user=self.users[2], name='Pets', type='expense')
+
+    def categories(self, user):
+        return sorted(Category.objects.filter(user=user).values_list('name', 'type'))
+
+    def test_running_twice_backfills_without_duplicates(self):
+        defaults = sorted((name, category_type) for name, category_type, _, _ in DEFAULT_CATEGORIES)
+        for _ in range(2):
+            stdout = io.StringIO()
+            call_command('provision_default_categories', '--batch-size', '2', stdout=stdout)
+            self.assertIn('Default categories provisioned for 3 users', stdout.getvalue())
+
+            self.assertEqual(self.categories(self.users[0]), defaults)
+            self.assertEqual(self.categories(self.users[1]), defaults)
+            self.assertEqual(self.categories(self.users[2]), sorted(defaults + [('Pets', 'expense')]))
+
+        # Existing rows are left as they are
+        self.assertEqual(Category.objects.get(user=self.users[1], name='Salary').color, '#000000')
+        self.assertFalse(Category.objects.get(user=self.users[2], name='Pets').is_default)
+
+
+class SyntheticBenchmarkTests(TestCase):
+    """Every benchmarked endpoint succeeds on seeded data and write endpoints leave no trace"""
+
+    def test_seed_and_benchmark(self):
+        counts = synthetic.seed(users=2, transactions=400, months=6, paychecks_per_user=4, prefix='bench')
+        self.assertEqual(counts['transactions'], 400)
+        self.assertEqual(counts['paychecks'], 8)
+        with self.assertRaises(ValueError):
+            synthetic.seed(users=1, transactions=10, prefix='bench')
+
+        user = User.objects.get(email='bench0@example.com')
+        before = Transaction.objects.filter(user=user).count()
+        balances = list(Account.objects.filter(user=user).order_by('id').values_list('balance', flat=True))
+        bucket_balances = list(BudgetBucket.objects.filter(user=user).order_by('id').values_list('current_balance', flat=True))
+        # The async dashboard views query from worker threads, outside this test's transaction
+        names = [endpoint[0] for endpoint in benchmarks.ENDPOINTS if not endpoint[0].startswith('dashboard.')]
+        results = benchmarks.run(user, repeat=1, only=names)
+        self.assertEqual(list(results['endpoints']), names)
+        for name, result in results['endpoints'].items():
+            self.assertLess(result['status'], 300, name)
+        self.assertEqual(Transaction.objects.filter(user=user).count(), before)
+        # Writes hit the seeded rows and are rolled back
+        self.assertTrue(Transaction.objects.filter(pk=benchmarks.endpoint_context(user)['transaction_id']).exists())
+        self.assertEqual(list(Account.objects.filter(user=user).order_by('id').values_list('balance', flat=True)), balances)
+        self.assertEqual(
+            list(BudgetBucket.objects.filter(user=user).order_by('id').values_list('current_balance', flat=True)),
+            bucket_balances,
+        )
+        self.assertEqual(benchmarks.compare(results, results), {})
+
+
+class LedgerTests(TestCase):
+    """Every transaction write moves the affected account balances by exactly its amount"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='ledger@example.com', username='ledger', password='pw',
+            first_name='Ledger', last_name='User',
+        )
+        self.checking = Account.objects.create(user=self.user, name='Checking', type='checking', balance=Decimal('100.00'))
+        self.savings = Account.objects.create(user=self.user, name='Savings', type='savings', balance=Decimal('500.00'))
+        self.salary, _ = Category.objects.get_or_create(user=self.user, name='Salary', type='income')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def balances(self):
+        return tuple(Account.objects.filter(user=self.user).order_by('id').values_list('balance', flat=True))
+
+    def create(self, type, amount, category):
+        response = self.client.post('/api/transactions/', {
+            'type': type, 'amount': amount, 'description': 'Test', 'date': timezone.now().isoformat(),
+            'category_id': category.id, 'account_id': self.checking.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Transaction.objects.filter(user=self.user).latest('id')
+
+    def update(self, txn, **fields):
+        body = {
+            'type': txn.type, 'amount': str(txn.amount), 'description': txn.description,
+            'date': txn.date.isoformat(), 'category_id': txn.category_id, 'account_id': txn.account_id, **fields,
+        }
+        response = self.client.put(f'/api/transactions/{txn.id}/', body, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_income_and_expense(self):
+        self.create('income', '250.00', self.salary)
+        self.assertEqual(self.balances(), (Decimal('350.00'), Decimal('500.00')))
+        self.create('expense', '75.50', self.food)
+        self.assertEqual(self.balances(), (Decimal('274.50'), Decimal('500.00')))
+
+    def test_transfer_credits_the_destination(self):
+        txn = self.create('expense', '40.00', self.food)
+        self.update(txn, type='transfer', transfer_to_account=self.savings.id)
+        self.assertEqual(self.balances(), (Decimal('60.00'), Decimal('540.00')))
+
+        transfer = Transaction.objects.create(
+            user=self.user, account=self.savings, transfer_to_account=self.checking, category=self.food,
+            type='transfer', amount=Decimal('15.00'), description='Back', date=timezone.now(),
+        )
+        ledger.post([transfer])
+        self.assertEqual(self.balances(), (Decimal('75.00'), Decimal('525.00')))
+
+    def test_change_amount_and_move_to_another_account(self):
+        txn = self.create('expense', '30.00', self.food)
+        self.update(txn, amount='45.00')
+        self.assertEqual(self.balances(), (Decimal('55.00'), Decimal('500.00')))
+        self.update(txn, amount='45.00', account_id=self.savings.id)
+        self.assertEqual(self.balances(), (Decimal('100.00'), Decimal('455.00')))
+
+    def test_delete_restores_the_balance(self):
+        txn = self.create('income', '80.00', self.salary)
+        response = self.client.delete(f'/api/transactions/{txn.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.balances(), (Decimal('100.00'), Decimal('500.00')))
+
+    def test_adjust_balance(self):
+        url = f'/api/accounts/{self.checking.id}/adjust_balance/'
+        response = self.client.post(url, {'amount': '-25.10', 'reason': 'Fee'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['new_balance'], Decimal('74.90'))
+        for amount in ('abc', 'NaN', 'Infinity', ''):
+            with self.subTest(amount=amount):
+                response = self.client.post(url, {'amount': amount}, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.balances(), (Decimal('74.90'), Decimal('500.00')))
+
+
+class StatementParserTests(SimpleTestCase):
+    tz = ZoneInfo('America/New_York')
+
+    def test_parse_amount(self):
+        self.assertEqual(importers.parse_amount('$1,234.50'), Decimal('1234.50'))
+        self.assertEqual(importers.parse_amount('(12.00)'), Decimal('-12.00'))
+        self.assertEqual(importers.parse_amount(' -3.5 '), Decimal('-3.50'))
+        self.assertEqual(importers.parse_amount('0.004'), Decimal('0.00'))
+        self.assertEqual(importers.parse_amount('9999999999.99'), Decimal('9999999999.99'))
+        for value in ('abc', 'NaN', 'Infinity', '1e40', '10000000000', '-1e12'):
+            with self.subTest(value=value), self.assertRaises(importers.StatementError):
+                importers.parse_amount(value)
+
+    def test_parse_date(self):
+        expected = datetime(2025, 3, 4, tzinfo=self.tz)
+        for value in ('2025-03-04', '03/04/2025', '03/04/25', '20250304', '04.03.2025'):
+            with self.subTest(value=value):
+                self.assertEqual(importers.parse_date(value, self.tz), expected)
+        # An explicit format wins over the built-in month-first ones
+        self.assertEqual(importers.parse_date('04/03/2025', self.tz, '%d/%m/%Y'), expected)
+        with self.assertRaises(importers.StatementError):
+            importers.parse_date('next tuesday', self.tz)
+
+    def test_csv_header_aliases_and_explicit_columns(self):
+        lines = io.StringIO('Posted Date,Payee,Withdrawal,Deposit,Memo\n2025-03-04,Coffee,4.50,,Latte\n')
+        self.assertEqual(list(importers.parse_csv(lines)), [
+            (2, {'date': '2025-03-04', 'debit': '4.50', 'credit': '', 'description': 'Coffee', 'notes': 'Latte'}),
+        ])
+        lines = io.StringIO('When,What,How much\n2025-03-04,Coffee,-4.50\n')
+        records = importers.parse_csv(lines, columns={'date': 'When', 'description': 'What', 'amount': 'How much'})
+        self.assertEqual(list(records), [(2, {'date': '2025-03-04', 'amount': '-4.50', 'description': 'Coffee'})])
+
+    def test_ofx(self):
+        lines = io.StringIO(
+            'OFXHEADER:100\n<OFX><BANKTRANLIST>\n'
+            '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250304120000<TRNAMT>-4.50<NAME>Coffee<MEMO>Latte</STMTTRN>\n'
+            '<STMTTRN>\n<DTPOSTED>20250305\n<TRNAMT>1000.00\n<MEMO>Payroll\n</STMTTRN>\n'
+            '</BANKTRANLIST></OFX>\n'
+        )
+        self.assertEqual(list(importers.parse_ofx(lines)), [
+            (3, {'date': '20250304', 'amount': '-4.50', 'description': 'Coffee', 'notes': 'Latte'}),
+            (8, {'date': '20250305', 'amount': '1000.00', 'notes': 'Payroll', 'description': 'Payroll'}),
+        ])
+
+    def test_qif(self):
+        lines = io.StringIO("!Type:Bank\nD3/ 4'25\nT-4.50\nPCoffee\nLFood\n^\nD3/5/2025\nU1,000.00\nPPayroll\n")
+        self.assertEqual(list(importers.parse_qif(lines)), [
+            (6, {'date': '3/04/25', 'amount': '-4.50', 'description': 'Coffee', 'category': 'Food'}),
+            (9, {'date': '3/5/2025', 'amount': '1,000.00', 'description': 'Payroll'}),
+        ])
+
+
+class StatementImporterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='importer@example.com', username='importer', password='pw',
+            first_name='Import', last_name='User',
+        )
+        self.checking = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.card = Account.objects.create(user=self.user, name='Card', type='credit')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+
+    def run_csv(self, text, **kwargs):
+        importer = importers.StatementImporter(self.user, default_account=self.checking, **kwargs)
+        return importer.run(importers.parse_csv(io.StringIO(text)))
+
+    def test_rows_map_onto_accounts_categories_and_types(self):
+        stats = self.run_csv(
+            'Date,Description,Amount,Category,Account\n'
+            '2025-03-04,Coffee,-4.50,Food,\n'
+            '2025-03-05,Refund,12.00,,Card\n'
+            '2025-03-06,Lunch,,Food,card\n'
+        )
+        self.assertEqual((stats['rows'], stats['created'], stats['error_count']), (3, 2, 1))
+        coffee, refund = Transaction.objects.filter(user=self.user).order_by('date')
+        self.assertEqual(
+            (coffee.account, coffee.category, coffee.type, coffee.amount), (self.checking, self.food, 'expense', Decimal('4.50')),
+        )
+        self.assertEqual((refund.account, refund.type, refund.category.name), (self.card, 'income', 'Uncategorized'))
+        self.assertEqual(refund.date, datetime(2025, 3, 5, tzinfo=user_timezone(self.user)))
+        self.checking.refresh_from_db()
+        self.card.refresh_from_db()
+        self.assertEqual((self.checking.balance, self.card.balance), (Decimal('-4.50'), Decimal('12.00')))
+
+    def test_debit_and_credit_columns(self):
+        stats = self.run_csv('Date,Payee,Debit,Credit\n2025-03-04,Coffee,4.50,\n2025-03-05,Salary,,900\n')
+        self.assertEqual(stats['created'], 2)
+        self.assertEqual(
+            list(Transaction.objects.filter(user=self.user).order_by('date').values_list('type', 'amount')),
+            [('expense', Decimal('4.50')), ('income', Decimal('900.00'))],
+        )
+
+    def test_errors_are_reported_per_line(self):
+        stats = self.run_csv(
+            'Date,Description,Amount,Account\n'
+            '2025-03-04,Coffee,abc,\n'
+            'someday,Coffee,-4.50,\n'
+            '2025-03-04,Coffee,0,\n'
+            '2025-03-04,Coffee,-4.50,Brokerage\n'
+            '2025-03-04,Coffee,-4.50,\n'
+            '2025-03-04,Coffee,0.004,\n'
+            '2025-03-04,Coffee,1e40,\n'
+            '2025-03-04,Coffee,12345678901,\n'
+        )
+        self.assertEqual((stats['rows'], stats['created'], stats['error_count']), (8, 1, 7))
+        self.assertEqual(stats['errors'], [
+            {'line': 2, 'error': "Invalid amount 'abc'"},
+            {'line': 3, 'error': "Invalid date 'someday'"},
+            {'line': 4, 'error': 'Amount is zero or missing'},
+            {'line': 5, 'error': "Unknown account 'Brokerage'"},
+            {'line': 7, 'error': 'Amount is zero or missing'},
+            {'line': 8, 'error': "Invalid amount '1e40'"},
+            {'line': 9, 'error': "Amount '12345678901' is too large"},
+        ])
+
+    def test_rows_already_imported_are_skipped(self):
+        statement = 'Date,Description,Amount\n2025-03-04,Coffee,-4.50\n2025-03-05,Bagel,-3.00\n'
+        self.assertEqual(self.run_csv(statement)['created'], 2)
+        stats = self.run_csv(statement + '2025-03-06,Tea,-2.00\n')
+        self.assertEqual((stats['created'], stats['duplicates']), (1, 2))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
+
+    def test_identical_rows_within_one_statement_are_kept(self):
+        stats = self.run_csv('Date,Description,Amount\n2025-03-04,Coffee,-4.50\n2025-03-04,Coffee,-4.50\n')
+        self.assertEqual((stats['created'], stats['duplicates']), (2, 0))
+
+    def test_upload(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        upload = SimpleUploadedFile('march.qif', b'!Type:Bank\nD03/04/2025\nT-4.50\nPCoffee\nLFood\n^\n')
+        response = client.post(
+            '/api/transactions/import_statement/', {'file': upload, 'account_id': self.card.id}, format='multipart',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(Transaction.objects.get(user=self.user).account, self.card)
+
+        upload = SimpleUploadedFile('march.csv', b'Date,Amount\n2025-03-04,-1\n')
+        response = client.post('/api/transactions/import_statement/', {'file': upload, 'format': 'xls'}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+        upload = SimpleUploadedFile('huge.csv', b'Date,Amount\n2025-03-04,1e40\n')
+        response = client.post('/api/transactions/import_statement/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['error_count']), (0, 1))
+
+
+class ResponseCacheTests(TestCase):
+    """cached_per_user actions are served from the cache until the user's next committed write"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='cached@example.com', username='cached', password='pw', first_name='Cached', last_name='User',
+        )
+        self.account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.client = jwt_client(self.user)
+
+    def expenses(self):
+        return self.client.get('/api/transactions/summary/').data['current_period']['expenses']
+
+    def add_transaction(self, amount='12.50'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/transactions/', {
+                'type': 'expense', 'amount': amount, 'description': 'Lunch', 'date': timezone.now().isoformat(),
+                'category_id': self.food.id, 'account_id': self.account.id,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_summary_is_cached_until_a_write(self):
+        self.assertEqual(self.expenses(), 0)
+        # Only the authentication lookup, which also reads the data version
+        with self.assertNumQueries(1):
+            self.assertEqual(self.expenses(), 0)
+        self.add_transaction()
+        self.assertEqual(self.expenses(), 12.5)
+
+    def test_writes_in_another_worker_invalidate(self):
+        """Each worker process has its own locmem cache; the version they key on is shared in the database"""
+        other_worker = LocMemCache('other-worker', {})
+        self.assertEqual(self.expenses(), 0)
+        with mock.patch.object(caching, 'cache', other_worker):
+            self.add_transaction()
+        self.assertEqual(self.expenses(), 12.5)
+
+    def test_rolled_back_writes_keep_the_cache(self):
+        self.expenses()
+        version = User.objects.get(pk=self.user.pk).data_version
+        with self.captureOnCommitCallbacks(execute=True):
+            with db_transaction.atomic():
+                caching.bump(self.user.pk)
+                db_transaction.set_rollback(True)
+        self.assertEqual(User.objects.get(pk=self.user.pk).data_version, version)
+
+    def test_full_user_saves_keep_the_version(self):
+        stale = User.objects.get(pk=self.user.pk)
+        self.add_transaction()
+        version = User.objects.get(pk=self.user.pk).data_version
+        self.assertGreater(version, stale.data_version)
+        stale.first_name = 'Renamed'
+        stale.save()
+        fresh = User.objects.get(pk=self.user.pk)
+        self.assertEqual((fresh.first_name, fresh.data_version), ('Renamed', version))
+
+    def test_entries_are_per_user_and_per_query(self):
+        other = User.objects.create_user(
+            email='other-cached@example.com', username='other-cached', password='pw', first_name='O', last_name='C',
+        )
+        Category.objects.create(user=other, name='Hobbies', type='expense')
+        self.client.get('/api/categories/by_type/')
+        names = [category['name'] for category in jwt_client(other).get('/api/categories/by_type/').data['expense']]
+        self.assertIn('Hobbies', names)
+        self.assertEqual(self.client.get('/api/transactions/summary/?period=year').data['period']['name'], 'year')
+
+    def test_category_writes_invalidate_by_type(self):
+        names = lambda: [category['name'] for category in self.client.get('/api/categories/by_type/').data['expense']]
+        self.assertNotIn('Pets', names())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/categories/', {'name': 'Pets', 'type': 'expense'}, format='json')
+        self.assertIn('Pets', names())
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.filter(user=self.user, name='Pets').delete()
+        self.assertNotIn('Pets', names())
+
+
+class ConditionalGetTests(TestCase):
+    """List and detail reads answer a matching If-None-Match/If-Modified-Since with 304 until the next write"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='etag@example.com', username='etag', password='pw', first_name='E', last_name='Tag',
+        )
+        self.account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.client = jwt_client(self.user)
+
+    def add_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/transactions/', {
+                'type': 'expense', 'amount': '5.00', 'description': 'Coffee', 'date': timezone.now().isoformat(),
+                'category_id': self.food.id, 'account_id': self.account.id,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_if_none_match(self):
+        self.add_transaction()
+        for url in ('/api/transactions/', f'/api/accounts/{self.account.id}/', '/api/categories/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+                # Only the authentication lookup
+                self.assertEqual(len(queries), 1)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 304)
+
+    def test_etag_depends_on_the_query(self):
+        etag = self.client.get('/api/transactions/')['ETag']
+        response = self.client.get('/api/transactions/?type=income', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_after_a_write(self):
+        response = self.client.get('/api/transactions/')
+        etag = response['ETag']
+        self.add_transaction()
+        response = self.client.get('/api/transactions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_if_modified_since(self):
+        self.add_transaction()
+        response = self.client.get('/api/transactions/')
+        last_modified = response['Last-Modified']
+        self.assertEqual(self.client.get('/api/transactions/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.add_transaction()
+        # Last-Modified has one-second resolution; date the write a few seconds after the first response
+        User.objects.filter(pk=self.user.pk).update(data_modified_at=timezone.now() + timedelta(seconds=5))
+        self.assertEqual(self.client.get('/api/transactions/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_validators_are_the_same_in_every_worker(self):
+        """A fresh worker, with nothing in its cache, answers the validators another one issued"""
+        self.add_transaction()
+        response = self.client.get('/api/transactions/')
+        cache.clear()
+        again = self.client.get('/api/transactions/')
+        self.assertEqual((again['ETag'], again['Last-Modified']), (response['ETag'], response['Last-Modified']))
+        cache.clear()
+        self.assertEqual(self.client.get('/api/transactions/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        cache.clear()
+        not_modified = self.client.get('/api/transactions/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+
+class AsyncDashboardTests(TransactionTestCase):
+    """
+    The async dashboards authenticate with JWT and return, and share cache entries with, the
+    same payloads as the DRF actions. TransactionTestCase, because their queries run in
+    worker threads with their own connections, which cannot see a test transaction.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='dashboard@example.com', username='dashboard', password='pw',
+            first_name='Dash', last_name='Board',
+        )
+        account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        salary = Category.objects.get(user=self.user, name='Salary', type='income')
+        food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        now = timezone.now()
+        transactions = [
+            Transaction.objects.create(
+                user=self.user, account=account, category=category, type=category.type, amount=Decimal(amount),
+                description=description, date=now - timedelta(days=days), tags=tags,
+            )
+            for category, amount, description, days, tags in (
+                (salary, '2000.00', 'Payroll', 1, ''),
+                (food, '42.10', 'Groceries', 2, 'food'),
+                (food, '18.00', 'Lunch', 40, ''),
+                (food, '7.25', 'Coffee', 400, ''),
+            )
+        ]
+        ledger.post(transactions)
+        self.user.refresh_from_db()
+        self.client = jwt_client(self.user)
+
+    def test_requires_a_valid_token(self):
+        for url in ('/api/dashboard/summary/', '/api/dashboard/analytics/'):
+            with self.subTest(url=url):
+                self.assertEqual(APIClient().get(url).status_code, 401)
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+                response = client.get(url)
+                self.assertEqual(response.status_code, 401)
+                self.assertIn('detail', response.json())
+
+    def test_payloads_match_the_drf_actions(self):
+        for dashboard, action in (
+            ('/api/dashboard/summary/', '/api/transactions/summary/'),
+            ('/api/dashboard/summary/?period=year', '/api/transactions/summary/?period=year'),
+            ('/api/dashboard/analytics/', '/api/transactions/analytics/'),
+            ('/api/dashboard/analytics/?months=3', '/api/transactions/analytics/?months=3'),
+        ):
+            with self.subTest(url=dashboard):
+                caching.bump(self.user.pk)
+                async_response = self.client.get(dashboard)
+                self.assertEqual(async_response.status_code, 200)
+                caching.bump(self.user.pk)
+                self.assertEqual(async_response.json(), self.client.get(action).json())
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/dashboard/summary/?period=decade').status_code, 400)
+        self.assertEqual(self.client.get('/api/dashboard/analytics/?months=0').status_code, 400)
+
+    def test_cache_entries_are_shared_with_the_drf_actions(self):
+        dashboard = self.client.get('/api/dashboard/summary/').json()
+        self.assertIsNotNone(cache.get(caching.response_key(self.user, 'transaction.summary:{}', QueryDict())))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/transactions/summary/')
+        self.assertEqual(response.json(), dashboard)
+        # Only authentication; the payload came from the entry the async view stored
+        self.assertFalse([query for query in queries if 'transactions_transaction' in query['sql']])
+
+        self.client.get('/api/transactions/analytics/')
+        self.assertIsNotNone(cache.get(caching.response_key(self.user, 'transaction.analytics:{}', QueryDict())))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'the replica is a second SQLite database file')
+class ReplicaRoutingTests(TransactionTestCase):
+    """Replica actions read from a replica unless the user wrote within REPLICA_STICKY_SECONDS"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Added here rather than in `databases`, which the runner checks before any class is set up
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = {
+            **connections.settings['default'], 'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3'),
+        }
+        call_command('migrate', database='replica', verbosity=0)
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='replica@example.com', username='replica', password='pw', first_name='Rep', last_name='Lica',
+        )
+        self.account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.food, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        self.client = jwt_client(self.user)
+
+    def list_transactions(self):
+        """The list response and the number of queries it ran on each alias"""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica, \
+                override_settings(DATABASE_REPLICAS=['replica']):
+            response = self.client.get('/api/transactions/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(primary), len(replica)
+
+    def test_reads_go_to_the_replica(self):
+        Transaction.objects.create(
+            user=self.user, account=self.account, category=self.food, type='expense', amount=Decimal('5.00'),
+            description='Coffee', date=timezone.now(),
+        )
+        User.objects.filter(pk=self.user.pk).update(data_modified_at=timezone.now() - timedelta(minutes=1))
+        response, primary, replica = self.list_transactions()
+        # The replica database never received the row
+        self.assertEqual(response.data['count'], 0)
+        self.assertGreater(replica, 0)
+        # Only the authentication lookup stays on the primary
+        self.assertEqual(primary, 1)
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        response = self.client.post('/api/transactions/', {
+            'type': 'expense', 'amount': '5.00', 'description': 'Coffee', 'date': timezone.now().isoformat(),
+            'category_id': self.food.id, 'account_id': self.account.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        response, primary, replica = self.list_transactions()
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(replica, 0)
+
+
+class TransactionAdminTests(TestCase):
+    """Admin writes go through the ledger, so balances, rollups and tags stay in step"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='admin-ledger@example.com', username='admin-ledger', password='pw',
+            first_name='Admin', last_name='Ledger',
+        )
+        self.account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.category = Category.objects.create(user=self.user, name='Food', type='expense')
+        self.admin = TransactionAdmin(Transaction, admin.site)
+
+    def balance(self):
+        self.account.refresh_from_db()
+        return self.account.balance
+
+    def rollup_total(self):
+        return MonthlyRollup.objects.filter(user=self.user).aggregate(total=Sum('total_amount'))['total'] or 0
+
+    def test_add_change_delete(self):
+        txn = Transaction(
+            user=self.user, account=self.account, category=self.category, type='expense',
+            amount=Decimal('40.00'), description='Groceries', tags='food', date=timezone.now(),
+        )
+        self.admin.save_model(None, txn, None, change=False)
+        self.assertEqual(self.balance(), Decimal('-40.00'))
+        self.assertEqual(self.rollup_total(), Decimal('40.00'))
+        self.assertEqual(TransactionTag.objects.filter(transaction=txn).count(), 1)
+
+        txn.amount = Decimal('25.00')
+        self.admin.save_model(None, txn, None, change=True)
+        self.assertEqual(self.balance(), Decimal('-25.00'))
+        self.assertEqual(self.rollup_total(), Decimal('25.00'))
+
+        self.admin.delete_model(None, txn)
+        self.assertEqual(self.balance(), Decimal('0.00'))
+        self.assertEqual(self.rollup_total(), 0)
+
+    def test_bulk_delete(self):
+        for amount in ('10.00', '15.00'):
+            self.admin.save_model(None, Transaction(
+                user=self.user, account=self.account, category=self.category, type='expense',
+                amount=Decimal(amount), description='Coffee', date=timezone.now(),
+            ), None, change=False)
+        self.admin.delete_queryset(None, Transaction.objects.filter(user=self.user))
+        self.assertEqual(self.balance(), Decimal('0.00'))
+        self.assertEqual(self.rollup_total(), 0)
+
+
+class AccountReconcileTests(TestCase):
+    """Balances edited by hand survive reconciling; drift from anything else is reported and fixed"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='reconcile@example.com', username='reconcile', password='pw', first_name='Re', last_name='Concile',
+        )
+        self.account = Account.objects.create(
+            user=self.user, name='Checking', type='checking', balance=Decimal('100.00'), opening_balance=Decimal('100.00'),
+        )
+        self.category, _ = Category.objects.get_or_create(user=self.user, name='Food', type='expense')
+        ledger.post(Transaction.objects.bulk_create([
+            Transaction(
+                user=self.user, account=self.account, category=self.category, type='expense',
+                amount=Decimal(amount), description='Groceries', date=timezone.now(),
+            )
+            for amount in ('20.00', '5.50')
+        ]))
+        self.admin = AccountAdmin(Account, admin.site)
+        self.request = RequestFactory().post('/admin/transactions/account/')
+        self.request.user = User.objects.create_superuser(
+            email='staff@example.com', username='staff', password='pw', first_name='Staff', last_name='User',
+        )
+
+    def balance(self):
+        self.account.refresh_from_db()
+        return self.account.balance
+
+    def admin_save(self, instance, **changes):
+        change = instance.pk is not None
+        form_class = self.admin.get_form(self.request, instance if change else None, change=change)
+        form = form_class({**model_to_dict(instance, fields=form_class.base_fields), **changes}, instance=instance)
+        self.assertTrue(form.is_valid(), form.errors)
+        obj = form.save(commit=False)
+        self.admin.save_model(self.request, obj, form, change=change)
+        return obj
+
+    def reconcile_command(self, *args):
+        stdout = io.StringIO()
+        call_command('reconcile_balances', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_admin_balance_edits_move_the_opening_balance(self):
+        self.assertEqual(self.balance(), Decimal('74.50'))
+        self.admin_save(Account.objects.get(pk=self.account.pk), balance='80.00')
+        self.assertEqual((self.balance(), self.account.opening_balance), (Decimal('80.00'), Decimal('105.50')))
+        self.assertEqual(reconcile.reconcile(Account.objects.filter(user=self.user)), [])
+
+    def test_admin_edits_without_a_balance_change_keep_postings(self):
+        stale = Account.objects.get(pk=self.account.pk)
+        # Posted after the admin form was loaded
+        ledger.post([Transaction.objects.create(
+            user=self.user, account=self.account, category=self.category, type='expense',
+            amount=Decimal('4.50'), description='Coffee', date=timezone.now(),
+        )])
+        self.admin_save(stale, name='Everyday')
+        self.assertEqual((self.balance(), self.account.name), (Decimal('70.00'), 'Everyday'))
+        self.assertEqual(reconcile.reconcile(Account.objects.filter(user=self.user)), [])
+
+    def test_admin_add_opens_at_the_balance(self):
+        account = self.admin_save(Account(user=self.user), name='Savings', type='savings', balance='250.00')
+        account.refresh_from_db()
+        self.assertEqual(account.opening_balance, Decimal('250.00'))
+
+    def test_command_reports_and_fixes_drift(self):
+        Account.objects.filter(pk=self.account.pk).update(balance=F('balance') + Decimal('7.00'))
+        output = self.reconcile_command()
+        self.assertIn('stored 81.50, expected 74.50, drift 7.00', output)
+        self.assertIn('1 accounts drifted', output)
+        self.assertEqual(self.balance(), Decimal('81.50'))
+
+        self.assertIn('Fixed 1 account balances', self.reconcile_command('--fix'))
+        self.assertEqual(self.balance(), Decimal('74.50'))
+        self.assertIn('All balances match', self.reconcile_command())
+
+    def test_admin_action_reports_and_fixes_drift(self):
+        Account.objects.filter(pk=self.account.pk).update(balance=F('balance') - Decimal('3.00'))
+        with mock.patch.object(AccountAdmin, 'message_user') as message_user:
+            self.admin.reconcile_balances(self.request, Account.objects.filter(user=self.user))
+        self.assertEqual([call.args[1] for call in message_user.call_args_list], [
+            'Checking: 71.50 -> 74.50 (drift -3.00)', '1 of 1 balances corrected',
+        ])
+        self.assertEqual(self.balance(), Decimal('74.50'))
+
+
+class RecurringTransactionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='recurring@example.com', username='recurring', password='pw',
+            first_name='Recurring', last_name='User',
+        )
+        self.account = Account.objects.create(user=self.user, name='Checking', type='checking')
+        self.category = Category.objects.create(user=self.user, name='Rent', type='expense')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def schedule(self, **fields):
+        fields = {'frequency': 'monthly', 'start_date': date(2025, 1, 31), **fields}
+        return RecurringTransaction.objects.create(
+            user=self.user, account=self.account, category=self.category, type='expense',
+            amount=Decimal('100.00'), description='Rent', **fields,
+        )
+
+    def test_editing_a_paused_schedule_keeps_it_paused(self):
+        schedule = self.schedule(start_date=timezone.localdate(), is_active=False)
+        response = self.client.patch(f'/api/recurring/{schedule.id}/', {'interval': 2}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(response.data['is_active'])
+        schedule.refresh_from_db()
+        self.assertFalse(schedule.is_active)
+
+        response = self.client.patch(f'/api/recurring/{schedule.id}/', {'interval': 3, 'is_active': True}, format='json')
+        self.assertTrue(response.data['is_active'])
+
+    def test_monthly_occurrences_clamp_to_month_end(self):
+        schedule = self.schedule()
+        self.assertEqual(
+            [schedule.occurrence(i) for i in range(5)],
+            [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30), date(2025, 5, 31)],
+        )
+        leap = self.schedule(start_date=date(2024, 2, 29), frequency='yearly')
+        self.assertEqual([leap.occurrence(i) for i in range(2)], [date(2024, 2, 29), date(2025, 2, 28)])
+
+    def test_interval_count_and_end_date(self):
+        weekly = self.schedule(frequency='weekly', interval=2, start_date=date(2025, 1, 1), count=3)
+        self.assertEqual(
+            [weekly.occurrence(i) for i in range(4)],
+            [date(2025, 1, 1), date(2025, 1, 15), date(2025, 1, 29), None],
+        )
+        ending = self.schedule(frequency='daily', start_date=date(2025, 1, 1), end_date=date(2025, 1, 3))
+        self.assertEqual([ending.occurrence(i) for i in range(4)], [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3), None])
+        self.assertEqual(ending.next_occurrence, date(2025, 1, 1))
+
+    def materialized(self, schedule):
+        return list(
+            Transaction.objects.filter(recurring=schedule).order_by('occurrence_date').values_list('occurrence_date', flat=True)
+        )
+
+    def test_materialize_is_idempotent_and_posts_once(self):
+        schedule = self.schedule(count=4)
+        call_command('materialize_recurring', date='2025-06-30', stdout=io.StringIO())
+        call_command('materialize_recurring', date='2025-06-30', stdout=io.StringIO())
+        self.assertEqual(
+            self.materialized(schedule), [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)],
+        )
+        schedule.refresh_from_db()
+        self.assertEqual((schedule.occurrence_count, schedule.next_occurrence, schedule.is_active), (4, None, False))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('-400.00'))
+
+    def test_materialize_resumes_after_a_partial_run(self):
+        schedules = [self.schedule(start_date=date(2025, 1, day)) for day in (1, 2, 3)]
+        self.assertEqual(recurring.materialize_chunk(date(2025, 2, 15), chunk_size=2), (2, 4))
+        # A run that inserted its transactions but died before advancing the schedule
+        RecurringTransaction.objects.filter(id=schedules[0].id).update(occurrence_count=0, next_occurrence=date(2025, 1, 1))
+
+        self.assertEqual(list(recurring.materialize(date(2025, 2, 15), chunk_size=2)), [(2, 2)])
+        for schedule in schedules:
+            self.assertEqual(len(self.materialized(schedule)), 2)
+            schedule.refresh_from_db()
+            self.assertEqual(schedule.occurrence_count, 2)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('-600.00'))
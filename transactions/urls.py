@@ -1,13 +1,18 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TransactionViewSet, CategoryViewSet, AccountViewSet
+from .views import TransactionViewSet, CategoryViewSet, AccountViewSet, RecurringTransactionViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'accounts', AccountViewSet, basename='account')
+router.register(r'recurring', RecurringTransactionViewSet, basename='recurring-transaction')
 
 urlpatterns = [
+    # Async dashboards, for ASGI deployments
+    path('dashboard/summary/', async_views.summary, name='dashboard-summary'),
+    path('dashboard/analytics/', async_views.analytics, name='dashboard-analytics'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
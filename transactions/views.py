@@ -1,23 +1,58 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, Count, Q
+from django.db import transaction as db_transaction
+from django.db.models import Sum, Count, F
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from datetime import datetime, timedelta
-import traceback
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import itertools
+import json
 
-from .models import Transaction, Category, Account
+from .models import Transaction, Category, Account, RecurringTransaction
+from .analytics import (
+    analytics_queries,
+    parse_trend_months,
+    reads_rollups,
+    resolve_period,
+    summary_payload,
+    summary_queries,
+    user_timezone,
+    user_transactions,
+)
+from . import bulk, forecast, importers, ledger, recurring
+from .caching import ConditionalGetMixin, cached_per_user
+from .filters import TransactionSearchFilter, TransactionOrderingFilter
+from .pagination import TransactionPagination
+from .routing import ReadReplicaMixin
 from .serializers import (
     TransactionDetailSerializer, 
     TransactionListSerializer,
     TransactionCreateSerializer,
     CategorySerializer, 
-    AccountSerializer
+    AccountSerializer,
+    RecurringTransactionSerializer,
 )
 
-class CategoryViewSet(viewsets.ModelViewSet):
+EXPORT_FIELDS = [
+    'id', 'date', 'type', 'amount', 'description',
+    'category__name', 'account__name', 'notes', 'tags',
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output"""
+    def write(self, value):
+        return value
+
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
@@ -25,9 +60,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
     filterset_fields = ['type']
     
     def get_queryset(self):
-        return Category.objects.filter(user=self.request.user)
+        return (
+            Category.objects.filter(user=self.request.user)
+            .annotate(transaction_count=Count('transactions'))
+            .order_by('type', 'name')
+        )
     
     @action(detail=False, methods=['get'])
+    @cached_per_user
     def by_type(self, request):
         """Get categories grouped by type"""
         income_categories = self.get_queryset().filter(type='income')
@@ -38,7 +78,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
             'expense': CategorySerializer(expense_categories, many=True, context={'request': request}).data,
         })
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
@@ -46,7 +86,11 @@ class AccountViewSet(viewsets.ModelViewSet):
     filterset_fields = ['type', 'is_active']
     
     def get_queryset(self):
-        return Account.objects.filter(user=self.request.user)
+        return (
+            Account.objects.filter(user=self.request.user)
+            .annotate(transaction_count=Count('transactions'))
+            .order_by('name')
+        )
     
     @action(detail=True, methods=['post'])
     def adjust_balance(self, request, pk=None):
@@ -59,11 +103,13 @@ class AccountViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Amount is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            from decimal import Decimal
             amount = Decimal(str(amount))
-            account.balance += amount
-            account.save()
-            
+        except (ValueError, InvalidOperation):
+            return Response({'error': 'Invalid amount'}, status=status.HTTP_400_BAD_REQUEST)
+        if not amount.is_finite():
+            return Response({'error': 'Invalid amount'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with db_transaction.atomic():
             # Create a transaction record for the adjustment
             adjustment_category = Category.objects.filter(
                 user=request.user, 
@@ -80,7 +126,7 @@ class AccountViewSet(viewsets.ModelViewSet):
                     user=request.user
                 )
             
-            Transaction.objects.create(
+            adjustment = Transaction.objects.create(
                 amount=abs(amount),
                 description=reason,
                 type='income' if amount > 0 else 'expense',
@@ -90,32 +136,48 @@ class AccountViewSet(viewsets.ModelViewSet):
                 user=request.user,
                 notes='Manual balance adjustment'
             )
-            
-            return Response({'message': 'Balance adjusted successfully', 'new_balance': account.balance})
-        except ValueError:
-            return Response({'error': 'Invalid amount'}, status=status.HTTP_400_BAD_REQUEST)
+            # Posting the adjustment moves the balance by `amount`
+            ledger.post([adjustment])
+        
+        account.refresh_from_db(fields=['balance'])
+        return Response({'message': 'Balance adjusted successfully', 'new_balance': account.balance})
+
+class RecurringTransactionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """Recurring income/expense schedules; `manage.py materialize_recurring` creates their transactions"""
+    serializer_class = RecurringTransactionSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['type', 'frequency', 'is_active']
+    
+    # Editing any of these restarts the schedule from today
+    SCHEDULE_FIELDS = {'frequency', 'interval', 'start_date', 'end_date', 'count'}
+    
+    def get_queryset(self):
+        return (
+            RecurringTransaction.objects.filter(user=self.request.user)
+            .select_related('category', 'account')
+            .order_by('next_occurrence', 'id')
+        )
+    
+    def perform_update(self, serializer):
+        schedule = serializer.save()
+        if self.SCHEDULE_FIELDS & set(serializer.validated_data):
+            recurring.reschedule(schedule, timezone.localdate())
+            schedule.is_active = serializer.validated_data.get('is_active', schedule.is_active) and schedule.next_occurrence is not None
+            schedule.save(update_fields=['occurrence_count', 'next_occurrence', 'is_active', 'updated_at'])
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ReadReplicaMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
-    search_fields = ['description', 'notes']
+    replica_actions = ['list', 'retrieve', 'summary', 'analytics', 'forecast', 'tag_breakdown']
+    filter_backends = [TransactionSearchFilter, DjangoFilterBackend, TransactionOrderingFilter]
+    search_fields = ['description', 'notes', 'tags']
     filterset_fields = ['type', 'category__name', 'account__name']
     ordering_fields = ['date', 'amount', 'created_at']
-    ordering = ['-date', '-created_at']
+    ordering = ['-date', '-created_at', 'id']
+    pagination_class = TransactionPagination
     
     def get_queryset(self):
-        queryset = Transaction.objects.filter(user=self.request.user)
-        
-        # Date range filtering
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
-        
-        if start_date:
-            queryset = queryset.filter(date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(date__lte=end_date)
-        
-        return queryset
+        return user_transactions(self.request.user, self.request.query_params)
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -125,102 +187,94 @@ class TransactionViewSet(viewsets.ModelViewSet):
         return TransactionDetailSerializer
     
     @action(detail=False, methods=['get'])
+    @cached_per_user
     def summary(self, request):
         """Get transaction summary statistics"""
-        queryset = self.get_queryset()
-        
-        # Current month data
-        now = timezone.now()
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        current_month = queryset.filter(date__gte=start_of_month)
-        
-        # Calculate totals
-        income_total = current_month.filter(type='income').aggregate(total=Sum('amount'))['total'] or 0
-        expense_total = current_month.filter(type='expense').aggregate(total=Sum('amount'))['total'] or 0
+        # ?period=week|month|quarter|year|custom in the user's timezone, compared with the period before
+        tz = user_timezone(request.user)
+        try:
+            period = resolve_period(request.query_params, tz)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Top categories this month
-        top_expense_categories = (
-            current_month.filter(type='expense')
-            .values('category__name', 'category__color')
-            .annotate(total=Sum('amount'), count=Count('id'))
-            .order_by('-total')[:5]
+        queries = summary_queries(
+            request.user,
+            request.query_params,
+            tz,
+            period,
+            use_rollups=reads_rollups(request.query_params),
         )
+        results = {name: query() for name, query in queries.items()}
         
-        # Recent transactions
         recent_transactions = TransactionListSerializer(
-            queryset[:10], 
+            results['recent_transactions'], 
             many=True, 
             context={'request': request}
         ).data
         
-        return Response({
-            'current_month': {
-                'income': float(income_total),
-                'expenses': float(expense_total),
-                'net': float(income_total - expense_total),
-                'transaction_count': current_month.count(),
-            },
-            'top_categories': list(top_expense_categories),
-            'recent_transactions': recent_transactions,
-        })
+        return Response(summary_payload(results, recent_transactions, period))
     
     @action(detail=False, methods=['get'])
+    @cached_per_user
     def analytics(self, request):
         """Get detailed analytics data"""
-        queryset = self.get_queryset()
+        # Monthly trends window, e.g. ?months=36
+        try:
+            months = parse_trend_months(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Last 12 months data
-        now = timezone.now()
-        twelve_months_ago = now - timedelta(days=365)
+        queries = analytics_queries(
+            request.user,
+            self.get_queryset(),
+            user_timezone(request.user),
+            months,
+            use_rollups=reads_rollups(request.query_params),
+        )
+        return Response({name: query() for name, query in queries.items()})
+    
+    @action(detail=False, methods=['get'])
+    @cached_per_user
+    def forecast(self, request):
+        """Projected month-end balances per account (?months=6), from ?history_months=6 of history and recurring schedules"""
+        try:
+            months, history_months = forecast.parse_forecast_params(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
-        monthly_data = []
-        for i in range(12):
-            month_start = (now.replace(day=1) - timedelta(days=30*i)).replace(day=1)
-            month_end = (month_start.replace(month=month_start.month % 12 + 1) - timedelta(days=1)) if month_start.month < 12 else month_start.replace(year=month_start.year + 1, month=1) - timedelta(days=1)
-            
-            month_transactions = queryset.filter(date__gte=month_start, date__lte=month_end)
-            income = month_transactions.filter(type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-            expenses = month_transactions.filter(type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-            
-            monthly_data.insert(0, {
-                'month': month_start.strftime('%Y-%m'),
-                'income': float(income),
-                'expenses': float(expenses),
-                'net': float(income - expenses)
-            })
+        return Response(forecast.project(request.user, months, history_months))
+    
+    @action(detail=False, methods=['get'])
+    @cached_per_user
+    def tag_breakdown(self, request):
+        """Spending per tag (?type=income for income), in one grouped query"""
+        transaction_type = request.query_params.get('type', 'expense')
+        if transaction_type not in ('income', 'expense'):
+            return Response({'error': 'type must be income or expense'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Category breakdown
-        category_breakdown = (
-            queryset.filter(type='expense')
-            .values('category__name', 'category__color')
-            .annotate(total=Sum('amount'))
-            .order_by('-total')
+        breakdown = (
+            self.get_queryset()
+            .filter(type=transaction_type, tag_set__isnull=False)
+            .values(tag=F('tag_set__name'))
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by('-total', 'tag')
         )
         
-        return Response({
-            'monthly_trends': monthly_data,
-            'category_breakdown': list(category_breakdown),
-        })
+        return Response({'tag_breakdown': list(breakdown)})
     
     @action(detail=False, methods=['post'])
     def bulk_create(self, request):
         """Create multiple transactions at once"""
         transactions_data = request.data.get('transactions', [])
         
-        if not transactions_data:
+        if not transactions_data or not isinstance(transactions_data, list):
             return Response({'error': 'No transactions provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        created_transactions = []
-        errors = []
-        
-        for i, transaction_data in enumerate(transactions_data):
-            serializer = TransactionCreateSerializer(data=transaction_data, context={'request': request})
-            if serializer.is_valid():
-                transaction = serializer.save()
-                created_transactions.append(TransactionListSerializer(transaction, context={'request': request}).data)
-            else:
-                errors.append({'index': i, 'errors': serializer.errors})
+        # Validate every row against one prefetch of the referenced categories/accounts,
+        # then insert the valid rows and their balance changes in a single DB transaction
+        valid_transactions, errors = bulk.validate_rows(request.user, transactions_data, request=request)
+        created = bulk.insert_transactions(valid_transactions) if valid_transactions else []
+        created_transactions = TransactionListSerializer(created, many=True, context={'request': request}).data
         
         return Response({
             'created': created_transactions,
@@ -229,58 +283,84 @@ class TransactionViewSet(viewsets.ModelViewSet):
             'error_count': len(errors)
         }, status=status.HTTP_201_CREATED if created_transactions else status.HTTP_400_BAD_REQUEST)
     
-    #Update account balances when editing a transaction (revert old effect, add new effect)
-    def perform_create(self, serializer):
-        """Update account balance when creating a new transaction"""
-        transaction = serializer.save()
-        self._update_account_balance(transaction.account, transaction.amount, transaction.type, is_addition=True)
-    
-    def _update_account_balance(self, account, amount, transaction_type, is_addition=True):
-        """Helper method to update account balance"""
-        from decimal import Decimal
-        from django.utils import timezone
-    
-        # Debug logging with timestamp
-        print(f"DEBUG: [{timezone.now()}] Updating account balance")
-        print(f"  Account: {account.name}")
-        print(f"  Amount: {amount}")
-        print(f"  Type: {transaction_type}")
-        print(f"  Is Addition: {is_addition}")
-        print(f"  Current Balance: {account.balance}")
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered transaction history as CSV or NDJSON (?export_format=csv|ndjson)"""
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return Response({'error': 'export_format must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
         
-        #Convert amount to Decimal for precision
-        amount = Decimal(str(amount))
+        # One query, read in chunks through a server-side cursor where the database supports it
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values_list(*EXPORT_FIELDS)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
         
-        #Calculate  effect whether its an income or expense
-        if transaction_type == 'income':
-            effect = amount if is_addition else -amount
-        else:  
-            effect = -amount if is_addition else amount
+        if export_format == 'ndjson':
+            content = (json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+            content_type = 'application/x-ndjson'
+        else:
+            writer = csv.writer(Echo())
+            content = (
+                writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+                for row in itertools.chain([EXPORT_FIELDS], rows)
+            )
+            content_type = 'text/csv'
         
-        # Update the account balance
-        account.balance += effect
-        account.save()
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="transactions.{export_format}"'
+        return response
+    
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def import_statement(self, request):
+        """Import a CSV, OFX or QIF bank statement uploaded as `file`"""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'A statement file is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-    def perform_update(self, serializer):
-        """Handle balance changes when editing a transaction"""
-        # Get the old transaction data before updating
-        old_transaction = self.get_object()
-        old_amount = old_transaction.amount
-        old_type = old_transaction.type
+        statement_format = request.data.get('format') or importers.detect_format(upload.name)
+        if statement_format not in importers.FORMATS:
+            return Response(
+                {'error': f"format must be one of {', '.join(importers.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Save the updated transaction
-        transaction = serializer.save()
+        default_account = None
+        account_id = request.data.get('account_id')
+        if account_id:
+            default_account = Account.objects.filter(id=account_id, user=request.user).first()
+            if default_account is None:
+                return Response({'error': 'Invalid account'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Use the SAME account object for both operations
-        account = transaction.account  # or old_transaction.account
+        # Uploads larger than FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to disk and read line by line
+        importer = importers.StatementImporter(
+            request.user,
+            default_account=default_account,
+            date_format=request.data.get('date_format') or None,
+        )
+        records = importers.read_statement(importers.text_lines(upload.file), statement_format)
+        stats = importer.run(records)
         
-        # Calculate the balance adjustment
-        # Remove old effect, add new effect
-        self._update_account_balance(account, old_amount, old_type, is_addition=False)
-        self._update_account_balance(account, transaction.amount, transaction.type, is_addition=True)
+        return Response(stats, status=status.HTTP_201_CREATED if stats['created'] else status.HTTP_200_OK)
+    
+    # Account balances and rollups follow every write through the ledger
+    def perform_create(self, serializer):
+        """Update account balance when creating a new transaction"""
+        with db_transaction.atomic():
+            transaction = serializer.save()
+            ledger.post([transaction])
+    
+    def perform_update(self, serializer):
+        """Handle balance changes when editing a transaction (revert old effect, add new effect)"""
+        with db_transaction.atomic():
+            # Lock the row so concurrent edits see each other's result
+            old_transaction = Transaction.objects.select_for_update().get(pk=serializer.instance.pk)
+            transaction = serializer.save()
+            ledger.repost(old_transaction, transaction)
     
     def perform_destroy(self, instance):
         """Update account balance when deleting a transaction"""
-        self._update_account_balance(instance.account, instance.amount, instance.type, is_addition=False)
-        instance.delete()
-    
\ No newline at end of file
+        with db_transaction.atomic():
+            ledger.unpost([instance])
+            instance.delete()